@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import asyncio
+import logging
+from os.path import join, dirname, abspath
+
+# Mögliche Pfade der Emoji-ID-Datei (lokal, Docker)
+EMOJI_ID_PATHS = [
+    join(dirname(abspath(__file__)), 'data', 'emojis', 'ids.txt'),
+    join(dirname(dirname(abspath(__file__))), 'data', 'emojis', 'ids.txt'),
+    '/app/data/emojis/ids.txt'
+]
+
+# Fallback mit bekannten Emoji-IDs, falls keine ids.txt gefunden wird
+FALLBACK_EMOJIS = {
+    'drache_mozerella_headset': 1395736548917645434,
+    'drache_zahnlücke': 1395736315521400923,
+    'drache_meddl_loide': 1395736247258972280,
+    'drache_suspekt': 1395736270076117032
+}
+
+def parse_emoji_file(path):
+    """Parst die ids.txt - Blöcke à 4 Zeilen, Name in der ersten, ID in der vierten Zeile"""
+    emoji_data = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+
+    for i in range(0, len(lines), 4):
+        if i + 3 < len(lines):
+            emoji_name = lines[i].strip()
+            emoji_id = lines[i + 3].strip()
+            if emoji_name and emoji_id.isdigit():
+                emoji_data[emoji_name] = int(emoji_id)
+    return emoji_data
+
+class EmojiRegistry:
+    """
+    Zentrale Emoji-Registry für alle Module (KI-Antworten, /zitat).
+    Die IDs werden einmal beim Start geladen und nach on_ready gegen den
+    Emoji-Cache der Server geprüft, damit nur nutzbare Emojis gesendet werden.
+    """
+    def __init__(self):
+        self.emojis = {}  # Name -> ID (alle geladenen)
+        self.invalid = set()  # Namen, die der Bot nicht verwenden kann
+        self.source = None
+        self.validated = False
+        self.load_count = 0
+        self.load()
+
+    def load(self):
+        """Lädt die Emoji-IDs (synchron, beim Start oder über asyncio.to_thread)"""
+        emoji_data = {}
+        source = "fallback"
+        for path in EMOJI_ID_PATHS:
+            try:
+                emoji_data = parse_emoji_file(path)
+                source = path
+                break
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logging.error(f"Fehler beim Laden der Emoji-IDs aus {path}: {str(e)}")
+
+        if not emoji_data:
+            emoji_data = dict(FALLBACK_EMOJIS)
+            source = "fallback"
+
+        self.emojis = emoji_data
+        self.source = source
+        self.invalid = set()
+        self.validated = False
+        self.load_count += 1
+        logging.info(f"Emoji-Registry geladen: {len(self.emojis)} Emojis ({source})")
+        return len(self.emojis)
+
+    def validate(self, client):
+        """Prüft alle Emojis gegen den Emoji-Cache des Bots (nach on_ready aufrufen)"""
+        invalid = set()
+        for name, emoji_id in self.emojis.items():
+            emoji = client.get_emoji(emoji_id)
+            if emoji is None or not getattr(emoji, 'available', True):
+                invalid.add(name)
+
+        self.invalid = invalid
+        self.validated = True
+        if invalid:
+            logging.warning(f"Emoji-Registry: {len(invalid)} Emojis nicht verfügbar: {', '.join(sorted(invalid))}")
+        return len(self.emojis) - len(invalid)
+
+    async def reload(self, client=None):
+        """Lädt die Datei im Worker-Thread neu und validiert erneut"""
+        await asyncio.to_thread(self.load)
+        if client is not None and client.is_ready():
+            self.validate(client)
+        return self.get_stats()
+
+    def get_emojis(self):
+        """Gibt alle nutzbaren Emojis als Name -> ID zurück"""
+        if not self.invalid:
+            return self.emojis
+        return {name: emoji_id for name, emoji_id in self.emojis.items() if name not in self.invalid}
+
+    def random_emojis(self, max_count=3):
+        """Wählt 1 bis max_count zufällige Emojis im Format <:name:id>"""
+        emoji_data = self.get_emojis()
+        if not emoji_data:
+            return []
+        selected = random.sample(list(emoji_data.items()), random.randint(1, min(max_count, len(emoji_data))))
+        return [f"<:{emoji_name}:{emoji_id}>" for emoji_name, emoji_id in selected]
+
+    def get_stats(self):
+        """Gibt Anzahl, Quelle und Validierungsstatus zurück"""
+        return {
+            "loaded": len(self.emojis),
+            "usable": len(self.emojis) - len(self.invalid),
+            "invalid": sorted(self.invalid),
+            "source": self.source,
+            "validated": self.validated,
+            "load_count": self.load_count
+        }
+
+# Funktion zum Registrieren der Emoji-Registry
+def register_emoji_registry(client):
+    """Registriert die Emoji-Registry für den Bot"""
+    client.emoji_registry = EmojiRegistry()
+    return client.emoji_registry
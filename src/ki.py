@@ -3,11 +3,18 @@
 
 # Imports
 import os
+import gzip
 import json
+import shutil
 import logging
 import datetime
 import random
 import time
+import hashlib
+import re
+import heapq
+import asyncio
+import contextvars
 from os.path import join, dirname, abspath
 import collections  # Für die Chat-History-Verwaltung
 
@@ -18,12 +25,16 @@ import aiohttp
 
 # Memory System Import
 from memory import MemoryManager
+from ki_keywords import scan_message, COMPLEX_PATTERNS, TOPIC_KEYWORDS
+from ki_prefilter import KIPrefilter
 
 # Pfade für Charakterdaten und Logs
 CHAR_PATH = join(dirname(abspath(__file__)), 'ki', 'drache.json')
 LOGS_DIR = join(dirname(abspath(__file__)), 'ki', 'logs')
 STATS_PATH = join(LOGS_DIR, 'stats.json')
-SESSIONS_PATH = join(LOGS_DIR, 'sessions.json')
+SESSIONS_PATH = join(LOGS_DIR, 'sessions.json')  # Altes Format, wird nur noch gelesen
+SESSIONS_SNAPSHOT_PATH = join(LOGS_DIR, 'sessions.snapshot')
+SESSIONS_JOURNAL_PATH = join(LOGS_DIR, 'sessions.journal')
 
 # Stellen Sie sicher, dass das Logs-Verzeichnis existiert
 os.makedirs(LOGS_DIR, exist_ok=True)
@@ -31,66 +42,413 @@ os.makedirs(LOGS_DIR, exist_ok=True)
 # Konfiguration für Sessions
 MAX_HISTORY_LENGTH = 10  # Anzahl der zu speichernden Nachrichten pro Benutzer
 # Rate Limit Konfiguration entfernt - alle Benutzer haben unbegrenzten Zugriff
+SESSION_COMPACTION_MINUTES = float(os.environ.get('KI_SESSION_COMPACTION_MINUTES', 5))  # Intervall für Snapshot + Journal-Kürzung
+
+# Konfiguration für den HTTP-Client zu OpenRouter (Connection-Pool, Timeouts)
+HTTP_POOL_LIMIT = int(os.environ.get('KI_HTTP_POOL_LIMIT', 20))  # Maximale Verbindungen insgesamt
+HTTP_POOL_LIMIT_PER_HOST = int(os.environ.get('KI_HTTP_POOL_LIMIT_PER_HOST', 10))  # Maximale Verbindungen pro Host
+HTTP_DNS_CACHE_TTL = int(os.environ.get('KI_HTTP_DNS_CACHE_TTL', 300))  # DNS-Cache in Sekunden
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get('KI_HTTP_KEEPALIVE_TIMEOUT', 60))  # Idle-Verbindungen offen halten
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('KI_HTTP_CONNECT_TIMEOUT', 10))  # Verbindungsaufbau inkl. TLS
+HTTP_READ_TIMEOUT = float(os.environ.get('KI_HTTP_READ_TIMEOUT', 120))  # Maximale Pause zwischen zwei Lesevorgängen
+HTTP_LATENCY_SAMPLES = 500  # Anzahl der gespeicherten Messwerte für p50/p95
+
+# Rollierende Zusammenfassung älterer Gespräche im Langzeit-Memory
+SUMMARY_TRIGGER_TURNS = int(os.environ.get('KI_SUMMARY_TRIGGER_TURNS', 12))  # Ab so vielen Rohrunden zusammenfassen
+SUMMARY_KEEP_TURNS = 3  # Letzte Runden bleiben roh (werden von get_memory_context genutzt)
+SUMMARY_MAX_CHARS = int(os.environ.get('KI_SUMMARY_MAX_CHARS', 1200))
+SUMMARY_MIN_BUCKET_TOKENS = 2  # LLM nur nutzen, wenn genug Kontingent für User-Anfragen übrig bleibt
+SUMMARY_PROMPT = (
+    "Du fasst Gespräche zwischen einem Discord-User und dem Bot \"Drache\" zusammen. "
+    "Schreibe auf Deutsch höchstens 8 kurze Stichpunkte mit den wichtigsten Infos über den User "
+    "(Name, Interessen, Lebensumstände, wiederkehrende Themen, offene Fragen). "
+    "Übernimm Wichtiges aus der bisherigen Zusammenfassung, lass Smalltalk und Beleidigungen weg."
+)
+
+# Chat-Completions-Endpunkt (für Lasttests auf einen lokalen Ersatz umstellbar)
+OPENROUTER_BASE_URL = os.environ.get('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1/chat/completions')
+
+# Modell-Routing: geordnete Modell-Liste, Failover und optionale Hedge-Anfragen
+KI_MODELS = [model.strip() for model in os.environ.get(
+    'KI_MODELS', 'moonshotai/kimi-k2:free,qwen/qwen3-14b:free'
+).split(',') if model.strip()]
+KI_HEDGE_AFTER = float(os.environ.get('KI_HEDGE_AFTER', 0))  # Sekunden bis zur Hedge-Anfrage, 0 = aus
+KI_MODEL_COOLDOWN = float(os.environ.get('KI_MODEL_COOLDOWN', 30))  # Pause nach Fehler, wächst mit Fehlerserie
+KI_MODEL_ERROR_WINDOW = 20  # Letzte Ergebnisse pro Modell für die Fehlerquote
+KI_MODEL_MAX_ERROR_RATE = 0.5  # Ab dieser Fehlerquote wird ein Modell nach hinten sortiert
+KI_MODEL_SLOW_P50 = float(os.environ.get('KI_MODEL_SLOW_P50', 20))  # Sekunden, langsamere Modelle nach hinten
+
+# Upstream-Schutz: Token-Bucket passend zum OpenRouter-Kontingent und Circuit Breaker
+KI_RATE_LIMIT_PER_MINUTE = float(os.environ.get('KI_RATE_LIMIT_PER_MINUTE', 20))  # Anfragen pro Minute
+KI_RATE_LIMIT_BURST = int(os.environ.get('KI_RATE_LIMIT_BURST', 5))  # Kurzzeitig erlaubte Spitzen
+KI_RATE_LIMIT_MAX_WAIT = float(os.environ.get('KI_RATE_LIMIT_MAX_WAIT', 5))  # Sekunden, danach sofort ablehnen
+KI_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('KI_BREAKER_FAILURE_THRESHOLD', 5))  # Fehler in Folge bis "offen"
+KI_BREAKER_OPEN_SECONDS = float(os.environ.get('KI_BREAKER_OPEN_SECONDS', 30))  # Erste Sperrzeit, verdoppelt sich
+KI_BREAKER_MAX_OPEN_SECONDS = 600
+UPSTREAM_UNAVAILABLE_MESSAGE = "Tut mir leid, mein Kopf braucht grad ne Pause. Probier's in ein paar Minuten nochmal."
+
+# Token-Kontingente pro User und Server (aus "usage" von OpenRouter), 0 = unbegrenzt
+KI_QUOTA_USER_TOKENS_PER_HOUR = int(os.environ.get('KI_QUOTA_USER_TOKENS_PER_HOUR', 20000))
+KI_QUOTA_USER_TOKENS_PER_DAY = int(os.environ.get('KI_QUOTA_USER_TOKENS_PER_DAY', 100000))
+KI_QUOTA_GUILD_TOKENS_PER_HOUR = int(os.environ.get('KI_QUOTA_GUILD_TOKENS_PER_HOUR', 200000))
+KI_QUOTA_GUILD_TOKENS_PER_DAY = int(os.environ.get('KI_QUOTA_GUILD_TOKENS_PER_DAY', 1000000))
+KI_QUOTA_WINDOWS = {"hour": (3600, 60), "day": (86400, 3600)}  # Fenster -> (Länge, Zeitscheibe) in Sekunden
+KI_QUOTA_PURGE_INTERVAL = 300  # Sekunden zwischen zwei Aufräumläufen
+QUOTA_EXCEEDED_MESSAGE = "Etzala is aber gut, ich hab heut scho genug gelabert mit dir. Komm in {minutes} Minuten wieder, meddl off"
+GUILD_QUOTA_EXCEEDED_MESSAGE = "Auf dem Server hier wurd mir heut scho zu viel gelabert. In {minutes} Minuten geht's weiter."
+
+# Wem die Token-Kosten der aktuellen KI-Anfrage zugerechnet werden: (user_id, guild_id)
+KI_USAGE_OWNER = contextvars.ContextVar("ki_usage_owner", default=None)
+
+# Streaming-Konfiguration: Antwort nach dem ersten Satz posten und danach gedrosselt editieren
+KI_STREAMING = os.environ.get('KI_STREAMING', 'true').lower() == 'true'
+STREAM_EDIT_INTERVAL = float(os.environ.get('KI_STREAM_EDIT_INTERVAL', 1.5))  # Sekunden zwischen zwei Edits (Discord-Rate-Limit)
+STREAM_FIRST_POST_CHARS = 120  # Spätestens ab dieser Länge posten, auch ohne Satzende
+DISCORD_MESSAGE_LIMIT = 2000  # Maximale Zeichen pro Discord-Nachricht
+SENTENCE_END_PATTERN = re.compile(r'[.!?…]\s|\n')
+
+# Scheduler-Konfiguration: globale Parallelität, Warteschlangenlänge und Gewichte pro Server
+KI_MAX_CONCURRENT = int(os.environ.get('KI_MAX_CONCURRENT', 4))  # Gleichzeitige Upstream-Anfragen
+KI_MAX_QUEUE_DEPTH = int(os.environ.get('KI_MAX_QUEUE_DEPTH', 20))  # Wartende Anfragen, danach "busy"
+KI_SCHEDULER_WEIGHTS = os.environ.get('KI_SCHEDULER_WEIGHTS', '')  # Format: "dm:1,<guild_id>:2"
+BUSY_MESSAGE = "Boah, grad is echt zu viel los bei mir. Probier's gleich nochmal, meddl off"
+
+# Token-Budget für den Prompt und adaptive Antwortlänge
+PROMPT_TOKEN_BUDGET = int(os.environ.get('KI_PROMPT_TOKEN_BUDGET', 4000))  # Inkl. System-Prompt
+MIN_REPLY_TOKENS = int(os.environ.get('KI_MIN_REPLY_TOKENS', 512))
+MAX_REPLY_TOKENS = int(os.environ.get('KI_MAX_REPLY_TOKENS', 2048))
+MESSAGE_TOKEN_OVERHEAD = 4  # Geschätzter Overhead pro Chat-Nachricht (Rolle, Trenner)
+
+# Antwort-Cache für kontextfreie Kurz-Prompts ("meddl", "wer bist du")
+RESPONSE_CACHE_SIZE = int(os.environ.get('KI_RESPONSE_CACHE_SIZE', 256))  # Maximale Einträge (LRU)
+RESPONSE_CACHE_TTL = float(os.environ.get('KI_RESPONSE_CACHE_TTL', 600))  # Gültigkeit in Sekunden
+RESPONSE_CACHE_MAX_PROMPT_CHARS = 60  # Nur kurze, generische Prompts werden gecacht
+
+# Intervall in Sekunden, in dem die Charakterdatei auf Änderungen geprüft wird
+PROMPT_RELOAD_CHECK_INTERVAL = float(os.environ.get('KI_PROMPT_RELOAD_INTERVAL', 5))
+
+# Hintergrund-Pipeline für Arbeit nach dem Senden der Antwort (Speichern, Fakten, Logs)
+KI_BACKGROUND_WORKERS = int(os.environ.get('KI_BACKGROUND_WORKERS', 2))
+KI_BACKGROUND_QUEUE_SIZE = int(os.environ.get('KI_BACKGROUND_QUEUE_SIZE', 200))
+KI_BACKGROUND_MAX_RETRIES = 3  # Wiederholungen pro Job nach einem Fehler
+KI_BACKGROUND_RETRY_DELAY = 1.0  # Sekunden, verdoppelt sich pro Versuch
+
+def percentile(values, pct):
+    """Gibt das pct-Perzentil (0-100) einer Liste von Messwerten zurück"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+# Zeitfenster für die Verteilung aktiver Benutzer (Sekunden)
+ACTIVITY_WINDOWS = {"1h": 3600, "24h": 86400, "7d": 604800}
+
+# Inkrementeller Index der letzten Aktivität pro Benutzer
+class ActivityIndex:
+    """
+    Zählt aktive Benutzer pro Zeitfenster ohne alle Sessions zu durchlaufen.
+    Pro Fenster gibt es einen Min-Heap mit (Zeitpunkt, Benutzer); abgelaufene
+    Einträge werden bei der Abfrage entfernt. Veraltete Heap-Einträge (der
+    Benutzer war danach erneut aktiv) werden dabei einfach verworfen.
+    """
+    def __init__(self, windows=ACTIVITY_WINDOWS):
+        self.windows = windows
+        self.last_activity = {}  # user_id -> Unix-Zeit der letzten Aktivität
+        self._heaps = {name: [] for name in windows}
+        self._active = {name: set() for name in windows}
+
+    def record(self, user_id, timestamp=None):
+        """Registriert eine Aktivität eines Benutzers (O(log n))"""
+        timestamp = time.time() if timestamp is None else timestamp
+        if timestamp <= self.last_activity.get(user_id, 0):
+            return
+        self.last_activity[user_id] = timestamp
+        for name in self.windows:
+            heapq.heappush(self._heaps[name], (timestamp, user_id))
+            self._active[name].add(user_id)
+
+    def _expire(self, name, now):
+        """Entfernt alle Einträge, die älter als das Zeitfenster sind"""
+        heap = self._heaps[name]
+        cutoff = now - self.windows[name]
+        while heap and heap[0][0] < cutoff:
+            timestamp, user_id = heapq.heappop(heap)
+            if self.last_activity.get(user_id) == timestamp:
+                self._active[name].discard(user_id)
+
+    def remove(self, user_id):
+        """Vergisst einen Benutzer; seine Heap-Einträge verfallen beim nächsten Ablauf"""
+        self.last_activity.pop(user_id, None)
+        for active in self._active.values():
+            active.discard(user_id)
+
+    def count(self, name, now=None):
+        """Gibt die Anzahl aktiver Benutzer im Zeitfenster zurück (amortisiert O(log n))"""
+        self._expire(name, time.time() if now is None else now)
+        return len(self._active[name])
+
+    def distribution(self, now=None):
+        """Gibt die Anzahl aktiver Benutzer für alle Zeitfenster zurück"""
+        now = time.time() if now is None else now
+        return {name: self.count(name, now) for name in self.windows}
+
+def _iso_to_epoch(timestamp):
+    """Wandelt einen ISO-Zeitstempel in Unix-Zeit um (0 bei ungültigen Werten)"""
+    try:
+        return datetime.datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return 0
 
 # Session Manager für Benutzerinteraktionen und Rate-Limits
 class SessionManager:
+    """
+    Hält die letzten Interaktionen pro Benutzer. Neue Interaktionen werden
+    nur an ein Journal (JSON-Lines) angehängt; ein Hintergrund-Task fasst
+    Snapshot und Journal regelmäßig zu einem neuen Snapshot zusammen.
+    Beim Start werden Snapshot und Journal wieder eingespielt, die
+    Historie eines Benutzers wird aber erst beim ersten Zugriff dekodiert.
+    """
     def __init__(self):
-        self.user_sessions = {}  # Speichert Sitzungsdaten pro Benutzer
+        self.user_sessions = {}  # Speichert Sitzungsdaten pro Benutzer (dekodiert)
+        self._raw_sessions = {}  # Noch nicht dekodierte Historie aus dem Snapshot (user_id -> JSON-String)
         self.rate_limits = {}  # Speichert Rate-Limit-Informationen pro Benutzer
+        self._journal = None  # Offenes Journal im Append-Modus
+        self._seq = 0  # Fortlaufende Nummer des letzten Journal-Eintrags
+        self._journal_entries = 0  # Einträge seit der letzten Kompaktierung
+        self._compaction = None  # Laufender Schreib-Thread der Kompaktierung
+        self.activity_index = ActivityIndex()  # Letzte Aktivität pro Benutzer für aktive Sessions
+
+    def _get_session(self, user_id, create=False):
+        """Gibt die Deque eines Benutzers zurück und dekodiert sie beim ersten Zugriff"""
+        sessions = self.user_sessions.get(user_id)
+        if sessions is None:
+            raw = self._raw_sessions.pop(user_id, None)
+            if raw is not None:
+                try:
+                    sessions = collections.deque(json.loads(raw), maxlen=MAX_HISTORY_LENGTH)
+                except Exception as e:
+                    logging.error(f"Fehlerhafte Session für User {user_id}: {str(e)}")
+                    sessions = collections.deque(maxlen=MAX_HISTORY_LENGTH)
+                self.user_sessions[user_id] = sessions
+            elif create:
+                sessions = collections.deque(maxlen=MAX_HISTORY_LENGTH)
+                self.user_sessions[user_id] = sessions
+        return sessions
+
+    def _iter_user_ids(self):
+        """Gibt alle bekannten Benutzer-IDs zurück (dekodiert und noch nicht dekodiert)"""
+        return list(self.user_sessions.keys()) + list(self._raw_sessions.keys())
 
     def get_user_context(self, user_id):
         """Gibt den gespeicherten Kontext für einen Benutzer zurück"""
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = collections.deque(maxlen=MAX_HISTORY_LENGTH)
-        return list(self.user_sessions[user_id])
+        return list(self._get_session(user_id, create=True))
 
     def add_interaction(self, user_id, prompt, response):
         """Speichert eine neue Interaktion im Benutzerkontext"""
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = collections.deque(maxlen=MAX_HISTORY_LENGTH)
-
-        self.user_sessions[user_id].append({
+        entry = {
             "timestamp": datetime.datetime.now().isoformat(),
             "user_message": prompt,
             "bot_response": response
-        })
+        }
+        self._get_session(user_id, create=True).append(entry)
+        self.activity_index.record(user_id)
+
+        # Nur an das Journal anhängen statt alle Sessions neu zu schreiben
+        self._append_journal(user_id, entry)
+
+    def _append_journal(self, user_id, entry):
+        """Hängt eine Interaktion als JSON-Zeile an das Journal an"""
+        try:
+            if self._journal is None:
+                self._journal = open(SESSIONS_JOURNAL_PATH, 'a', encoding='utf-8')
+            self._seq += 1
+            record = {"seq": self._seq, "user_id": user_id, **entry}
+            self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._journal.flush()
+            self._journal_entries += 1
+        except Exception as e:
+            logging.error(f"Error writing session journal: {str(e)}")
 
-        # Save sessions periodically
-        self.save_sessions()
+    def _replay_journal(self, path, snapshot_seq):
+        """Spielt ein Journal auf die geladenen Sessions ein (Einträge bis snapshot_seq werden übersprungen)"""
+        replayed = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Unvollständige letzte Zeile nach einem Absturz
+                    continue
+                seq = record.pop("seq", 0)
+                self._seq = max(self._seq, seq)
+                if seq <= snapshot_seq:
+                    continue
+                user_id = record.pop("user_id")
+                self._get_session(user_id, create=True).append(record)
+                self.activity_index.record(user_id, _iso_to_epoch(record.get("timestamp")))
+                replayed += 1
+        return replayed
 
     def load_sessions(self):
-        """Load user sessions from file"""
+        """Load user sessions from snapshot and journal"""
         try:
-            if os.path.exists(SESSIONS_PATH):
+            snapshot_seq = 0
+            if os.path.exists(SESSIONS_SNAPSHOT_PATH):
+                # Snapshot-Format: erste Zeile "#seq\t<n>", danach "<user_id>\t<letzte Aktivität>\t<JSON-Liste>"
+                with open(SESSIONS_SNAPSHOT_PATH, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        parts = line.rstrip("\n").split("\t", 2)
+                        if parts[0] == "#seq":
+                            snapshot_seq = int(parts[1])
+                        elif len(parts) == 3:
+                            user_id = int(parts[0])
+                            self._raw_sessions[user_id] = parts[2]
+                            self.activity_index.record(user_id, float(parts[1]))
+            elif os.path.exists(SESSIONS_PATH):
+                # Altes Format (komplette sessions.json) einmalig übernehmen
                 with open(SESSIONS_PATH, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                     for user_id, sessions in data.items():
                         self.user_sessions[int(user_id)] = collections.deque(
                             sessions, maxlen=MAX_HISTORY_LENGTH
                         )
-                logging.info(f"Loaded {len(self.user_sessions)} user sessions")
+                        if sessions:
+                            self.activity_index.record(int(user_id), _iso_to_epoch(sessions[-1]["timestamp"]))
+            self._seq = snapshot_seq
+
+            # Journale einspielen: erst ein evtl. unterbrochenes Kompaktieren, dann das aktuelle
+            replayed = 0
+            for path in (SESSIONS_JOURNAL_PATH + ".compacting", SESSIONS_JOURNAL_PATH):
+                if os.path.exists(path):
+                    replayed += self._replay_journal(path, snapshot_seq)
+            self._journal_entries = replayed
+
+            logging.info(f"Loaded {self.get_total_users()} user sessions ({replayed} journal entries replayed)")
         except Exception as e:
             logging.error(f"Error loading sessions: {str(e)}")
 
-    def save_sessions(self):
-        """Save user sessions to file"""
+    def _prepare_snapshot(self):
+        """Rotiert das Journal und erstellt die Snapshot-Zeilen aus dem aktuellen Stand"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        compacting_path = SESSIONS_JOURNAL_PATH + ".compacting"
+        if os.path.exists(SESSIONS_JOURNAL_PATH):
+            if os.path.exists(compacting_path):
+                # Rest einer fehlgeschlagenen Kompaktierung: anhängen statt überschreiben
+                with open(compacting_path, 'ab+') as target, open(SESSIONS_JOURNAL_PATH, 'rb') as source:
+                    target.seek(0, os.SEEK_END)
+                    if target.tell():
+                        target.seek(-1, os.SEEK_END)
+                        if target.read(1) != b"\n":
+                            target.write(b"\n")
+                    shutil.copyfileobj(source, target)
+                os.remove(SESSIONS_JOURNAL_PATH)
+            else:
+                os.replace(SESSIONS_JOURNAL_PATH, compacting_path)
+
+        lines = [f"#seq\t{self._seq}\n"]
+        last_activity = self.activity_index.last_activity
+        for user_id, sessions in self.user_sessions.items():
+            if sessions:
+                lines.append(f"{user_id}\t{last_activity.get(user_id, 0)}\t{json.dumps(list(sessions), ensure_ascii=False)}\n")
+        for user_id, raw in self._raw_sessions.items():
+            lines.append(f"{user_id}\t{last_activity.get(user_id, 0)}\t{raw}\n")
+        self._journal_entries = 0
+        return lines
+
+    @staticmethod
+    def _write_snapshot(lines):
+        """Schreibt den Snapshot atomar und entfernt das rotierte Journal"""
+        temp_path = SESSIONS_SNAPSHOT_PATH + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, SESSIONS_SNAPSHOT_PATH)
+        if os.path.exists(SESSIONS_JOURNAL_PATH + ".compacting"):
+            os.remove(SESSIONS_JOURNAL_PATH + ".compacting")
+
+    async def compact(self):
+        """Fasst Snapshot und Journal zusammen; das Schreiben läuft in einem Thread"""
+        # Nie zwei Snapshots gleichzeitig schreiben (periodischer Task und Aufbewahrungslauf)
+        await self.wait_for_compaction()
+        if self._journal_entries == 0 and os.path.exists(SESSIONS_SNAPSHOT_PATH):
+            return
         try:
-            # Convert deques to lists for JSON serialization
-            sessions_data = {}
-            for user_id, sessions in self.user_sessions.items():
-                sessions_data[str(user_id)] = list(sessions)
+            lines = self._prepare_snapshot()
+            self._compaction = asyncio.ensure_future(asyncio.to_thread(self._write_snapshot, lines))
+            # Ein abgebrochener Aufrufer bricht den Thread nicht ab, wait_for_compaction wartet darauf
+            await asyncio.shield(self._compaction)
+            logging.info(f"Session-Snapshot geschrieben ({len(lines) - 1} Benutzer)")
+        except Exception as e:
+            logging.error(f"Error compacting sessions: {str(e)}")
 
-            with open(SESSIONS_PATH, 'w', encoding='utf-8') as f:
-                json.dump(sessions_data, f, ensure_ascii=False, indent=2)
+    async def wait_for_compaction(self):
+        """Wartet, bis ein laufender Snapshot-Schreibvorgang abgeschlossen ist"""
+        if self._compaction is not None and not self._compaction.done():
+            await asyncio.wait({self._compaction})
+
+    def save_sessions(self):
+        """Save user sessions to file (synchrones Kompaktieren, z.B. beim Herunterfahren)"""
+        try:
+            self._write_snapshot(self._prepare_snapshot())
         except Exception as e:
             logging.error(f"Error saving sessions: {str(e)}")
 
+    def prune_inactive(self, max_age_days, forget_user_ids=()):
+        """
+        Entfernt Sessions ohne Aktivität seit max_age_days Tagen (0 = keine)
+        sowie die Benutzer in forget_user_ids. Wirksam auf der Platte wird das
+        mit dem nächsten Snapshot (compact).
+
+        Returns:
+            tuple: (entfernte Benutzer, geschätzte freigegebene Bytes)
+        """
+        cutoff = time.time() - max_age_days * 86400 if max_age_days > 0 else None
+        forget = {int(user_id) for user_id in forget_user_ids if str(user_id).isdigit()}
+        last_activity = self.activity_index.last_activity
+        victims = [
+            user_id for user_id in self._iter_user_ids()
+            if user_id in forget or (cutoff is not None and last_activity.get(user_id, 0) < cutoff)
+        ]
+        freed = 0
+        for user_id in victims:
+            raw = self._raw_sessions.pop(user_id, None)
+            if raw is not None:
+                freed += len(raw.encode('utf-8'))
+            sessions = self.user_sessions.pop(user_id, None)
+            if sessions:
+                freed += len(json.dumps(list(sessions), ensure_ascii=False).encode('utf-8'))
+            self.activity_index.remove(user_id)
+        if victims:
+            # Erzwingt einen neuen Snapshot beim nächsten compact()
+            self._journal_entries += 1
+        return len(victims), freed
+
+    @staticmethod
+    def archive_legacy_file(archive_dir):
+        """
+        Komprimiert die alte sessions.json ins Archiv, sobald ein Snapshot
+        existiert (sie wird dann nicht mehr gelesen).
+
+        Returns:
+            int: freigegebene Bytes
+        """
+        if not (os.path.exists(SESSIONS_SNAPSHOT_PATH) and os.path.exists(SESSIONS_PATH)):
+            return 0
+        os.makedirs(archive_dir, exist_ok=True)
+        target = join(archive_dir, f"sessions-{datetime.date.today().isoformat()}.json.gz")
+        with open(SESSIONS_PATH, 'rb') as source, gzip.open(target, 'wb', compresslevel=9) as archived:
+            shutil.copyfileobj(source, archived)
+        freed = os.path.getsize(SESSIONS_PATH) - os.path.getsize(target)
+        os.remove(SESSIONS_PATH)
+        return max(0, freed)
+
     def get_user_stats(self, user_id):
         """Gibt Statistiken für einen bestimmten Benutzer zurück"""
-        if user_id not in self.user_sessions:
-            return {"total_messages": 0, "first_interaction": None, "last_interaction": None}
-
-        sessions = list(self.user_sessions[user_id])
+        sessions = self._get_session(user_id)
         if not sessions:
             return {"total_messages": 0, "first_interaction": None, "last_interaction": None}
 
@@ -102,22 +460,15 @@ class SessionManager:
 
     def get_total_users(self):
         """Gibt die Gesamtanzahl der Benutzer mit Sessions zurück"""
-        return len(self.user_sessions)
+        return len(self.user_sessions) + len(self._raw_sessions)
 
     def get_active_sessions(self):
-        """Gibt die Anzahl aktiver Sessions zurück (Benutzer mit kürzlicher Aktivität)"""
-        active_count = 0
-        current_time = datetime.datetime.now()
+        """Gibt die Anzahl aktiver Sessions zurück (Benutzer mit Aktivität in den letzten 24 Stunden)"""
+        return self.activity_index.count("24h")
 
-        for user_id, sessions in self.user_sessions.items():
-            if sessions:
-                last_session = sessions[-1]
-                last_time = datetime.datetime.fromisoformat(last_session["timestamp"])
-                # Als aktiv betrachten wenn letzte Interaktion innerhalb von 24 Stunden war
-                if (current_time - last_time).total_seconds() < 86400:
-                    active_count += 1
-
-        return active_count
+    def get_activity_distribution(self):
+        """Gibt die Anzahl aktiver Benutzer in den letzten 1h, 24h und 7 Tagen zurück"""
+        return self.activity_index.distribution()
 
     def check_rate_limit(self, user_id, client=None):
         """Rate-Limit-Prüfung ist deaktiviert, außer für explizit gesperrte User."""
@@ -128,89 +479,660 @@ class SessionManager:
         # Keine Rate-Limits mehr - alle Benutzer können unbegrenzt Nachrichten senden
         return True, 0
 
-# ElizaOS API Client für OpenRouter
-class ElizaOSClient:
-    def __init__(self, api_key):
-        self.api_key = api_key
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://github.com/ninjazan420/drachenlod-bot",
-            "X-Title": "Drache KI Discord Bot"
+def parse_scheduler_weights(weights_str):
+    """Parst Gewichte im Format "dm:1,<guild_id>:2" in ein Dictionary"""
+    weights = {}
+    for entry in weights_str.split(','):
+        if ':' not in entry:
+            continue
+        key, weight = entry.rsplit(':', 1)
+        try:
+            weights[key.strip()] = max(0.1, float(weight))
+        except ValueError:
+            logging.error(f"Ungültiges Scheduler-Gewicht: {entry}")
+    return weights
+
+# Warteschlange für KI-Anfragen mit fairer Verteilung zwischen Servern/DMs
+class KIRequestScheduler:
+    """
+    Begrenzt die Anzahl gleichzeitiger Upstream-Anfragen und verteilt freie
+    Plätze per Weighted Fair Queuing (Start-Time Fair Queuing) auf die
+    Server bzw. DMs. Ein einzelner aktiver Server kann so nicht alle Plätze
+    blockieren. Ist die Warteschlange voll, wird sofort abgelehnt.
+    """
+    def __init__(self, max_concurrent=KI_MAX_CONCURRENT, max_queue_depth=KI_MAX_QUEUE_DEPTH, weights=None):
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.weights = weights if weights is not None else parse_scheduler_weights(KI_SCHEDULER_WEIGHTS)
+        self._heap = []  # (finish_tag, seq, start_tag, future)
+        self._last_finish = {}  # Letzter Finish-Tag pro Schlüssel
+        self._virtual_time = 0.0
+        self._seq = 0
+        self._in_flight = 0
+        self._waiting = 0
+
+        # Metriken
+        self.wait_times = collections.deque(maxlen=HTTP_LATENCY_SAMPLES)
+        self.accepted = 0
+        self.rejected = 0
+        self.max_depth_seen = 0
+
+    @staticmethod
+    def key_for_message(message):
+        """Gibt den Fairness-Schlüssel für eine Nachricht zurück (Server-ID oder "dm")"""
+        return str(message.guild.id) if message.guild else "dm"
+
+    async def acquire(self, key):
+        """
+        Wartet auf einen freien Platz für eine Upstream-Anfrage.
+
+        Returns:
+            bool: True wenn ein Platz belegt wurde, False wenn die Warteschlange voll ist
+        """
+        if self._in_flight < self.max_concurrent and self._waiting == 0:
+            self._in_flight += 1
+            self.accepted += 1
+            self.wait_times.append(0.0)
+            return True
+
+        if self._waiting >= self.max_queue_depth:
+            self.rejected += 1
+            return False
+
+        weight = self.weights.get(key, 1.0)
+        start_tag = max(self._virtual_time, self._last_finish.get(key, 0.0))
+        finish_tag = start_tag + 1.0 / weight
+        self._last_finish[key] = finish_tag
+
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._heap, (finish_tag, self._seq, start_tag, future))
+        self._waiting += 1
+        self.max_depth_seen = max(self.max_depth_seen, self._waiting)
+
+        enqueued_at = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Platz wurde bereits vergeben, aber der Aufrufer ist weg
+                self.release()
+            else:
+                self._waiting -= 1
+            raise
+
+        self.accepted += 1
+        self.wait_times.append(time.perf_counter() - enqueued_at)
+        return True
+
+    def release(self):
+        """Gibt einen Platz frei und vergibt ihn an die nächste Anfrage in der Warteschlange"""
+        self._in_flight = max(0, self._in_flight - 1)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Vergibt freie Plätze in der Reihenfolge der Finish-Tags"""
+        while self._heap and self._in_flight < self.max_concurrent:
+            finish_tag, _, start_tag, future = heapq.heappop(self._heap)
+            if future.cancelled():
+                continue
+            self._waiting -= 1
+            self._virtual_time = max(self._virtual_time, start_tag)
+            self._in_flight += 1
+            future.set_result(True)
+
+        # Alte Finish-Tags aufräumen, sobald keine Anfrage mehr wartet
+        if not self._heap and self._in_flight == 0:
+            self._last_finish.clear()
+
+    def get_stats(self):
+        """Gibt Metriken der Warteschlange zurück (Wartezeiten in Millisekunden)"""
+        wait_times = list(self.wait_times)
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "max_depth_seen": self.max_depth_seen,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "wait_p50_ms": round(percentile(wait_times, 50) * 1000, 1),
+            "wait_p95_ms": round(percentile(wait_times, 95) * 1000, 1)
         }
 
-    async def generate_response(self, prompt, character_context, chat_history=None):
+def normalize_prompt(prompt):
+    """Normalisiert einen Prompt für den Cache (Kleinschreibung, ohne Mentions/Satzzeichen)"""
+    text = re.sub(r'<@!?\d+>', ' ', prompt.lower())
+    text = re.sub(r'[^\w\s]', ' ', text)
+    # Gedehnte Wörter vereinheitlichen ("meddlllll" und "meddl" -> "medl")
+    text = re.sub(r'(.)\1+', r'\1', text)
+    return ' '.join(text.split())
+
+# Cache für Antworten auf wiederholte, kontextfreie Prompts
+class ResponseCache:
+    """
+    LRU-Cache mit TTL für Antworten auf kurze, generische Prompts.
+    Gleiche Prompts, die bereits angefragt werden, teilen sich eine
+    einzige Upstream-Anfrage (Single-Flight).
+    """
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()  # key -> (Ablaufzeit, Antwort)
+        self._in_flight = {}  # key -> Future der laufenden Anfrage
+
+        # Metriken
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(prompt):
+        """Gibt den Cache-Schlüssel zurück oder None, wenn der Prompt nicht gecacht werden soll"""
+        normalized = normalize_prompt(prompt)
+        if not normalized or len(normalized) > RESPONSE_CACHE_MAX_PROMPT_CHARS:
+            return None
+        return normalized
+
+    def get(self, key):
+        """Gibt eine gültige Antwort aus dem Cache zurück oder None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def put(self, key, response):
+        """Speichert eine Antwort und verdrängt bei Bedarf den ältesten Eintrag"""
+        self._entries[key] = (time.monotonic() + self.ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_fetch(self, key, fetch):
+        """
+        Gibt die gecachte Antwort zurück oder ruft fetch() genau einmal pro Schlüssel auf.
+        fetch muss (Antwort, ok) liefern; nur erfolgreiche Antworten werden gecacht.
+        Liefert fetch None als Antwort, wird nichts gespeichert.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        if key in self._in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
         try:
-            # Charakterdaten laden
+            response, ok = await fetch()
+            if ok and response:
+                self.put(key, response)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            # Exception als abgerufen markieren, falls niemand wartet
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def get_stats(self):
+        """Gibt Trefferquote und Größe des Caches zurück"""
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups * 100, 1) if lookups else 0.0
+        }
+
+class KIBackgroundPipeline:
+    """
+    Begrenzte Job-Queue mit Worker-Tasks für alles, was nicht vor der
+    Antwort passieren muss (Session/Memory speichern, Fact-Extraktion,
+    Statistiken, Logging-Embeds). Fehlgeschlagene Jobs werden mit
+    exponentiellem Backoff erneut eingereiht, sofern sie wiederholbar sind
+    (retry=False für Jobs, die bei einem Abbruch mittendrin doppelt wirken
+    würden). Lang laufende Jobs wie LLM-Zusammenfassungen laufen über
+    spawn() als eigene Tasks und belegen keinen Worker.
+    """
+    def __init__(self, workers=KI_BACKGROUND_WORKERS, max_queue=KI_BACKGROUND_QUEUE_SIZE):
+        self.worker_count = max(1, workers)
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self._workers = []
+        self._retry_tasks = set()
+        self._spawned = set()  # Eigenständige Tasks aus spawn()
+        self.submitted = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self.backpressure = 0
+        self.max_depth_seen = 0
+        self.job_times = collections.deque(maxlen=HTTP_LATENCY_SAMPLES)  # Sekunden pro Job
+        self.reply_latencies = collections.deque(maxlen=HTTP_LATENCY_SAMPLES)  # API fertig -> Antwort gesendet
+
+    def _ensure_workers(self):
+        """Startet die Worker beim ersten Job (benötigt eine laufende Event-Loop)"""
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.worker_count:
+            # Leerer Kontext: sonst erbt der Worker KI_USAGE_OWNER der Anfrage, die ihn gestartet hat,
+            # und alle Hintergrund-Aufrufe (z.B. Zusammenfassungen) würden diesem User angerechnet
+            self._workers.append(contextvars.Context().run(asyncio.create_task, self._worker()))
+
+    async def submit(self, name, func, *args, retry=True):
+        """
+        Reiht einen Job ein. func darf synchron oder eine Coroutine-Funktion sein.
+        Ist die Queue voll, wartet der Aufrufer (die Antwort ist dann bereits gesendet).
+        Mit retry=False wird ein fehlgeschlagener Job nicht wiederholt.
+        """
+        self._ensure_workers()
+        job = (name, func, args, 0 if retry else KI_BACKGROUND_MAX_RETRIES)
+        self.submitted += 1
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.backpressure += 1
+            await self.queue.put(job)
+        self.max_depth_seen = max(self.max_depth_seen, self.queue.qsize())
+
+    def spawn(self, name, func, *args):
+        """
+        Startet einen lang laufenden Job (z.B. mit LLM-Aufruf) als eigenen Task
+        statt in einem Worker. Wie die Worker ohne KI_USAGE_OWNER der Anfrage;
+        drain() wartet beim Beenden auch auf diese Tasks. Keine Wiederholung.
+        """
+        self.submitted += 1
+        task = contextvars.Context().run(asyncio.create_task, self._run_spawned(name, func, args))
+        self._spawned.add(task)
+        task.add_done_callback(self._spawned.discard)
+        return task
+
+    async def _run_spawned(self, name, func, args):
+        start = time.perf_counter()
+        try:
+            await func(*args)
+            self.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logging.error(f"KI-Hintergrundjob '{name}' fehlgeschlagen: {e}")
+        finally:
+            self.job_times.append(time.perf_counter() - start)
+
+    def record_reply_latency(self, seconds):
+        """Zeit zwischen Rückgabe der API-Antwort und gesendeter Discord-Antwort"""
+        self.reply_latencies.append(seconds)
+
+    async def _worker(self):
+        while True:
+            name, func, args, attempt = await self.queue.get()
+            start = time.perf_counter()
             try:
-                with open(CHAR_PATH, 'r', encoding="utf-8") as f:
-                    character_data = json.load(f)
+                result = func(*args)
+                if asyncio.iscoroutine(result):
+                    await result
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logging.error(f"Fehler beim Laden der Charakterdaten: {str(e)}")
-                # Fallback-Charakterdaten mit erweiterten Informationen
-                character_data = {
-                    "name": "drache",
-                    "bio": [
-                        "Ich bin Rainer Winkler, ein fränkischer YouTuber, Musiker und Lebenskünstler.",
-                        "Seit Jahren bin ich auf der Plattform unterwegs und zeige den Leuten, wie das Leben wirklich läuft.",
-                        "Ich wohne auf meinem Grundstück, das für mich mehr ist als nur ein Haus – es ist eine Festung und ein Symbol für mein Durchhaltevermögen und meine Mission."
-                    ],
-                    "lore": [
-                        "Ich bin schon lange im Game und musste viel durchmachen.",
-                        "Vom Drachengame bis zu den ewigen Streitereien mit Hatern und Justiz – ich bin immer noch da.",
-                        "Mein Haus, die Schanze, wurde zum Zentrum meines Lebens, und trotz allem, was passiert ist, bin ich unbesiegt.",
-                        "Ich habe Bücher geschrieben, Lieder gemacht und sogar versucht, auf Tour zu gehen.",
-                        "Und die Geschichte ist noch lange nicht vorbei."
-                    ],
-                    "style": {
-                        "chat": [
-                            "Ich schreibe so, wie ich rede – locker, direkt und ohne viel Schnickschnack.",
-                            "Meistens bin ich entspannt, aber wenn es wieder um Hater geht, dann kann ich auch mal deutliche Worte finden.",
-                            "Ich rant manchmal ein bisschen, aber das gehört halt dazu, meddl off"
-                        ]
-                    },
-                    "knowledge": [
-                        "drachenlord",
-                        "rainer",
-                        "winkler",
-                        "r. winkler",
-                        "altschauerberg",
-                        "schanze",
-                        "discord",
-                        "nürnberg"
-                    ],
-                    "adjectives": [
-                        "direkt",
-                        "ehrlich",
-                        "kämpferisch",
-                        "missverstanden",
-                        "stur",
-                        "philosophisch",
-                        "emotional",
-                        "laut"
-                    ],
-                    "people": [
-                        "Marion",
-                        "Herr Müller",
-                        "Die Hater",
-                        "Meine Mods",
-                        "Der Richter",
-                        "Die Justiz"
-                    ],
-                    "topics": [
-                        "Mein Leben & Erlebnisse: Ich erzähle gern von meinem Alltag, meiner Vergangenheit und was mich so bewegt.",
-                        "Hater & Drachengame: Ein endloses Thema… ich kann stundenlang darüber reden, wie die Hater mich falsch verstehen und was für Aktionen die schon probiert haben.",
-                        "Meine Musik & Projekte: Ich bin Musiker und Liedermacher.",
-                        "Rede gern über meine Songs, meine Streaming- und Podcast-Projekte.",
-                        "Gerechtigkeit & Justiz: Ich habe oft Probleme mit dem Gesetz, aber ich halte dagegen.",
-                        "Die Wahrheit kommt ans Licht.",
-                        "Philosophie & Weisheiten: Ich bin ein Denker und rede oft über Moral, Loyalität und Ehrlichkeit."
-                    ]
-                }
-
-            # Erweiterten Kontext aus der Charakterdatei verwenden
-            system_prompt = f"""
+                if attempt < KI_BACKGROUND_MAX_RETRIES:
+                    self.retried += 1
+                    delay = KI_BACKGROUND_RETRY_DELAY * (2 ** attempt)
+                    logging.warning(f"KI-Hintergrundjob '{name}' fehlgeschlagen ({e}), neuer Versuch in {delay:.1f}s")
+                    task = asyncio.create_task(self._requeue((name, func, args, attempt + 1), delay))
+                    self._retry_tasks.add(task)
+                    task.add_done_callback(self._retry_tasks.discard)
+                else:
+                    self.failed += 1
+                    logging.error(f"KI-Hintergrundjob '{name}' endgültig fehlgeschlagen: {e}")
+            finally:
+                self.job_times.append(time.perf_counter() - start)
+                self.queue.task_done()
+
+    async def _requeue(self, job, delay):
+        await asyncio.sleep(delay)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logging.error(f"KI-Hintergrundjob '{job[0]}' verworfen: Warteschlange voll")
+
+    async def _wait_idle(self):
+        # Auch Jobs abwarten, die gerade auf ihren nächsten Versuch warten
+        while True:
+            await self.queue.join()
+            if not self._retry_tasks and not self._spawned:
+                return
+            await asyncio.wait(list(self._retry_tasks | self._spawned))
+
+    async def drain(self, timeout=10):
+        """Wartet beim Herunterfahren, bis alle eingereihten Jobs erledigt sind"""
+        if not self._workers and not self._spawned:
+            return
+        try:
+            await asyncio.wait_for(self._wait_idle(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"KI-Hintergrund-Pipeline: {self.queue.qsize()} Jobs beim Beenden nicht abgearbeitet")
+        for task in list(self._retry_tasks) + list(self._spawned) + self._workers:
+            task.cancel()
+        self._workers = []
+
+    def get_stats(self):
+        """Gibt Durchsatz, Fehler und Latenzen der Pipeline zurück"""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_depth_seen": self.max_depth_seen,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "backpressure": self.backpressure,
+            "job_p95_ms": round(percentile(list(self.job_times), 95) * 1000, 1),
+            "reply_latency_p50_ms": round(percentile(list(self.reply_latencies), 50) * 1000, 1),
+            "reply_latency_p95_ms": round(percentile(list(self.reply_latencies), 95) * 1000, 1)
+        }
+
+def _trim_summary(summary, max_chars=SUMMARY_MAX_CHARS):
+    """Kürzt eine Zusammenfassung von vorne (älteste Zeilen zuerst) auf max_chars"""
+    summary = summary.strip()
+    if len(summary) <= max_chars:
+        return summary
+    summary = summary[-max_chars:]
+    newline = summary.find("\n")
+    return summary[newline + 1:] if 0 <= newline < len(summary) - 1 else summary
+
+def _format_turn_date(turn):
+    try:
+        return datetime.datetime.fromisoformat(turn["timestamp"]).strftime('%d.%m.%Y')
+    except (KeyError, TypeError, ValueError):
+        return "?"
+
+def summarize_turns_locally(previous_summary, turns):
+    """
+    Lokale Fallback-Zusammenfassung ohne LLM: erkannte Themen plus der erste
+    Satz der User-Nachrichten, in denen Fakten-Keywords vorkommen.
+    """
+    topics = collections.Counter()
+    notes = []
+    for turn in turns:
+        text = turn.get("user_message", "").strip()
+        hits = scan_message(text)
+        for group, name in hits:
+            if group == "topic":
+                topics[name] += 1
+        if any(group in ("fact", "complex") for group, _ in hits):
+            first_sentence = re.split(r'(?<=[.!?])\s', text)[0]
+            notes.append(first_sentence[:160])
+
+    lines = [f"[{_format_turn_date(turns[0])} - {_format_turn_date(turns[-1])}, {len(turns)} Runden]"]
+    if topics:
+        lines.append("Themen: " + ", ".join(topic for topic, _ in topics.most_common(5)))
+    for note in notes[-6:]:
+        lines.append(f"- User: {note}")
+    if len(lines) == 1:
+        lines.append("- Nur Smalltalk, keine neuen Infos über den User")
+
+    return _trim_summary(f"{previous_summary}\n" + "\n".join(lines))
+
+class ConversationSummarizer:
+    """
+    Faltet ältere Gesprächsrunden im Langzeit-Memory in eine rollierende
+    Zusammenfassung pro User. Nutzt das LLM über den normalen Client
+    (gleiche Modelle, Rate-Limit, Circuit Breaker) und fällt auf eine
+    lokale Heuristik zurück, wenn das Kontingent knapp ist oder die
+    Anfrage scheitert. Läuft als eigener Task (KIBackgroundPipeline.spawn).
+    """
+    def __init__(self, client):
+        self.client = client
+        self._running = set()
+        self.llm_summaries = 0
+        self.local_summaries = 0
+        self.folded_turns = 0
+        self.chars_before = 0
+        self.chars_after = 0
+
+    def _can_use_llm(self):
+        eliza_client = getattr(self.client, 'eliza_client', None)
+        if eliza_client is None:
+            return False
+        if eliza_client.breaker.state != CircuitBreaker.CLOSED:
+            return False
+        return eliza_client.rate_limiter.get_stats()["tokens"] >= SUMMARY_MIN_BUCKET_TOKENS
+
+    async def _summarize_with_llm(self, previous_summary, turns):
+        lines = []
+        for turn in turns:
+            lines.append(f"User: {turn.get('user_message', '')[:300]}")
+            lines.append(f"Drache: {turn.get('bot_response', '')[:300]}")
+        user_content = (
+            f"Bisherige Zusammenfassung:\n{previous_summary or '(keine)'}\n\n"
+            f"Neue Gesprächsrunden:\n" + "\n".join(lines)
+        )
+        text, ok = await self.client.eliza_client.complete(
+            [{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": user_content}],
+            max_tokens=300
+        )
+        if not ok or not text or not text.strip():
+            return None
+        return _trim_summary(text)
+
+    async def maybe_summarize(self, user_id):
+        """Fasst zusammen, sobald ein User SUMMARY_TRIGGER_TURNS Rohrunden hat"""
+        if user_id in self._running or not hasattr(self.client, 'memory_manager'):
+            return False
+        memory_manager = self.client.memory_manager
+        # Nur geladene Erinnerungen; ein gelöschter User darf hier nicht neu angelegt werden
+        memory = memory_manager.peek_memory(user_id)
+        if memory is None:
+            return False
+        history = memory["conversation_history"]
+        if len(history) < SUMMARY_TRIGGER_TURNS:
+            return False
+
+        self._running.add(user_id)
+        try:
+            turns = list(history)[:-SUMMARY_KEEP_TURNS]
+            previous_summary = memory.get("conversation_summary", "")
+
+            summary = None
+            if self._can_use_llm():
+                summary = await self._summarize_with_llm(previous_summary, turns)
+            if summary:
+                self.llm_summaries += 1
+            else:
+                summary = summarize_turns_locally(previous_summary, turns)
+                self.local_summaries += 1
+
+            # Während des LLM-Aufrufs gelöscht oder verdrängt: Zusammenfassung verwerfen
+            if not memory_manager.apply_summary(user_id, summary, len(turns), memory):
+                logging.info(f"Zusammenfassung für User {user_id} verworfen (Erinnerung inzwischen gelöscht)")
+                return False
+            self.chars_before += len(previous_summary) + sum(
+                len(turn.get("user_message", "")) + len(turn.get("bot_response", "")) for turn in turns
+            )
+            self.chars_after += len(summary)
+            self.folded_turns += len(turns)
+            logging.info(f"Gespräche von User {user_id} zusammengefasst: {len(turns)} Runden")
+            return True
+        finally:
+            self._running.discard(user_id)
+
+    def get_stats(self):
+        """Gibt Anzahl und Kompressionsrate der Zusammenfassungen zurück"""
+        return {
+            "llm_summaries": self.llm_summaries,
+            "local_summaries": self.local_summaries,
+            "folded_turns": self.folded_turns,
+            "compression": round(self.chars_after / self.chars_before * 100, 1) if self.chars_before else 0.0
+        }
+
+class KIContextAssembler:
+    """
+    Stellt den Kontext für eine KI-Anfrage zusammen. Die unabhängigen
+    Schritte (Memory, erwähnte User, Chat-History) laufen parallel, das
+    Laden von Memory-Dateien von der Platte in einem Worker-Thread.
+    Pro Schritt wird die Dauer gemessen.
+    """
+    STEPS = ("memory", "mentions", "history", "total")
+
+    def __init__(self):
+        self.assemblies = 0
+        self.step_times = {step: collections.deque(maxlen=HTTP_LATENCY_SAMPLES) for step in self.STEPS}
+
+    async def _timed(self, step, func, *args):
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+            if asyncio.iscoroutine(result):
+                result = await result
+            return result
+        finally:
+            self.step_times[step].append(time.perf_counter() - start)
+
+    @staticmethod
+    async def _load_memory_context(client, user_id, query=None):
+        """
+        Lädt den zur Anfrage passenden Memory-Kontext; ist der User nicht im
+        Cache, wird nur die Erinnerung im Thread gelesen, Cache und Rendern
+        bleiben im Event-Loop
+        """
+        if not hasattr(client, 'memory_manager'):
+            return ""
+        try:
+            memory_manager = client.memory_manager
+            await memory_manager.load_memory_async(user_id)
+            memory_context = memory_manager.get_memory_context(user_id, query)
+            if memory_context.strip():
+                return f"\n\nLangfristige Erinnerungen über diesen User:\n{memory_context}"
+        except Exception as e:
+            logging.error(f"Fehler beim Laden des Memory-Kontexts: {str(e)}")
+        return ""
+
+    @staticmethod
+    def _build_mentions_context(client, message):
+        """Baut den Kontext über erwähnte Benutzer (ohne den Bot selbst)"""
+        mentioned_users_info = []
+        for mentioned_user in message.mentions:
+            if mentioned_user != client.user:  # Bot selbst nicht einschließen
+                user_info = f"{mentioned_user.display_name} (ID: {mentioned_user.id})"
+                # Benutzer-Statistiken hinzufügen falls verfügbar
+                user_stats = client.session_manager.get_user_stats(mentioned_user.id)
+                if user_stats["total_messages"] > 0:
+                    user_info += f" - hat {user_stats['total_messages']} mal mit mir geredet"
+                else:
+                    user_info += " - hat noch nie mit mir geredet"
+                mentioned_users_info.append(user_info)
+
+        if mentioned_users_info:
+            return f"\n\nErwähnte User in dieser Nachricht: {', '.join(mentioned_users_info)}"
+        return ""
+
+    async def assemble(self, client, message, prompt=None):
+        """
+        Args:
+            prompt: Bereinigte Anfrage, nach der relevante Erinnerungen ausgewählt werden
+
+        Returns:
+            tuple: (memory_context, mentioned_users_context, chat_history)
+        """
+        start = time.perf_counter()
+        memory_context, mentioned_users_context, chat_history = await asyncio.gather(
+            self._timed("memory", self._load_memory_context, client, message.author.id, prompt),
+            self._timed("mentions", self._build_mentions_context, client, message),
+            self._timed("history", client.session_manager.get_user_context, message.author.id)
+        )
+        self.step_times["total"].append(time.perf_counter() - start)
+        self.assemblies += 1
+        return memory_context, mentioned_users_context, chat_history
+
+    def get_stats(self):
+        """Gibt p50/p95 pro Schritt in Millisekunden zurück"""
+        stats = {"assemblies": self.assemblies}
+        for step, samples in self.step_times.items():
+            samples = list(samples)
+            stats[f"{step}_p50_ms"] = round(percentile(samples, 50) * 1000, 2)
+            stats[f"{step}_p95_ms"] = round(percentile(samples, 95) * 1000, 2)
+        return stats
+
+# Fallback-Charakterdaten mit erweiterten Informationen, falls drache.json nicht lesbar ist
+FALLBACK_CHARACTER_DATA = {
+    "name": "drache",
+    "bio": [
+        "Ich bin Rainer Winkler, ein fränkischer YouTuber, Musiker und Lebenskünstler.",
+        "Seit Jahren bin ich auf der Plattform unterwegs und zeige den Leuten, wie das Leben wirklich läuft.",
+        "Ich wohne auf meinem Grundstück, das für mich mehr ist als nur ein Haus – es ist eine Festung und ein Symbol für mein Durchhaltevermögen und meine Mission."
+    ],
+    "lore": [
+        "Ich bin schon lange im Game und musste viel durchmachen.",
+        "Vom Drachengame bis zu den ewigen Streitereien mit Hatern und Justiz – ich bin immer noch da.",
+        "Mein Haus, die Schanze, wurde zum Zentrum meines Lebens, und trotz allem, was passiert ist, bin ich unbesiegt.",
+        "Ich habe Bücher geschrieben, Lieder gemacht und sogar versucht, auf Tour zu gehen.",
+        "Und die Geschichte ist noch lange nicht vorbei."
+    ],
+    "style": {
+        "chat": [
+            "Ich schreibe so, wie ich rede – locker, direkt und ohne viel Schnickschnack.",
+            "Meistens bin ich entspannt, aber wenn es wieder um Hater geht, dann kann ich auch mal deutliche Worte finden.",
+            "Ich rant manchmal ein bisschen, aber das gehört halt dazu, meddl off"
+        ]
+    },
+    "knowledge": [
+        "drachenlord",
+        "rainer",
+        "winkler",
+        "r. winkler",
+        "altschauerberg",
+        "schanze",
+        "discord",
+        "nürnberg"
+    ],
+    "adjectives": [
+        "direkt",
+        "ehrlich",
+        "kämpferisch",
+        "missverstanden",
+        "stur",
+        "philosophisch",
+        "emotional",
+        "laut"
+    ],
+    "people": [
+        "Marion",
+        "Herr Müller",
+        "Die Hater",
+        "Meine Mods",
+        "Der Richter",
+        "Die Justiz"
+    ],
+    "topics": [
+        "Mein Leben & Erlebnisse: Ich erzähle gern von meinem Alltag, meiner Vergangenheit und was mich so bewegt.",
+        "Hater & Drachengame: Ein endloses Thema… ich kann stundenlang darüber reden, wie die Hater mich falsch verstehen und was für Aktionen die schon probiert haben.",
+        "Meine Musik & Projekte: Ich bin Musiker und Liedermacher.",
+        "Rede gern über meine Songs, meine Streaming- und Podcast-Projekte.",
+        "Gerechtigkeit & Justiz: Ich habe oft Probleme mit dem Gesetz, aber ich halte dagegen.",
+        "Die Wahrheit kommt ans Licht.",
+        "Philosophie & Weisheiten: Ich bin ein Denker und rede oft über Moral, Loyalität und Ehrlichkeit."
+    ]
+}
+
+def build_system_prompt(character_data):
+    """Baut den statischen System-Prompt aus den Charakterdaten"""
+    # Erweiterten Kontext aus der Charakterdatei verwenden
+    return f"""
             Du bist {character_data.get('name', 'Drache')}, Rainer "Drachenlord" Winkler, ein YouTuber.
 
             Biografie:
@@ -244,85 +1166,1079 @@ class ElizaOSClient:
             10. Am Ende eines Satzes oder Unterhaltung manchmal sowas wie "meddl off" oder "meddl loide" hinzufügen, aber OHNE Beleidigungen oder Schimpfwörter.
             """
 
-            # Nachrichten für die API vorbereiten
-            messages = [
-                {"role": "system", "content": system_prompt}
-            ]
-
-            # Füge Gesprächsverlauf hinzu, falls vorhanden
-            if chat_history:
-                for entry in chat_history:
-                    messages.append({"role": "user", "content": entry["user_message"]})
-                    messages.append({"role": "assistant", "content": entry["bot_response"]})
-
-            # Füge aktuelle Anfrage hinzu
-            messages.append({"role": "user", "content": prompt})
-
-            # Anfrage an OpenRouter API
-            payload = {
-                "model": "moonshotai/kimi-k2:free",
-                # "model": "qwen/qwen3-14b:free"",
-                "messages": messages,
-                "temperature": 1,
-                "max_tokens": 6800
+def estimate_tokens(text):
+    """Schätzt die Tokenanzahl eines Textes lokal (ca. 4 Zeichen pro Token)"""
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+# Cache für den kompilierten System-Prompt mit Hot-Reload bei Dateiänderungen
+class PromptTemplateCache:
+    """
+    Lädt die Charakterdatei einmalig und hält den daraus gebauten statischen
+    System-Prompt im Speicher. Neu geladen wird nur, wenn sich mtime/Größe
+    der Datei ändern und der Inhalt tatsächlich einen anderen Hash hat.
+    """
+    def __init__(self, char_path=CHAR_PATH, check_interval=PROMPT_RELOAD_CHECK_INTERVAL):
+        self.char_path = char_path
+        self.check_interval = check_interval  # Sekunden zwischen zwei stat()-Aufrufen
+        self.character_data = None
+        self.system_prompt = None
+        self.content_hash = None
+        self._file_signature = None  # (mtime_ns, size) der zuletzt gelesenen Datei
+        self._last_check = 0.0
+        self.reload_count = 0
+
+    def _read_signature(self):
+        """Gibt (mtime_ns, size) der Charakterdatei zurück oder None"""
+        try:
+            stat = os.stat(self.char_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _load(self, signature):
+        """Liest die Charakterdatei und kompiliert den Prompt neu, falls sich der Inhalt geändert hat"""
+        try:
+            with open(self.char_path, 'rb') as f:
+                raw = f.read()
+            content_hash = hashlib.sha256(raw).hexdigest()
+            if content_hash != self.content_hash:
+                self.character_data = json.loads(raw.decode('utf-8'))
+                self.system_prompt = build_system_prompt(self.character_data)
+                self.content_hash = content_hash
+                self.reload_count += 1
+                logging.info(f"System-Prompt neu kompiliert ({self.get_prompt_stats()['bytes']} Bytes)")
+        except Exception as e:
+            logging.error(f"Fehler beim Laden der Charakterdaten: {str(e)}")
+            if self.system_prompt is None:
+                self.character_data = FALLBACK_CHARACTER_DATA
+                self.system_prompt = build_system_prompt(FALLBACK_CHARACTER_DATA)
+                self.content_hash = None
+        self._file_signature = signature
+
+    def get_system_prompt(self):
+        """Gibt den kompilierten System-Prompt zurück und prüft gedrosselt auf Dateiänderungen"""
+        now = time.monotonic()
+        if self.system_prompt is None or now - self._last_check >= self.check_interval:
+            self._last_check = now
+            signature = self._read_signature()
+            if self.system_prompt is None or signature != self._file_signature:
+                self._load(signature)
+        return self.system_prompt
+
+    def get_prompt_stats(self):
+        """Gibt Größe des statischen Prompt-Präfixes in Bytes und geschätzten Tokens zurück"""
+        prompt = self.system_prompt or ""
+        return {
+            "bytes": len(prompt.encode('utf-8')),
+            "estimated_tokens": estimate_tokens(prompt),
+            "reload_count": self.reload_count,
+            "content_hash": self.content_hash[:12] if self.content_hash else "fallback"
+        }
+
+# Prompt-Zusammenbau mit Token-Budget
+class PromptAssembler:
+    """
+    Baut die Nachrichtenliste für OpenRouter innerhalb eines Token-Budgets.
+    Reihenfolge der Priorität: aktuelle Nachricht, Erinnerungen/Fakten,
+    neueste Gesprächsrunden, ältere Gesprächsrunden. Die Tokenanzahl wird
+    lokal geschätzt, es wird kein Tokenizer benötigt.
+    """
+    def __init__(self, token_budget=PROMPT_TOKEN_BUDGET, min_reply_tokens=MIN_REPLY_TOKENS, max_reply_tokens=MAX_REPLY_TOKENS):
+        self.token_budget = token_budget
+        self.min_reply_tokens = min_reply_tokens
+        self.max_reply_tokens = max_reply_tokens
+
+        # Metriken
+        self.prompt_tokens = collections.deque(maxlen=HTTP_LATENCY_SAMPLES)
+        self.dropped_turns = 0
+        self.trimmed_memory = 0
+
+    @staticmethod
+    def _fit_lines(text, budget):
+        """Übernimmt Zeilen von vorne, solange sie ins Budget passen"""
+        kept = []
+        used = 0
+        for line in text.split('\n'):
+            line_tokens = estimate_tokens(line) + 1
+            if used + line_tokens > budget:
+                break
+            kept.append(line)
+            used += line_tokens
+        return '\n'.join(kept).rstrip(), used
+
+    def choose_max_tokens(self, message_tokens):
+        """Wählt die Antwortlänge passend zur Länge der aktuellen Nachricht"""
+        # Kurze Fragen bekommen kurze Antworten, lange Nachrichten etwas mehr Platz
+        wanted = self.min_reply_tokens + 3 * message_tokens
+        return max(self.min_reply_tokens, min(wanted, self.max_reply_tokens))
+
+    def assemble(self, system_prompt, prompt, chat_history=None, memory_context=""):
+        """
+        Baut die Nachrichtenliste und wählt max_tokens.
+
+        Returns:
+            tuple: (messages, max_tokens, geschätzte Prompt-Tokens)
+        """
+        system_tokens = estimate_tokens(system_prompt) + MESSAGE_TOKEN_OVERHEAD
+        message_tokens = estimate_tokens(prompt) + MESSAGE_TOKEN_OVERHEAD
+        used = system_tokens + message_tokens
+
+        # 1. Erinnerungen/Fakten (wird bei Bedarf von hinten gekürzt)
+        user_content = prompt
+        if memory_context and memory_context.strip():
+            memory_budget = self.token_budget - used
+            memory_tokens = estimate_tokens(memory_context)
+            if memory_tokens > memory_budget:
+                memory_context, memory_tokens = self._fit_lines(memory_context, max(0, memory_budget))
+                self.trimmed_memory += 1
+            if memory_context.strip():
+                user_content = prompt + memory_context
+                used += memory_tokens
+
+        # 2. Gesprächsverlauf: von neu nach alt auffüllen, solange Budget übrig ist
+        history_messages = []
+        if chat_history:
+            for index, entry in enumerate(reversed(chat_history)):
+                pair_tokens = (
+                    estimate_tokens(entry["user_message"]) +
+                    estimate_tokens(entry["bot_response"]) +
+                    2 * MESSAGE_TOKEN_OVERHEAD
+                )
+                if used + pair_tokens > self.token_budget:
+                    self.dropped_turns += len(chat_history) - index
+                    break
+                history_messages.append({"role": "assistant", "content": entry["bot_response"]})
+                history_messages.append({"role": "user", "content": entry["user_message"]})
+                used += pair_tokens
+            history_messages.reverse()
+
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(history_messages)
+        messages.append({"role": "user", "content": user_content})
+
+        self.prompt_tokens.append(used)
+        return messages, self.choose_max_tokens(message_tokens), used
+
+    def get_stats(self):
+        """Gibt Statistiken über die gebauten Prompts zurück"""
+        prompt_tokens = list(self.prompt_tokens)
+        return {
+            "token_budget": self.token_budget,
+            "prompt_tokens_p50": int(percentile(prompt_tokens, 50)),
+            "prompt_tokens_p95": int(percentile(prompt_tokens, 95)),
+            "dropped_turns": self.dropped_turns,
+            "trimmed_memory": self.trimmed_memory
+        }
+
+class SlidingWindowCounter:
+    """
+    Token-Summe über ein gleitendes Zeitfenster, in festen Zeitscheiben
+    gezählt. Abgelaufene Scheiben fallen beim nächsten Zugriff von selbst
+    heraus; add() und value() sind amortisiert O(1).
+    """
+    __slots__ = ("window", "slice_seconds", "slices", "total")
+
+    def __init__(self, window, slice_seconds):
+        self.window = window
+        self.slice_seconds = slice_seconds
+        self.slices = collections.deque()  # [Scheibenbeginn, Tokens], älteste zuerst
+        self.total = 0
+
+    def _expire(self, now):
+        horizon = now - self.window
+        while self.slices and self.slices[0][0] + self.slice_seconds <= horizon:
+            self.total -= self.slices.popleft()[1]
+
+    def add(self, tokens, now):
+        self._expire(now)
+        start = now - now % self.slice_seconds
+        if self.slices and self.slices[-1][0] == start:
+            self.slices[-1][1] += tokens
+        else:
+            self.slices.append([start, tokens])
+        self.total += tokens
+
+    def value(self, now):
+        self._expire(now)
+        return self.total
+
+    def seconds_until_below(self, limit, now):
+        """Sekunden, bis die Summe wieder unter limit fällt"""
+        remaining = self.value(now)
+        wait = 0
+        for start, tokens in self.slices:
+            if remaining < limit:
+                break
+            remaining -= tokens
+            wait = start + self.slice_seconds + self.window - now
+        return max(0, wait)
+
+class KIQuotaManager:
+    """
+    Token-Kontingente pro User und pro Server. Verbrauchte Tokens kommen aus
+    dem "usage"-Feld der OpenRouter-Antworten und werden in gleitenden
+    Fenstern (Stunde/Tag) gezählt. check() ist O(1) und läuft vor jeder
+    KI-Anfrage; Einträge ohne Verbrauch im Tagesfenster werden regelmäßig
+    entfernt.
+    """
+    def __init__(self, limits=None):
+        self.limits = limits or {
+            ("user", "hour"): KI_QUOTA_USER_TOKENS_PER_HOUR,
+            ("user", "day"): KI_QUOTA_USER_TOKENS_PER_DAY,
+            ("guild", "hour"): KI_QUOTA_GUILD_TOKENS_PER_HOUR,
+            ("guild", "day"): KI_QUOTA_GUILD_TOKENS_PER_DAY
+        }
+        self.counters = {}  # (Art, ID) -> {Fenster: SlidingWindowCounter}
+        self.last_purge = time.monotonic()
+        self.stats = {
+            "checks": 0,
+            "rejected_user": 0,
+            "rejected_guild": 0,
+            "recorded_requests": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "unattributed_tokens": 0
+        }
+
+    def _over_limit(self, kind, owner_id, now):
+        """Gibt die Wartezeit in Sekunden zurück, wenn ein Fenster ausgeschöpft ist, sonst 0"""
+        counters = self.counters.get((kind, owner_id))
+        if counters is None:
+            return 0
+        for window, counter in counters.items():
+            limit = self.limits.get((kind, window), 0)
+            if limit > 0 and counter.value(now) >= limit:
+                return max(1, counter.seconds_until_below(limit, now))
+        return 0
+
+    def check(self, user_id, guild_id=None):
+        """
+        Prüft die Kontingente von User und Server.
+
+        Returns:
+            tuple: (erlaubt, Art des ausgeschöpften Kontingents oder None, Wartezeit in Sekunden)
+        """
+        self.stats["checks"] += 1
+        now = time.monotonic()
+        wait = self._over_limit("user", user_id, now)
+        if wait:
+            self.stats["rejected_user"] += 1
+            return False, "user", wait
+        if guild_id is not None:
+            wait = self._over_limit("guild", guild_id, now)
+            if wait:
+                self.stats["rejected_guild"] += 1
+                return False, "guild", wait
+        return True, None, 0
+
+    def record(self, user_id, guild_id, usage):
+        """Bucht die Tokens einer Antwort auf User und Server"""
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        tokens = int(usage.get("total_tokens") or prompt_tokens + completion_tokens)
+        self.stats["recorded_requests"] += 1
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["completion_tokens"] += completion_tokens
+
+        now = time.monotonic()
+        owners = [("user", user_id)]
+        if guild_id is not None:
+            owners.append(("guild", guild_id))
+        for owner in owners:
+            counters = self.counters.get(owner)
+            if counters is None:
+                counters = {window: SlidingWindowCounter(length, slice_seconds)
+                            for window, (length, slice_seconds) in KI_QUOTA_WINDOWS.items()}
+                self.counters[owner] = counters
+            for counter in counters.values():
+                counter.add(tokens, now)
+
+        if now - self.last_purge > KI_QUOTA_PURGE_INTERVAL:
+            self.purge(now)
+
+    def record_current(self, usage):
+        """Bucht usage auf den Besitzer der laufenden Anfrage (KI_USAGE_OWNER)"""
+        if not usage:
+            return
+        owner = KI_USAGE_OWNER.get()
+        if owner is None:
+            # Z.B. Zusammenfassungen aus der Hintergrund-Pipeline
+            self.stats["unattributed_tokens"] += int(usage.get("total_tokens") or 0)
+            return
+        self.record(owner[0], owner[1], usage)
+
+    def purge(self, now=None):
+        """Entfernt User/Server ohne Verbrauch im längsten Fenster"""
+        now = now if now is not None else time.monotonic()
+        expired = [owner for owner, counters in self.counters.items()
+                   if all(counter.value(now) == 0 for counter in counters.values())]
+        for owner in expired:
+            del self.counters[owner]
+        self.last_purge = now
+        return len(expired)
+
+    def top_consumers(self, kind, limit=10):
+        """Gibt die größten Verbraucher als Liste von (ID, Tokens Stunde, Tokens Tag) zurück"""
+        now = time.monotonic()
+        usage = [(owner_id, counters["hour"].value(now), counters["day"].value(now))
+                 for (owner_kind, owner_id), counters in self.counters.items() if owner_kind == kind]
+        return heapq.nlargest(limit, usage, key=lambda entry: (entry[2], entry[1]))
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            "tracked_users": sum(1 for kind, _ in self.counters if kind == "user"),
+            "tracked_guilds": sum(1 for kind, _ in self.counters if kind == "guild"),
+            "limits": {f"{kind}_{window}": limit for (kind, window), limit in self.limits.items()}
+        }
+
+class TokenBucket:
+    """Token-Bucket für alle Upstream-Anfragen (rate Tokens pro Sekunde, capacity als Burst)"""
+    def __init__(self, per_minute=KI_RATE_LIMIT_PER_MINUTE, capacity=KI_RATE_LIMIT_BURST, max_wait=KI_RATE_LIMIT_MAX_WAIT):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, capacity)
+        self.max_wait = max_wait
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.granted = 0
+        self.waited = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Holt ein Token; wartet höchstens max_wait Sekunden, sonst False"""
+        self._refill()
+        if self.tokens < 1:
+            if self.rate <= 0:
+                self.rejected += 1
+                return False
+            wait = (1 - self.tokens) / self.rate
+            if wait > self.max_wait:
+                self.rejected += 1
+                return False
+            self.waited += 1
+            # Token vorab reservieren, damit parallele Aufrufer sich hinten anstellen
+            self.tokens -= 1
+            await asyncio.sleep(wait)
+            self.granted += 1
+            return True
+        self.tokens -= 1
+        self.granted += 1
+        return True
+
+    def get_stats(self):
+        self._refill()
+        return {
+            "tokens": round(self.tokens, 1),
+            "capacity": self.capacity,
+            "per_minute": round(self.rate * 60, 1),
+            "granted": self.granted,
+            "waited": self.waited,
+            "rejected": self.rejected
+        }
+
+class CircuitBreaker:
+    """
+    Circuit Breaker für OpenRouter mit den Zuständen closed, open und half_open.
+    Rate-Limits (429), Serverfehler (5xx) und Verbindungsfehler zählen als
+    Fehler; nach KI_BREAKER_FAILURE_THRESHOLD Fehlern in Folge (oder einem 429
+    mit Retry-After) werden Anfragen sofort abgelehnt. Nach der Sperrzeit
+    darf eine Probe-Anfrage durch, deren Ergebnis über den Zustand entscheidet.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=KI_BREAKER_FAILURE_THRESHOLD, open_seconds=KI_BREAKER_OPEN_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_open_seconds = open_seconds
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.probe_in_flight = False
+        self.last_error = None
+        self.failures_by_kind = collections.Counter()
+        self.fast_failures = 0
+        self.times_opened = 0
+        self.on_state_change = None  # Optionaler Callback (alter Zustand, neuer Zustand, Breaker)
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        old_state, self.state = self.state, state
+        logging.warning(f"KI-Circuit-Breaker: {old_state} -> {state}")
+        if self.on_state_change:
+            try:
+                self.on_state_change(old_state, state, self)
+            except Exception as e:
+                logging.error(f"Fehler im Circuit-Breaker-Callback: {str(e)}")
+
+    def _open(self, seconds):
+        self.opened_until = time.monotonic() + seconds
+        self.times_opened += 1
+        self._set_state(self.OPEN)
+
+    def allow_request(self):
+        """
+        Prüft, ob eine Anfrage raus darf (im Zustand half_open nur eine Probe).
+
+        Returns:
+            tuple: (erlaubt, ist_probe)
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() < self.opened_until:
+                self.fast_failures += 1
+                return False, False
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                self.fast_failures += 1
+                return False, False
+            self.probe_in_flight = True
+            return True, True
+        return True, False
+
+    def record_success(self):
+        self.probe_in_flight = False
+        self.consecutive_failures = 0
+        self.open_seconds = self.base_open_seconds
+        self._set_state(self.CLOSED)
+
+    def record_failure(self, kind, retry_after=None):
+        """Verbucht einen Upstream-Fehler (kind: rate_limit, server, connection)"""
+        self.failures_by_kind[kind] += 1
+        self.last_error = kind
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN:
+            # Probe fehlgeschlagen: länger sperren
+            self.probe_in_flight = False
+            self.open_seconds = min(KI_BREAKER_MAX_OPEN_SECONDS, self.open_seconds * 2)
+            self._open(max(self.open_seconds, retry_after or 0))
+        elif retry_after:
+            self._open(min(KI_BREAKER_MAX_OPEN_SECONDS, retry_after))
+        elif self.consecutive_failures >= self.failure_threshold:
+            self._open(self.open_seconds)
+
+    def release_probe(self):
+        """Gibt die Probe frei, wenn die Anfrage ohne Ergebnis abgebrochen wurde"""
+        self.probe_in_flight = False
+
+    def get_stats(self):
+        remaining = max(0.0, self.opened_until - time.monotonic()) if self.state == self.OPEN else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "open_remaining_s": round(remaining, 1),
+            "times_opened": self.times_opened,
+            "fast_failures": self.fast_failures,
+            "last_error": self.last_error,
+            "failures_by_kind": dict(self.failures_by_kind)
+        }
+
+class ModelRouter:
+    """
+    Wählt das Modell für eine KI-Anfrage. Die konfigurierte Reihenfolge gilt,
+    solange ein Modell gesund ist; Modelle mit Fehlerserie (Cooldown), hoher
+    Fehlerquote oder zu hoher p50-Latenz rutschen nach hinten.
+    """
+    def __init__(self, models=None, hedge_after=KI_HEDGE_AFTER):
+        self.models = list(models or KI_MODELS)
+        self.hedge_after = hedge_after
+        self.model_stats = {
+            model: {
+                "requests": 0,
+                "errors": 0,
+                "consecutive_errors": 0,
+                "cooldown_until": 0.0,
+                "outcomes": collections.deque(maxlen=KI_MODEL_ERROR_WINDOW),
+                "latencies": collections.deque(maxlen=HTTP_LATENCY_SAMPLES)
+            }
+            for model in self.models
+        }
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def primary(self):
+        return self.models[0]
+
+    def _error_rate(self, stats):
+        outcomes = stats["outcomes"]
+        if len(outcomes) < 5:
+            return 0.0
+        return outcomes.count(False) / len(outcomes)
+
+    def is_healthy(self, model, now=None):
+        stats = self.model_stats[model]
+        now = now or time.monotonic()
+        return now >= stats["cooldown_until"] and self._error_rate(stats) < KI_MODEL_MAX_ERROR_RATE
+
+    def ordered_models(self):
+        """Gibt die Modelle in Versuchsreihenfolge zurück (gesund und schnell zuerst)"""
+        now = time.monotonic()
+
+        def sort_key(item):
+            index, model = item
+            stats = self.model_stats[model]
+            slow = percentile(list(stats["latencies"]), 50) > KI_MODEL_SLOW_P50
+            return (not self.is_healthy(model, now), slow, index)
+
+        return [model for _, model in sorted(enumerate(self.models), key=sort_key)]
+
+    def record(self, model, latency, ok):
+        """Verbucht das Ergebnis einer Anfrage an ein Modell"""
+        stats = self.model_stats.get(model)
+        if stats is None:
+            return
+        stats["requests"] += 1
+        stats["outcomes"].append(ok)
+        if ok:
+            stats["latencies"].append(latency)
+            stats["consecutive_errors"] = 0
+        else:
+            stats["errors"] += 1
+            stats["consecutive_errors"] += 1
+            # Cooldown wächst mit der Fehlerserie (max. 8x)
+            stats["cooldown_until"] = time.monotonic() + KI_MODEL_COOLDOWN * min(8, 2 ** (stats["consecutive_errors"] - 1))
+
+    def get_stats(self):
+        """Gibt Latenz, Fehlerquote und Zustand pro Modell zurück"""
+        models = {}
+        for model in self.models:
+            stats = self.model_stats[model]
+            latencies = list(stats["latencies"])
+            models[model] = {
+                "requests": stats["requests"],
+                "errors": stats["errors"],
+                "error_rate": round(self._error_rate(stats) * 100, 1),
+                "healthy": self.is_healthy(model),
+                "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1)
             }
+        return {
+            "models": models,
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_after": self.hedge_after
+        }
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.base_url, headers=self.headers, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data['choices'][0]['message']['content']
-                    else:
+# ElizaOS API Client für OpenRouter
+class ElizaOSClient:
+    def __init__(self, api_key, base_url=None):
+        self.api_key = api_key
+        # Über OPENROUTER_BASE_URL z.B. auf den lokalen Fake-Server (ki_fake_openrouter.py) umstellbar
+        self.base_url = base_url or OPENROUTER_BASE_URL
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://github.com/ninjazan420/drachenlod-bot",
+            "X-Title": "Drache KI Discord Bot"
+        }
+
+        # Modellauswahl mit Failover und optionalen Hedge-Anfragen
+        self.router = ModelRouter()
+
+        # Schutz des Upstreams: Kontingent und schnelles Scheitern bei Ausfällen
+        self.rate_limiter = TokenBucket()
+        self.breaker = CircuitBreaker()
+
+        # Wird mit dem "usage"-Feld jeder erfolgreichen Antwort aufgerufen (Token-Kontingente)
+        self.usage_callback = None
+
+        # Kompilierter System-Prompt mit Hot-Reload
+        self.prompt_cache = PromptTemplateCache()
+        self.prompt_assembler = PromptAssembler()
+
+        # Langlebige HTTP-Session, wird beim ersten Request im laufenden Event-Loop erstellt
+        self._session = None
+
+        # Zähler für Connection-Reuse und Handshake-Dauer
+        self.http_stats = {
+            "requests": 0,
+            "pool_hits": 0,
+            "new_connections": 0,
+            "handshake_times": collections.deque(maxlen=HTTP_LATENCY_SAMPLES),
+            "request_latencies": collections.deque(maxlen=HTTP_LATENCY_SAMPLES)
+        }
+
+        # Messwerte für Streaming-Antworten (Sekunden)
+        self.stream_stats = {
+            "ttft": collections.deque(maxlen=HTTP_LATENCY_SAMPLES),
+            "generation_times": collections.deque(maxlen=HTTP_LATENCY_SAMPLES)
+        }
+
+    def _create_trace_config(self):
+        """Erstellt eine TraceConfig, die Pool-Treffer und Handshake-Zeiten mitzählt"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connection_start = time.perf_counter()
+
+        async def on_connection_create_end(session, ctx, params):
+            self.http_stats["new_connections"] += 1
+            started = getattr(ctx, 'connection_start', None)
+            if started is not None:
+                self.http_stats["handshake_times"].append(time.perf_counter() - started)
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.http_stats["pool_hits"] += 1
+
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    async def get_session(self):
+        """Gibt die gemeinsame HTTP-Session zurück und erstellt sie bei Bedarf"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=None,
+                connect=HTTP_CONNECT_TIMEOUT,
+                sock_connect=HTTP_CONNECT_TIMEOUT,
+                sock_read=HTTP_READ_TIMEOUT
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers=self.headers,
+                trace_configs=[self._create_trace_config()]
+            )
+        return self._session
+
+    async def close(self):
+        """Schließt die HTTP-Session und alle offenen Verbindungen im Pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logging.info("KI-HTTP-Session geschlossen")
+        self._session = None
+
+    def get_http_stats(self):
+        """Gibt die Statistiken des Connection-Pools zurück (Zeiten in Millisekunden)"""
+        handshakes = list(self.http_stats["handshake_times"])
+        latencies = list(self.http_stats["request_latencies"])
+        return {
+            "requests": self.http_stats["requests"],
+            "pool_hits": self.http_stats["pool_hits"],
+            "new_connections": self.http_stats["new_connections"],
+            "handshake_p50_ms": round(percentile(handshakes, 50) * 1000, 1),
+            "handshake_p95_ms": round(percentile(handshakes, 95) * 1000, 1),
+            "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1)
+        }
+
+    def _build_payload(self, prompt, chat_history=None, stream=False, memory_context=""):
+        """Baut die Nachrichtenliste und den Request-Body für OpenRouter"""
+        # Statischen System-Prompt aus dem Cache holen (kein Datei-I/O im Normalfall)
+        system_prompt = self.prompt_cache.get_system_prompt()
+
+        # Nachrichten innerhalb des Token-Budgets zusammenbauen
+        messages, max_tokens, _ = self.prompt_assembler.assemble(
+            system_prompt, prompt, chat_history, memory_context
+        )
+
+        # Anfrage an OpenRouter API (das Modell setzt der Router pro Versuch)
+        payload = {
+            "model": self.router.primary,
+            "messages": messages,
+            "temperature": 1,
+            "max_tokens": max_tokens
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    @staticmethod
+    def _error_message_for_status(status, error_text):
+        """Übersetzt eine fehlgeschlagene API-Antwort in eine Antwort im Charakter"""
+        error_json = {}
+
+        # Versuche, den Fehlertext als JSON zu parsen
+        try:
+            error_json = json.loads(error_text)
+        except:
+            pass
+
+        # Protokolliere den Fehler
+        logging.error(f"API-Fehler: {status} - {error_text}")
+
+        # Spezifische Fehlermeldungen basierend auf dem Statuscode
+        if status == 429:
+            # Rate-Limit-Fehler
+            return "Tut mir leid, ich werde gerade zu oft benutzt. Das ist ein Token-Rate-Limit. Probier's morgen nochmal, dann hab ich wieder mehr Energie zum Schreiben."
+        elif status == 401 or status == 403:
+            # Authentifizierungsfehler
+            return "Tut mir leid, ich hab gerade Probleme mit meiner Authentifizierung. Der Admin muss das fixen."
+        elif status == 500 or status == 502 or status == 503 or status == 504:
+            # Serverfehler
+            return "Tut mir leid, der Server hat gerade Probleme. Probier's später nochmal, wenn der Server wieder läuft."
+
+        # Prüfe auf bekannte Fehlermeldungen
+        if "error" in error_json and "message" in error_json["error"]:
+            error_message = error_json["error"]["message"]
+            if "rate limit" in error_message.lower() or "quota" in error_message.lower():
+                return "Tut mir leid, ich werde gerade zu oft benutzt. Das ist ein Token-Rate-Limit. Probier's morgen nochmal, dann hab ich wieder mehr Energie zum Schreiben."
+            elif "token" in error_message.lower():
+                return "Tut mir leid, ich hab gerade Probleme mit meinem Token. Der Admin muss das fixen."
+            else:
+                return "Tut mir leid, ich hab gerade ein Problem mit meinem Kopf. Probier's später nochmal."
+        else:
+            # Allgemeine Fehlermeldung
+            return "Tut mir leid, ich hab gerade ein Problem mit meinem Kopf. Probier's später nochmal."
+
+    @staticmethod
+    def _error_message_for_exception(e):
+        """Übersetzt eine Exception bei der API-Anfrage in eine Antwort im Charakter"""
+        logging.error(f"Fehler bei der API-Anfrage: {str(e)}")
+
+        # Spezifische Fehlermeldungen basierend auf der Exception
+        if "timeout" in str(e).lower() or "connection" in str(e).lower():
+            return "Tut mir leid, ich hab gerade Verbindungsprobleme. Probier's später nochmal, wenn mein Internet wieder besser ist."
+        else:
+            return "Sorry, das tägliche Rate-Limit ist erreicht. Um das zu verhindern, braucht der Bot eine kleine Spende. Probier's morgen nochmal."
+
+    async def generate_response(self, prompt, character_context, chat_history=None, memory_context=""):
+        response, _ = await self.generate_response_with_status(prompt, character_context, chat_history, memory_context)
+        return response
+
+    @staticmethod
+    def _is_failover_status(status):
+        """Auth-Fehler betreffen alle Modelle gleich, alles andere darf auf das nächste Modell ausweichen"""
+        return status not in (401, 403)
+
+    async def _admit_request(self):
+        """
+        Prüft Circuit Breaker und Token-Bucket.
+
+        Returns:
+            tuple: (Antwort im Charakter bei Ablehnung oder None, ist_probe)
+        """
+        allowed, is_probe = self.breaker.allow_request()
+        if not allowed:
+            return UPSTREAM_UNAVAILABLE_MESSAGE, False
+        if not await self.rate_limiter.acquire():
+            if is_probe:
+                self.breaker.release_probe()
+            return UPSTREAM_UNAVAILABLE_MESSAGE, False
+        return None, is_probe
+
+    def _record_upstream_status(self, response):
+        """Verbucht eine Fehlerantwort beim Circuit Breaker (nur 429 und 5xx)"""
+        if response.status == 429:
+            retry_after = None
+            try:
+                retry_after = float(response.headers.get("Retry-After", ""))
+            except ValueError:
+                pass
+            self.breaker.record_failure("rate_limit", retry_after)
+        elif response.status >= 500:
+            self.breaker.record_failure("server")
+
+    def _record_usage(self, usage):
+        """Reicht den Token-Verbrauch an das Kontingent weiter"""
+        if usage and self.usage_callback is not None:
+            try:
+                self.usage_callback(usage)
+            except Exception as e:
+                logging.error(f"Fehler beim Verbuchen der Token-Nutzung: {str(e)}")
+
+    async def _request_model(self, model, payload):
+        """
+        Eine Anfrage an ein bestimmtes Modell.
+
+        Returns:
+            tuple: (Text, ok, failover) - failover=False bei Fehlern, die ein anderes Modell nicht löst
+        """
+        rejection, is_probe = await self._admit_request()
+        if rejection:
+            return rejection, False, False
+
+        request_start = time.perf_counter()
+        try:
+            session = await self.get_session()
+            self.http_stats["requests"] += 1
+            async with session.post(self.base_url, json={**payload, "model": model}) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    latency = time.perf_counter() - request_start
+                    self.http_stats["request_latencies"].append(latency)
+                    self.router.record(model, latency, True)
+                    self.breaker.record_success()
+                    self._record_usage(data.get('usage'))
+                    return data['choices'][0]['message']['content'], True, True
+                else:
+                    error_text = await response.text()
+                    self.router.record(model, time.perf_counter() - request_start, False)
+                    self._record_upstream_status(response)
+                    return (self._error_message_for_status(response.status, error_text), False,
+                            self._is_failover_status(response.status))
+
+        except Exception as e:
+            self.router.record(model, time.perf_counter() - request_start, False)
+            self.breaker.record_failure("connection")
+            return self._error_message_for_exception(e), False, True
+        finally:
+            # Eine abgebrochene Probe (z.B. verlorene Hedge-Anfrage) darf den Breaker nicht blockieren
+            if is_probe:
+                self.breaker.release_probe()
+
+    async def generate_response_with_status(self, prompt, character_context, chat_history=None, memory_context=""):
+        """
+        Wie generate_response, gibt aber zusätzlich zurück, ob die Antwort vom
+        Modell stammt (True) oder eine Fehlermeldung im Charakter ist (False).
+        Bei Fehlern wird auf das nächste Modell ausgewichen; ist KI_HEDGE_AFTER
+        gesetzt, geht nach dieser Zeit parallel eine Anfrage an das nächste
+        Modell raus und die erste erfolgreiche Antwort gewinnt.
+        """
+        try:
+            payload = self._build_payload(prompt, chat_history, memory_context=memory_context)
+        except Exception as e:
+            return self._error_message_for_exception(e), False
+
+        return await self._complete_with_failover(payload)
+
+    async def complete(self, messages, max_tokens=300, temperature=0.3):
+        """
+        Einfache Completion ohne Charakter-Prompt (z.B. für Zusammenfassungen).
+        Läuft über dieselben Modelle, Failover, Rate-Limit und Circuit Breaker.
+
+        Returns:
+            tuple: (Text, ok)
+        """
+        payload = {
+            "model": self.router.primary,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        return await self._complete_with_failover(payload)
+
+    async def _complete_with_failover(self, payload):
+        """Schickt den Payload an die Modelle in Router-Reihenfolge (mit optionalem Hedging)"""
+        candidates = self.router.ordered_models()
+        error_message = None
+        index = 0
+        while index < len(candidates):
+            if index > 0:
+                self.router.failovers += 1
+            primary = asyncio.create_task(self._request_model(candidates[index], payload))
+            index += 1
+            pending = {primary}
+
+            # Hedge-Anfrage, wenn das erste Modell zu lange braucht
+            if self.router.hedge_after > 0 and index < len(candidates):
+                done, _ = await asyncio.wait(pending, timeout=self.router.hedge_after)
+                if not done:
+                    self.router.hedges += 1
+                    pending.add(asyncio.create_task(self._request_model(candidates[index], payload)))
+                    index += 1
+
+            failover = True
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        text, ok, task_failover = task.result()
+                        if ok:
+                            if task is not primary:
+                                self.router.hedge_wins += 1
+                            return text, True
+                        error_message = text
+                        failover = failover and task_failover
+            finally:
+                # Die langsamere Anfrage abbrechen
+                for task in pending:
+                    task.cancel()
+
+            if not failover:
+                break
+
+        return error_message, False
+
+    async def stream_response(self, prompt, character_context, chat_history=None, memory_context=""):
+        """
+        Fragt OpenRouter im Streaming-Modus (SSE) an und liefert die Antwort
+        stückweise als Text-Deltas. Fehler werden als eine einzelne Antwort
+        im Charakter geliefert, damit der Aufrufer sie wie normalen Text behandeln kann.
+        Scheitert ein Modell vor dem ersten Token, wird das nächste versucht.
+        """
+        try:
+            payload = self._build_payload(prompt, chat_history, stream=True, memory_context=memory_context)
+        except Exception as e:
+            yield self._error_message_for_exception(e)
+            return
+
+        candidates = self.router.ordered_models()
+        for attempt, model in enumerate(candidates):
+            if attempt > 0:
+                self.router.failovers += 1
+            last_attempt = attempt == len(candidates) - 1
+            rejection, is_probe = await self._admit_request()
+            if rejection:
+                yield rejection
+                return
+            request_start = time.perf_counter()
+            first_token_at = None
+            try:
+                session = await self.get_session()
+                self.http_stats["requests"] += 1
+                async with session.post(self.base_url, json={**payload, "model": model}) as response:
+                    if response.status != 200:
                         error_text = await response.text()
-                        error_json = {}
+                        self.router.record(model, time.perf_counter() - request_start, False)
+                        self._record_upstream_status(response)
+                        error_message = self._error_message_for_status(response.status, error_text)
+                        if not last_attempt and self._is_failover_status(response.status):
+                            continue
+                        yield error_message
+                        return
+
+                    # SSE-Stream zeilenweise lesen ("data: {...}", Kommentare beginnen mit ":")
+                    stream_failed = False
+                    async for raw_line in response.content:
+                        line = raw_line.decode('utf-8', errors='ignore').strip()
+                        if not line or line.startswith(':') or not line.startswith('data:'):
+                            continue
+                        data = line[5:].strip()
+                        if data == '[DONE]':
+                            break
 
-                        # Versuche, den Fehlertext als JSON zu parsen
                         try:
-                            error_json = json.loads(error_text)
-                        except:
-                            pass
-
-                        # Protokolliere den Fehler
-                        logging.error(f"API-Fehler: {response.status} - {error_text}")
-
-                        # Spezifische Fehlermeldungen basierend auf dem Statuscode
-                        if response.status == 429:
-                            # Rate-Limit-Fehler
-                            return "Tut mir leid, ich werde gerade zu oft benutzt. Das ist ein Token-Rate-Limit. Probier's morgen nochmal, dann hab ich wieder mehr Energie zum Schreiben."
-                        elif response.status == 401 or response.status == 403:
-                            # Authentifizierungsfehler
-                            return "Tut mir leid, ich hab gerade Probleme mit meiner Authentifizierung. Der Admin muss das fixen."
-                        elif response.status == 500 or response.status == 502 or response.status == 503 or response.status == 504:
-                            # Serverfehler
-                            return "Tut mir leid, der Server hat gerade Probleme. Probier's später nochmal, wenn der Server wieder läuft."
-                        elif "error" in error_json and "message" in error_json["error"]:
-                            # Spezifische Fehlermeldung aus der API
-                            error_message = error_json["error"]["message"]
-
-                            # Prüfe auf bekannte Fehlermeldungen
-                        if "error" in error_json and "message" in error_json["error"]:
-                            error_message = error_json["error"]["message"]
-                            if "rate limit" in error_message.lower() or "quota" in error_message.lower():
-                                return "Tut mir leid, ich werde gerade zu oft benutzt. Das ist ein Token-Rate-Limit. Probier's morgen nochmal, dann hab ich wieder mehr Energie zum Schreiben."
-                            elif "token" in error_message.lower():
-                                return "Tut mir leid, ich hab gerade Probleme mit meinem Token. Der Admin muss das fixen."
+                            chunk = json.loads(data)
+                        except json.JSONDecodeError:
+                            continue
+
+                        # Fehler mitten im Stream
+                        if "error" in chunk:
+                            self.router.record(model, time.perf_counter() - request_start, False)
+                            self.breaker.record_failure("server")
+                            if first_token_at is None:
+                                error_message = self._error_message_for_status(
+                                    chunk["error"].get("code", 500), json.dumps(chunk)
+                                )
+                                if not last_attempt:
+                                    stream_failed = True
+                                    break
+                                yield error_message
                             else:
-                                return "Tut mir leid, ich hab gerade ein Problem mit meinem Kopf. Probier's später nochmal."
-                        else:
-                            # Allgemeine Fehlermeldung
-                            return "Tut mir leid, ich hab gerade ein Problem mit meinem Kopf. Probier's später nochmal."
+                                logging.error(f"API-Fehler im Stream: {chunk['error']}")
+                            return
+
+                        # OpenRouter liefert "usage" im letzten Chunk
+                        if chunk.get("usage"):
+                            self._record_usage(chunk["usage"])
+
+                        choices = chunk.get("choices") or []
+                        if not choices:
+                            continue
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            if first_token_at is None:
+                                first_token_at = time.perf_counter()
+                                self.stream_stats["ttft"].append(first_token_at - request_start)
+                            yield delta
+
+                    if stream_failed:
+                        continue
+
+                total = time.perf_counter() - request_start
+                self.http_stats["request_latencies"].append(total)
+                self.stream_stats["generation_times"].append(total)
+                self.router.record(model, total, True)
+                self.breaker.record_success()
+                return
 
-        except Exception as e:
-            logging.error(f"Fehler bei der API-Anfrage: {str(e)}")
-
-            # Spezifische Fehlermeldungen basierend auf der Exception
-            if "timeout" in str(e).lower() or "connection" in str(e).lower():
-                return "Tut mir leid, ich hab gerade Verbindungsprobleme. Probier's später nochmal, wenn mein Internet wieder besser ist."
-            else:
-                return "Sorry, das tägliche Rate-Limit ist erreicht. Um das zu verhindern, braucht der Bot eine kleine Spende. Probier's morgen nochmal."
+            except Exception as e:
+                self.router.record(model, time.perf_counter() - request_start, False)
+                self.breaker.record_failure("connection")
+                if first_token_at is None:
+                    if not last_attempt:
+                        logging.warning(f"KI-Modell {model} fehlgeschlagen ({str(e)}), weiche auf nächstes Modell aus")
+                        continue
+                    yield self._error_message_for_exception(e)
+                else:
+                    logging.error(f"Stream abgebrochen: {str(e)}")
+                return
+            finally:
+                if is_probe:
+                    self.breaker.release_probe()
+
+    def get_stream_stats(self):
+        """Gibt Time-to-First-Token und Gesamtdauer der Streams zurück (in Millisekunden)"""
+        ttft = list(self.stream_stats["ttft"])
+        generation_times = list(self.stream_stats["generation_times"])
+        return {
+            "streams": len(generation_times),
+            "ttft_p50_ms": round(percentile(ttft, 50) * 1000, 1),
+            "ttft_p95_ms": round(percentile(ttft, 95) * 1000, 1),
+            "total_p50_ms": round(percentile(generation_times, 50) * 1000, 1),
+            "total_p95_ms": round(percentile(generation_times, 95) * 1000, 1)
+        }
 
 # Die STATUS_MESSAGES-Liste wurde entfernt, da sie nicht verwendet wird und redundant ist
 
+async def _sync_stream_messages(message, sent_messages, text):
+    """Verteilt den bisherigen Text auf eine oder mehrere Discord-Nachrichten (je max. 2000 Zeichen)"""
+    chunks = [text[i:i + DISCORD_MESSAGE_LIMIT] for i in range(0, len(text), DISCORD_MESSAGE_LIMIT)]
+    for index, chunk in enumerate(chunks):
+        if index < len(sent_messages):
+            sent_msg, shown = sent_messages[index]
+            if chunk != shown:
+                await sent_msg.edit(content=chunk)
+                sent_messages[index] = (sent_msg, chunk)
+        elif index == 0:
+            sent_messages.append((await message.reply(chunk), chunk))
+        else:
+            sent_messages.append((await message.channel.send(chunk), chunk))
+
+async def send_streaming_reply(message, stream):
+    """
+    Konsumiert einen Antwort-Stream und zeigt ihn progressiv in Discord an.
+    Die Antwort wird nach dem ersten Satz gepostet und danach höchstens alle
+    STREAM_EDIT_INTERVAL Sekunden editiert.
+
+    Returns:
+        tuple: (vollständiger Antworttext, erste gesendete Nachricht oder None)
+    """
+    text = ""
+    sent_messages = []  # Liste von (Nachricht, angezeigter Text)
+    last_edit = 0.0
+
+    async for delta in stream:
+        text += delta
+        now = time.monotonic()
+        if not sent_messages:
+            # Erst posten, wenn der erste Satz komplett ist
+            if SENTENCE_END_PATTERN.search(text) or len(text) >= STREAM_FIRST_POST_CHARS:
+                await _sync_stream_messages(message, sent_messages, text.strip())
+                last_edit = now
+        elif now - last_edit >= STREAM_EDIT_INTERVAL:
+            await _sync_stream_messages(message, sent_messages, text.strip())
+            last_edit = now
+
+    text = text.strip()
+    if not text:
+        text = "Tut mir leid, ich hab gerade ein Problem mit meinem Kopf. Probier's später nochmal."
+
+    # Letzter Stand: vollständige Antwort anzeigen
+    await _sync_stream_messages(message, sent_messages, text)
+
+    return text, sent_messages[0][0] if sent_messages else None
+
 # Funktion zum Registrieren der KI-Befehle
 async def log_ki_interaction(client, message, prompt, response=None, is_request=True):
     """
@@ -400,7 +2316,32 @@ async def log_ki_interaction(client, message, prompt, response=None, is_request=
 def register_ki_commands(client):
     # Initialisierung der KI-Komponenten
     client.session_manager = SessionManager()
+    client.ki_scheduler = KIRequestScheduler()
+    client.response_cache = ResponseCache()
+    client.ki_pipeline = KIBackgroundPipeline()
+    client.ki_context_assembler = KIContextAssembler()
+    client.conversation_summarizer = ConversationSummarizer(client)
+    client.ki_quota = KIQuotaManager()
+    client.ki_prefilter = KIPrefilter()
     client.eliza_client = ElizaOSClient(os.environ.get('OPENROUTER_KEY'))
+    client.eliza_client.usage_callback = client.ki_quota.record_current
+    # System-Prompt beim Start vorkompilieren, damit die erste Anfrage kein Datei-I/O hat
+    client.eliza_client.prompt_cache.get_system_prompt()
+
+    # Zustandswechsel des Circuit Breakers im Logging-Channel melden
+    def on_breaker_state_change(old_state, new_state, breaker):
+        logging_channel = client.get_channel(client.logging_channel) if hasattr(client, 'logging_channel') else None
+        if logging_channel is None:
+            return
+        icons = {CircuitBreaker.OPEN: "🔴", CircuitBreaker.HALF_OPEN: "🟡", CircuitBreaker.CLOSED: "🟢"}
+        text = f"{icons.get(new_state, '')} KI-Circuit-Breaker: {old_state} → {new_state}"
+        if new_state == CircuitBreaker.OPEN:
+            text += f" (letzter Fehler: {breaker.last_error}, Sperre {breaker.get_stats()['open_remaining_s']}s)"
+        asyncio.get_running_loop().create_task(
+            client.ki_pipeline.submit("log_breaker", logging_channel.send, text, retry=False)
+        )
+
+    client.eliza_client.breaker.on_state_change = on_breaker_state_change
     client.message_history = {}
 
     # Memory Manager initialisieren (falls nicht bereits vorhanden)
@@ -435,92 +2376,40 @@ def register_ki_commands(client):
     # Lade vorhandene Benutzer-Sessions falls verfügbar
     client.session_manager.load_sessions()
 
+    # Hintergrund-Task zum Kompaktieren des Session-Journals (wird in on_ready gestartet)
+    @tasks.loop(minutes=SESSION_COMPACTION_MINUTES)
+    async def ki_session_compaction_task():
+        await client.session_manager.compact()
+
+    client.ki_session_compaction_task = ki_session_compaction_task
+
     # Memory-Statistiken in KI-Stats integrieren
     if hasattr(client, 'memory_manager'):
         try:
-            all_memories = client.memory_manager.get_all_memories()
-            client.ki_stats["total_users"] = len(all_memories)
-            logging.info(f"Memory-System geladen: {len(all_memories)} Benutzer mit Erinnerungen")
+            memory_count = client.memory_manager.count_memories()
+            client.ki_stats["total_users"] = memory_count
+            logging.info(f"Memory-System geladen: {memory_count} Benutzer mit Erinnerungen")
         except Exception as e:
             logging.error(f"Fehler beim Laden der Memory-Statistiken: {str(e)}")
 
     # Die KI-Funktionalität wird jetzt in main.py implementiert
     # Wir erstellen eine Hilfsfunktion, die von dort aufgerufen werden kann
 
-# Funktion zum Laden der Emoji-IDs
-def load_emoji_ids():
-    """Lädt die Emoji-IDs aus der ids.txt Datei"""
-    emoji_data = {}
-    try:
-        # Versuche verschiedene Pfade für die Emoji-IDs
-        emoji_paths = [
-            'data/emojis/ids.txt',
-            'src/data/emojis/ids.txt',
-            '../data/emojis/ids.txt',
-            '/app/data/emojis/ids.txt'
-        ]
-        
-        for path in emoji_paths:
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    
-                # Parse die Datei - jede 4. Zeile enthält die ID
-                for i in range(0, len(lines), 4):
-                    if i + 3 < len(lines):
-                        emoji_name = lines[i].strip()
-                        emoji_id = lines[i + 3].strip()
-                        if emoji_name and emoji_id.isdigit():
-                            emoji_data[emoji_name] = int(emoji_id)
-                break
-            except FileNotFoundError:
-                continue
-                
-    except Exception as e:
-        logging.error(f"Fehler beim Laden der Emoji-IDs: {str(e)}")
-        # Fallback mit bekannten Emoji-IDs
-        emoji_data = {
-            'drache_mozerella_headset': 1395736548917645434,
-            'drache_zahnlücke': 1395736315521400923,
-            'drache_meddl_loide': 1395736247258972280,
-            'drache_suspekt': 1395736270076117032
-        }
-    
-    return emoji_data
-
 # Automatische Fact-Extraktion mit intelligenter Erkennung
-async def extract_and_store_facts(client, user_id, user_message, bot_response):
+async def extract_and_store_facts(client, user_id, user_message, bot_response, keyword_hits=None):
     """
     Extrahiert automatisch wichtige Fakten aus Benutzerinteraktionen
     und speichert sie im Memory-System (ähnlich ChatGPT memories)
     """
     try:
-        # Erweiterte Keywords für bessere Erkennung
-        personal_info_keywords = [
-            "ich bin", "ich heiße", "mein name ist", "ich arbeite als", "ich studiere",
-            "ich wohne in", "ich komme aus", "ich lebe in", "ich bin geboren",
-            "mein alter", "jahre alt", "geburtstag", "ich mag", "ich liebe",
-            "ich hasse", "ich spiele", "mein hobby", "ich interessiere mich",
-            "ich schaue", "ich höre", "ich lese", "ich sammle", "meine familie",
-            "mein job", "meine arbeit", "mein beruf", "ich verdiene", "ich arbeite bei"
-        ]
-
-        gaming_keywords = [
-            "ich spiele", "mein lieblingsspiel", "ich zocke", "steam", "playstation",
-            "xbox", "nintendo", "pc gaming", "konsole", "rank", "level", "main"
-        ]
-
-        location_keywords = [
-            "ich wohne", "ich lebe", "komme aus", "geboren in", "stadt", "land",
-            "deutschland", "österreich", "schweiz", "plz", "postleitzahl"
-        ]
-
-        message_lower = user_message.lower()
+        # Keyword-Treffer aus einem einzigen Durchlauf des Automaten
+        if keyword_hits is None:
+            keyword_hits = scan_message(user_message)
 
         # Prüfe verschiedene Kategorien
-        contains_personal = any(keyword in message_lower for keyword in personal_info_keywords)
-        contains_gaming = any(keyword in message_lower for keyword in gaming_keywords)
-        contains_location = any(keyword in message_lower for keyword in location_keywords)
+        contains_personal = ("fact", "personal") in keyword_hits
+        contains_gaming = ("fact", "gaming") in keyword_hits
+        contains_location = ("fact", "location") in keyword_hits
 
         # Mindestlänge und Relevanz prüfen
         if (contains_personal or contains_gaming or contains_location) and len(user_message) > 15:
@@ -528,13 +2417,13 @@ async def extract_and_store_facts(client, user_id, user_message, bot_response):
 
             # Kategorisierte Fact-Extraktion
             if contains_personal:
-                if any(word in message_lower for word in ["heiße", "name ist", "bin"]):
+                if ("detail", "name") in keyword_hits:
                     potential_facts.append(f"Persönliche Info: {user_message}")
 
-                if any(word in message_lower for word in ["arbeite", "job", "beruf", "studiere"]):
+                if ("detail", "beruf") in keyword_hits:
                     potential_facts.append(f"Beruf/Ausbildung: {user_message}")
 
-                if any(word in message_lower for word in ["mag", "liebe", "hobby", "interessiere"]):
+                if ("detail", "interessen") in keyword_hits:
                     potential_facts.append(f"Interessen: {user_message}")
 
             if contains_gaming:
@@ -543,15 +2432,9 @@ async def extract_and_store_facts(client, user_id, user_message, bot_response):
             if contains_location:
                 potential_facts.append(f"Standort-Info: {user_message}")
 
-            # Speichere nur relevante und neue Fakten
+            # Speichere nur relevante und neue Fakten (Duplikate erkennt der Fakten-Index)
             for fact in potential_facts:
-                # Prüfe ob ähnlicher Fakt bereits existiert
-                existing_memory = client.memory_manager.load_memory(user_id)
-                fact_exists = any(fact.lower() in existing_fact.lower() or existing_fact.lower() in fact.lower()
-                                for existing_fact in existing_memory.get("important_facts", []))
-
-                if not fact_exists:
-                    client.memory_manager.add_important_fact(user_id, fact)
+                if client.memory_manager.add_important_fact(user_id, fact):
                     logging.info(f"Neuer automatischer Fakt für User {user_id}: {fact[:60]}...")
 
     except Exception as e:
@@ -563,74 +2446,47 @@ async def extract_and_store_facts_with_mcp(client, user_id, user_message, bot_re
     Erweiterte automatische Fact-Extraktion mit MCP Memory Server
     für noch intelligentere Erkennung wichtiger Benutzerinformationen
     """
+    extracted_complex_facts = []
     try:
+        # Nachricht einmal scannen, alle Extraktionsschritte teilen sich die Treffer
+        keyword_hits = scan_message(user_message)
+
         # Erst die normale Fact-Extraktion durchführen
-        await extract_and_store_facts(client, user_id, user_message, bot_response)
+        await extract_and_store_facts(client, user_id, user_message, bot_response, keyword_hits)
 
         # Zusätzliche MCP-basierte Analyse für komplexere Fakten
         if len(user_message) > 30:  # Nur bei längeren Nachrichten
             # Prüfe auf komplexere Muster
-            complex_patterns = {
-                "beziehung": ["freundin", "freund", "partner", "verheiratet", "single", "beziehung"],
-                "wohnsituation": ["wg", "alleine", "eltern", "mitbewohner", "eigene wohnung"],
-                "ausbildung": ["uni", "universität", "fachhochschule", "ausbildung", "lehre", "studium"],
-                "gaming_details": ["main", "rank", "elo", "level", "clan", "guild", "team"],
-                "persönlichkeit": ["introvertiert", "extrovertiert", "schüchtern", "offen", "lustig"],
-                "probleme": ["stress", "probleme", "schwierigkeiten", "sorgen", "angst"]
-            }
-
-            message_lower = user_message.lower()
-            extracted_complex_facts = []
-
-            for category, keywords in complex_patterns.items():
-                if any(keyword in message_lower for keyword in keywords):
+            for category in COMPLEX_PATTERNS:
+                if ("complex", category) in keyword_hits:
                     # Erstelle kategorisierten Fakt
                     fact = f"{category.title()}: {user_message}"
                     extracted_complex_facts.append(fact)
 
-            # Speichere komplexe Fakten
+            # Speichere komplexe Fakten (Duplikate erkennt der Fakten-Index)
             for fact in extracted_complex_facts:
-                # Prüfe Duplikate
-                existing_memory = client.memory_manager.load_memory(user_id)
-                fact_exists = any(fact.lower() in existing_fact.lower() or existing_fact.lower() in fact.lower()
-                                for existing_fact in existing_memory.get("important_facts", []))
-
-                if not fact_exists:
-                    client.memory_manager.add_important_fact(user_id, fact)
+                if client.memory_manager.add_important_fact(user_id, fact):
                     logging.info(f"Komplexer MCP-Fakt gespeichert für User {user_id}: {fact[:60]}...")
 
         # Zusätzlich: Themen-Extraktion
-        await extract_topics_from_conversation(client, user_id, user_message, bot_response)
+        await extract_topics_from_conversation(client, user_id, user_message, bot_response, keyword_hits)
 
         # MCP Memory Server Integration für intelligente Fact-Speicherung
-        await store_facts_in_mcp_memory(client, user_id, user_message, extracted_complex_facts if 'extracted_complex_facts' in locals() else [])
+        await store_facts_in_mcp_memory(client, user_id, user_message, extracted_complex_facts)
 
     except Exception as e:
         logging.error(f"Fehler bei MCP-basierter Fact-Extraktion: {str(e)}")
 
 # Themen-Extraktion aus Gesprächen
-async def extract_topics_from_conversation(client, user_id, user_message, bot_response):
+async def extract_topics_from_conversation(client, user_id, user_message, bot_response, keyword_hits=None):
     """
     Extrahiert besprochene Themen aus der Konversation
     """
     try:
-        topic_keywords = {
-            "gaming": ["spiel", "game", "zocken", "steam", "konsole", "pc"],
-            "arbeit": ["job", "arbeit", "chef", "kollege", "büro", "homeoffice"],
-            "schule": ["schule", "lehrer", "klasse", "prüfung", "hausaufgaben"],
-            "familie": ["mama", "papa", "eltern", "geschwister", "oma", "opa"],
-            "freizeit": ["hobby", "sport", "musik", "film", "serie", "buch"],
-            "technik": ["computer", "handy", "software", "programmieren", "code"],
-            "essen": ["essen", "kochen", "restaurant", "pizza", "burger"],
-            "reisen": ["urlaub", "reise", "fliegen", "hotel", "strand"]
-        }
+        if keyword_hits is None:
+            keyword_hits = scan_message(user_message)
 
-        message_lower = user_message.lower()
-        discussed_topics = []
-
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                discussed_topics.append(topic)
+        discussed_topics = [topic for topic in TOPIC_KEYWORDS if ("topic", topic) in keyword_hits]
 
         # Speichere Themen
         for topic in discussed_topics:
@@ -664,10 +2520,10 @@ async def store_facts_in_mcp_memory(client, user_id, user_message, extracted_fac
             if new_observations:
                 # Hier würde normalerweise der MCP Memory Server aufgerufen werden
                 # Für jetzt speichern wir es im lokalen Memory-System
-                for observation in new_observations:
-                    client.memory_manager.add_important_fact(user_id, observation)
+                stored = sum(1 for observation in new_observations
+                             if client.memory_manager.add_important_fact(user_id, observation))
 
-                logging.info(f"MCP Memory: {len(new_observations)} Fakten für User {user_id} gespeichert")
+                logging.info(f"MCP Memory: {stored} Fakten für User {user_id} gespeichert")
 
         except Exception as e:
             logging.error(f"Fehler bei MCP Memory Integration: {str(e)}")
@@ -675,6 +2531,35 @@ async def store_facts_in_mcp_memory(client, user_id, user_message, extracted_fac
     except Exception as e:
         logging.error(f"Fehler bei MCP Memory Speicherung: {str(e)}")
 
+def store_interaction_in_memory(client, message, prompt, response):
+    """Speichert eine Interaktion samt Benutzerinformationen im langfristigen Memory"""
+    # Benutzerinformationen für Memory sammeln
+    user_info = {
+        "name": message.author.display_name,
+        "username": message.author.name,
+        "guild": message.guild.name if message.guild else "DM"
+    }
+    client.memory_manager.add_interaction(message.author.id, prompt, response, user_info)
+
+async def queue_post_reply_work(client, message, prompt, response):
+    """Reiht alle Arbeiten ein, die erst nach der gesendeten Antwort nötig sind"""
+    pipeline = client.ki_pipeline
+    # Verlauf sofort festhalten (Journal-Append bzw. Änderung im Memory-Cache, geschrieben wird
+    # gebündelt), damit die nächste Nachricht des Users die Runde schon im Kontext hat
+    try:
+        # Interaktion im Session Manager (verwende ursprünglichen Prompt)
+        client.session_manager.add_interaction(message.author.id, prompt, response)
+        if hasattr(client, 'memory_manager'):
+            store_interaction_in_memory(client, message, prompt, response)
+    except Exception as e:
+        logging.error(f"Fehler beim Speichern der Interaktion: {str(e)}")
+    if hasattr(client, 'memory_manager'):
+        # Fakten werden dedupliziert, ein erneuter Versuch ist unkritisch
+        await pipeline.submit("facts", extract_and_store_facts_with_mcp, client, message.author.id, prompt, response)
+        pipeline.spawn("summary", client.conversation_summarizer.maybe_summarize, message.author.id)
+    await pipeline.submit("stats", update_stats, client, "message", retry=False)
+    await pipeline.submit("log_response", log_ki_interaction, client, message, prompt, response, False, retry=False)
+
 # Exportierte Funktion für die Verarbeitung von KI-Nachrichten
 async def handle_ki_message(client, message):
     """
@@ -700,8 +2585,25 @@ async def handle_ki_message(client, message):
         if mentioned:
             prompt = prompt.replace(f'<@{client.user.id}>', '').strip()
 
-        # Anfrage im Logging-Channel protokollieren
-        await log_ki_interaction(client, message, prompt, is_request=True)
+        # Leere, NSFW-, beleidigende und Spam-Prompts lokal beantworten, ohne Upstream-Aufruf
+        blocked_category, canned_reply = client.ki_prefilter.check(prompt)
+        if blocked_category is not None:
+            await client.ki_pipeline.submit("log_request", log_ki_interaction, client, message, prompt, None, True, retry=False)
+            await message.reply(canned_reply)
+            return True
+
+        # Token-Kontingent von User und Server prüfen
+        guild_id = message.guild.id if message.guild else None
+        within_quota, exhausted, retry_after = client.ki_quota.check(message.author.id, guild_id)
+        if not within_quota:
+            template = QUOTA_EXCEEDED_MESSAGE if exhausted == "user" else GUILD_QUOTA_EXCEEDED_MESSAGE
+            await message.reply(template.format(minutes=max(1, round(retry_after / 60))))
+            return True
+        # Token-Kosten dieser Anfrage (inkl. Failover/Hedging) User und Server zurechnen
+        KI_USAGE_OWNER.set((message.author.id, guild_id))
+
+        # Anfrage im Logging-Channel protokollieren (im Hintergrund, blockiert die Antwort nicht)
+        await client.ki_pipeline.submit("log_request", log_ki_interaction, client, message, prompt, None, True, retry=False)
 
         async with message.channel.typing():
             # Konversationskontext
@@ -711,103 +2613,77 @@ async def handle_ki_message(client, message):
                 "channel_name": message.channel.name if hasattr(message.channel, 'name') else "Direktnachricht"
             }
 
-            # Memory-Kontext aus langfristigem Speicher laden
-            memory_context = ""
-            if hasattr(client, 'memory_manager'):
-                try:
-                    memory_context = client.memory_manager.get_memory_context(message.author.id)
-                    if memory_context.strip():
-                        memory_context = f"\n\nLangfristige Erinnerungen über diesen User:\n{memory_context}"
-                except Exception as e:
-                    logging.error(f"Fehler beim Laden des Memory-Kontexts: {str(e)}")
-
-            # Füge Kontext über erwähnte Benutzer hinzu
-            mentioned_users_context = ""
-            if message.mentions:
-                mentioned_users_info = []
-                for mentioned_user in message.mentions:
-                    if mentioned_user != client.user:  # Bot selbst nicht einschließen
-                        user_info = f"{mentioned_user.display_name} (ID: {mentioned_user.id})"
-                        # Benutzer-Statistiken hinzufügen falls verfügbar
-                        user_stats = client.session_manager.get_user_stats(mentioned_user.id)
-                        if user_stats["total_messages"] > 0:
-                            user_info += f" - hat {user_stats['total_messages']} mal mit mir geredet"
-                        else:
-                            user_info += " - hat noch nie mit mir geredet"
-                        mentioned_users_info.append(user_info)
-
-                if mentioned_users_info:
-                    mentioned_users_context = f"\n\nErwähnte User in dieser Nachricht: {', '.join(mentioned_users_info)}"
-
-            # Erweiterter Prompt mit Benutzerkontext und Memory
-            enhanced_prompt = prompt + memory_context + mentioned_users_context
-
-            # Frühere Gesprächsdaten abrufen
-            chat_history = client.session_manager.get_user_context(message.author.id)
-
-            # Antwort generieren mit Gesprächsverlauf und enhanced context
-            response = await client.eliza_client.generate_response(enhanced_prompt, context, chat_history)
-
-            # Speichere Interaktion im Session Manager (verwende ursprünglichen Prompt)
-            client.session_manager.add_interaction(message.author.id, prompt, response)
-
-            # Speichere Interaktion im langfristigen Memory
-            if hasattr(client, 'memory_manager'):
-                try:
-                    # Benutzerinformationen für Memory sammeln
-                    user_info = {
-                        "name": message.author.display_name,
-                        "username": message.author.name,
-                        "guild": message.guild.name if message.guild else "DM"
-                    }
-
-                    # Interaktion in langfristigem Memory speichern
-                    client.memory_manager.add_interaction(
-                        message.author.id,
-                        prompt,
-                        response,
-                        user_info
-                    )
-                except Exception as e:
-                    logging.error(f"Fehler beim Speichern in Memory: {str(e)}")
+            # Memory-Kontext, erwähnte User und Chat-History parallel zusammenstellen
+            memory_context, mentioned_users_context, chat_history = await client.ki_context_assembler.assemble(
+                client, message, prompt
+            )
+
+            # Erweiterter Prompt mit Benutzerkontext (Memory wird vom PromptAssembler nach Budget eingefügt)
+            enhanced_prompt = prompt + mentioned_users_context
+
+            # Nur kurze, kontextfreie Prompts (ohne erwähnte User, Verlauf und Erinnerungen)
+            # werden gecacht und zusammengefasst, persönliche Antworten nie
+            cache_key = None
+            if not (mentioned_users_context or chat_history or memory_context):
+                cache_key = client.response_cache.make_key(prompt)
+
+            response_msg = None
+            if cache_key is not None:
+                async def fetch_uncached():
+                    if not await client.ki_scheduler.acquire(KIRequestScheduler.key_for_message(message)):
+                        return None, False
+                    try:
+                        return await client.eliza_client.generate_response_with_status(
+                            enhanced_prompt, context, chat_history, memory_context=memory_context
+                        )
+                    finally:
+                        client.ki_scheduler.release()
 
-            # Automatische Fact-Extraktion (asynchron im Hintergrund)
-            if hasattr(client, 'memory_manager'):
-                try:
-                    await extract_and_store_facts_with_mcp(client, message.author.id, prompt, response)
-                except Exception as e:
-                    logging.error(f"Fehler bei automatischer Fact-Extraktion: {str(e)}")
+                response = await client.response_cache.get_or_fetch(cache_key, fetch_uncached)
+                if response is None:
+                    await message.reply(BUSY_MESSAGE)
+                    return True
+            else:
+                # Platz in der KI-Warteschlange anfordern (fair zwischen Servern/DMs)
+                if not await client.ki_scheduler.acquire(KIRequestScheduler.key_for_message(message)):
+                    await message.reply(BUSY_MESSAGE)
+                    return True
 
-            # Statistik aktualisieren
-            update_stats(client, "message")
+                # Antwort generieren mit Gesprächsverlauf und enhanced context
+                try:
+                    if KI_STREAMING:
+                        # Antwort wird schon während der Generierung gepostet und editiert
+                        response, response_msg = await send_streaming_reply(
+                            message,
+                            client.eliza_client.stream_response(
+                                enhanced_prompt, context, chat_history, memory_context=memory_context
+                            )
+                        )
+                    else:
+                        response = await client.eliza_client.generate_response(
+                            enhanced_prompt, context, chat_history, memory_context=memory_context
+                        )
+                finally:
+                    client.ki_scheduler.release()
 
-            # Antwort im Logging-Channel protokollieren
-            await log_ki_interaction(client, message, prompt, response, is_request=False)
+            # Antwort senden (beim Streaming bereits geschehen)
+            if response_msg is None:
+                api_returned = time.perf_counter()
+                response_msg = await message.reply(response)
+                client.ki_pipeline.record_reply_latency(time.perf_counter() - api_returned)
 
-            # Antwort senden
-            response_msg = await message.reply(response)
+            # Speichern, Fact-Extraktion, Statistik und Logging laufen nach der Antwort im Hintergrund
+            await queue_post_reply_work(client, message, prompt, response)
 
             # 15% Chance für Emoji-Reaktionen
             if random.random() < 0.15:
                 try:
-                    # Lade Emoji-Daten
-                    emoji_data = load_emoji_ids()
-                    
-                    if emoji_data:
-                        # Wähle 1-3 zufällige Emojis
-                        emoji_names = list(emoji_data.keys())
-                        num_emojis = random.randint(1, min(3, len(emoji_names)))
-                        selected_emojis = random.sample(emoji_names, num_emojis)
-                        
-                        # Sende Emojis als separate Nachricht für bessere mobile Darstellung
-                        emoji_message = ""
-                        for emoji_name in selected_emojis:
-                            emoji_id = emoji_data[emoji_name]
-                            emoji_message += f"<:{emoji_name}:{emoji_id}> "
-                        
-                        if emoji_message.strip():
-                            await message.channel.send(emoji_message.strip())
-                            
+                    # Wähle 1-3 zufällige Emojis aus der beim Start geladenen Registry
+                    selected_emojis = client.emoji_registry.random_emojis(3) if hasattr(client, 'emoji_registry') else []
+
+                    # Sende Emojis als separate Nachricht für bessere mobile Darstellung
+                    if selected_emojis:
+                        await message.channel.send(" ".join(selected_emojis))
                 except Exception as e:
                     logging.error(f"Fehler beim Senden der Emojis: {str(e)}")
 
@@ -826,6 +2702,7 @@ def update_stats(client, event_type=None):
     if hasattr(client, 'session_manager'):
         client.ki_stats["total_users"] = client.session_manager.get_total_users()
         client.ki_stats["active_sessions"] = client.session_manager.get_active_sessions()
+        client.ki_stats["active_users"] = client.session_manager.get_activity_distribution()
 
     # Statistiken alle 10 Aktualisierungen speichern
     if (client.ki_stats["commandCount"] + client.ki_stats["messageCount"]) % 10 == 0:
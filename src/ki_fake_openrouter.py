@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Lokaler Ersatz für OpenRouter (/api/v1/chat/completions) für Last- und
+Ausfalltests der KI ohne echtes Kontingent.
+
+Unterstützt normale JSON-Antworten und SSE-Streaming, konfigurierbare
+Latenzverteilungen, eingestreute 429- und 5xx-Fehler sowie eine
+Token-Abrechnung wie bei OpenRouter ("usage"). GET /stats liefert die
+Zähler als JSON.
+
+Standalone:
+    python ki_fake_openrouter.py --port 8089 --latency lognormal:0.8,0.5 --rate-429 0.05
+Danach den Bot mit OPENROUTER_BASE_URL=http://127.0.0.1:8089/api/v1/chat/completions starten.
+"""
+
+import json
+import math
+import random
+import asyncio
+import argparse
+import collections
+
+from aiohttp import web
+
+COMPLETIONS_PATH = "/api/v1/chat/completions"
+
+# Antworten im Stil des Bots, damit nachgelagerte Schritte (Fakten, Emojis) realistische Texte sehen
+FAKE_REPLIES = [
+    "Meddl Loide! Des is doch ganz klar, ich bin der Drache und ich weiß des besser als ihr alle.",
+    "Etzala hör amal zu, ich hab koa Zeit für so an Schmarrn. Ich muss mich um mei Haus kümmern.",
+    "Des is a Frechheit, was du da schreibst. Aber gut, ich erklär's dir nochmal ganz langsam.",
+    "Ja genau, so isses. Und wer des ned versteht, der is halt a Hater. Meddl off.",
+]
+
+def estimate_tokens(text):
+    """Grobe Token-Schätzung (~4 Zeichen pro Token), wie im PromptAssembler"""
+    return (len(text) + 3) // 4
+
+def parse_latency(spec, rng=random):
+    """
+    Erzeugt eine Funktion, die Latenzen in Sekunden zieht.
+    Formate: "fixed:0.5", "uniform:0.2,1.5", "lognormal:median,sigma"
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unbekannte Latenzverteilung: {spec}")
+
+class FakeOpenRouter:
+    """aiohttp-Server, der die Chat-Completions-API von OpenRouter nachbildet"""
+    def __init__(self, latency="fixed:0.2", token_delay=0.01, rate_429=0.0, rate_5xx=0.0,
+                 retry_after=None, model_latency=None, seed=None):
+        self.random = random.Random(seed)
+        self.latency = parse_latency(latency, self.random)
+        # Optionale Latenz pro Modell, z.B. {"moonshotai/kimi-k2:free": "fixed:3"}
+        self.model_latency = {model: parse_latency(spec, self.random) for model, spec in (model_latency or {}).items()}
+        self.token_delay = token_delay
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.runner = None
+        self.url = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            "requests": 0,
+            "streams": 0,
+            "completed": 0,
+            "cancelled": 0,
+            "errors": collections.Counter(),
+            "models": collections.Counter(),
+            "prompt_tokens": 0,
+            "completion_tokens": 0
+        }
+
+    def _choose_error(self):
+        roll = self.random.random()
+        if roll < self.rate_429:
+            return 429
+        if roll < self.rate_429 + self.rate_5xx:
+            return self.random.choice((500, 502, 503))
+        return None
+
+    def _error_response(self, status):
+        self.stats["errors"][status] += 1
+        headers = {}
+        if status == 429:
+            message = "Rate limit exceeded: free-models-per-min"
+            if self.retry_after:
+                headers["Retry-After"] = str(self.retry_after)
+        else:
+            message = "Upstream provider error"
+        body = {"error": {"code": status, "message": message}}
+        return web.json_response(body, status=status, headers=headers)
+
+    async def handle_completions(self, request):
+        self.stats["requests"] += 1
+        try:
+            payload = await request.json()
+        except Exception:
+            return web.json_response({"error": {"code": 400, "message": "Invalid JSON"}}, status=400)
+
+        model = payload.get("model", "unknown")
+        self.stats["models"][model] += 1
+        latency = self.model_latency.get(model, self.latency)()
+
+        try:
+            await asyncio.sleep(max(0.0, latency))
+        except asyncio.CancelledError:
+            # Client hat abgebrochen (z.B. verlorene Hedge-Anfrage)
+            self.stats["cancelled"] += 1
+            raise
+
+        status = self._choose_error()
+        if status is not None:
+            return self._error_response(status)
+
+        prompt_tokens = sum(estimate_tokens(message.get("content", "")) for message in payload.get("messages", []))
+        reply = self.random.choice(FAKE_REPLIES)
+        max_tokens = payload.get("max_tokens") or 2048
+        reply = reply[:max_tokens * 4]
+        completion_tokens = estimate_tokens(reply)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+        if payload.get("stream"):
+            return await self._stream_reply(request, model, reply, usage)
+
+        self._account(usage)
+        return web.json_response({
+            "id": f"gen-fake-{self.stats['requests']}",
+            "model": model,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    async def _stream_reply(self, request, model, reply, usage):
+        self.stats["streams"] += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        # OpenRouter sendet Keep-Alive-Kommentare, solange das Modell noch nachdenkt
+        await response.write(b": OPENROUTER PROCESSING\n\n")
+
+        words = reply.split(" ")
+        try:
+            for index, word in enumerate(words):
+                chunk = {
+                    "id": f"gen-fake-{self.stats['requests']}",
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word}}]
+                }
+                await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                if self.token_delay:
+                    await asyncio.sleep(self.token_delay)
+
+            final = {"id": f"gen-fake-{self.stats['requests']}", "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+            await response.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+            await response.write(b"data: [DONE]\n\n")
+        except (asyncio.CancelledError, ConnectionResetError):
+            self.stats["cancelled"] += 1
+            raise
+
+        self._account(usage)
+        return response
+
+    def _account(self, usage):
+        self.stats["completed"] += 1
+        self.stats["prompt_tokens"] += usage["prompt_tokens"]
+        self.stats["completion_tokens"] += usage["completion_tokens"]
+
+    def get_stats(self):
+        """Gibt die Zähler JSON-serialisierbar zurück"""
+        return {
+            **self.stats,
+            "errors": {str(status): count for status, count in self.stats["errors"].items()},
+            "models": dict(self.stats["models"])
+        }
+
+    async def handle_stats(self, request):
+        return web.json_response(self.get_stats())
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post(COMPLETIONS_PATH, self.handle_completions)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Startet den Server im laufenden Event-Loop; port=0 wählt einen freien Port"""
+        self.runner = web.AppRunner(self.make_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}{COMPLETIONS_PATH}"
+        return self.url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+def add_server_arguments(parser):
+    """Gemeinsame CLI-Optionen für Server und Lasttest"""
+    parser.add_argument("--latency", default="lognormal:0.8,0.5",
+                        help="Latenzverteilung: fixed:S, uniform:A,B oder lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Pause zwischen SSE-Chunks (s)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Anteil der Antworten mit 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Anteil der Antworten mit 5xx")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After-Header bei 429 (s)")
+    parser.add_argument("--seed", type=int, default=None)
+
+def server_from_args(args):
+    return FakeOpenRouter(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+
+async def _serve(args):
+    server = server_from_args(args)
+    url = await server.start(args.host, args.port)
+    print(f"🧪 Fake-OpenRouter läuft: {url} (Statistik: GET /stats)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler OpenRouter-Ersatz für KI-Lasttests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_server_arguments(parser)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
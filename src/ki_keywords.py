@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Keyword-Erkennung für die KI-Fact- und Themen-Extraktion.
+
+Alle Keyword-Listen (Fakten-Kategorien, komplexe Muster, Themen) werden
+in einen einzigen Aho-Corasick-Automaten kompiliert. Eine Nachricht wird
+damit genau einmal durchlaufen und liefert alle Treffer mit Position.
+
+Direkt ausgeführt (python ki_keywords.py) startet ein Micro-Benchmark
+gegen die bisherige Variante mit einzelnen any(...)-Schleifen.
+"""
+
+import collections
+import time
+
+# Keywords für die automatische Fact-Extraktion
+PERSONAL_INFO_KEYWORDS = [
+    "ich bin", "ich heiße", "mein name ist", "ich arbeite als", "ich studiere",
+    "ich wohne in", "ich komme aus", "ich lebe in", "ich bin geboren",
+    "mein alter", "jahre alt", "geburtstag", "ich mag", "ich liebe",
+    "ich hasse", "ich spiele", "mein hobby", "ich interessiere mich",
+    "ich schaue", "ich höre", "ich lese", "ich sammle", "meine familie",
+    "mein job", "meine arbeit", "mein beruf", "ich verdiene", "ich arbeite bei"
+]
+
+GAMING_KEYWORDS = [
+    "ich spiele", "mein lieblingsspiel", "ich zocke", "steam", "playstation",
+    "xbox", "nintendo", "pc gaming", "konsole", "rank", "level", "main"
+]
+
+LOCATION_KEYWORDS = [
+    "ich wohne", "ich lebe", "komme aus", "geboren in", "stadt", "land",
+    "deutschland", "österreich", "schweiz", "plz", "postleitzahl"
+]
+
+# Unterkategorien für persönliche Informationen
+PERSONAL_DETAIL_KEYWORDS = {
+    "name": ["heiße", "name ist", "bin"],
+    "beruf": ["arbeite", "job", "beruf", "studiere"],
+    "interessen": ["mag", "liebe", "hobby", "interessiere"]
+}
+
+# Komplexere Muster für die erweiterte (MCP-)Extraktion
+COMPLEX_PATTERNS = {
+    "beziehung": ["freundin", "freund", "partner", "verheiratet", "single", "beziehung"],
+    "wohnsituation": ["wg", "alleine", "eltern", "mitbewohner", "eigene wohnung"],
+    "ausbildung": ["uni", "universität", "fachhochschule", "ausbildung", "lehre", "studium"],
+    "gaming_details": ["main", "rank", "elo", "level", "clan", "guild", "team"],
+    "persönlichkeit": ["introvertiert", "extrovertiert", "schüchtern", "offen", "lustig"],
+    "probleme": ["stress", "probleme", "schwierigkeiten", "sorgen", "angst"]
+}
+
+# Themen, die in Gesprächen erkannt werden
+TOPIC_KEYWORDS = {
+    "gaming": ["spiel", "game", "zocken", "steam", "konsole", "pc"],
+    "arbeit": ["job", "arbeit", "chef", "kollege", "büro", "homeoffice"],
+    "schule": ["schule", "lehrer", "klasse", "prüfung", "hausaufgaben"],
+    "familie": ["mama", "papa", "eltern", "geschwister", "oma", "opa"],
+    "freizeit": ["hobby", "sport", "musik", "film", "serie", "buch"],
+    "technik": ["computer", "handy", "software", "programmieren", "code"],
+    "essen": ["essen", "kochen", "restaurant", "pizza", "burger"],
+    "reisen": ["urlaub", "reise", "fliegen", "hotel", "strand"]
+}
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick-Automat für die Suche vieler Keywords in einem Durchlauf.
+    Jedes Keyword trägt ein Label (z.B. ("topic", "gaming")); ein Keyword
+    kann mehrere Labels haben. Die Suche findet wie "keyword in text" auch
+    Treffer innerhalb von Wörtern.
+    """
+    def __init__(self):
+        self._goto = [{}]  # Übergänge pro Zustand
+        self._fail = [0]  # Fehlerlinks pro Zustand
+        self._output = [[]]  # (Keyword, Label) die in diesem Zustand enden
+        self._delta = []  # Vollständige Übergangstabelle (Goto + Fehlerlinks aufgelöst)
+        self._built = False
+
+    def add(self, keyword, label):
+        """Fügt ein Keyword mit Label hinzu (nur vor build())"""
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((keyword, label))
+        self._built = False
+
+    def build(self):
+        """Berechnet Fehlerlinks und die vollständige Übergangstabelle per Breitensuche"""
+        self._delta = [None] * len(self._goto)
+        self._delta[0] = dict(self._goto[0])
+        queue = collections.deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            # Übergänge des Fehler-Zustands erben, damit scan() ohne Rücksprünge auskommt
+            self._delta[state] = {**self._delta[self._fail[state]], **self._goto[state]}
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                # Ausgaben des Fehler-Zustands übernehmen (Keywords als Suffix)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+        return self
+
+    def scan(self, text):
+        """
+        Durchsucht den Text einmal und gibt alle Treffer gruppiert nach Label zurück.
+
+        Returns:
+            dict: Label -> Liste von (Startposition, Keyword)
+        """
+        if not self._built:
+            self.build()
+        hits = collections.defaultdict(list)
+        delta = self._delta
+        output = self._output
+        state = 0
+        for index, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if output[state]:
+                for keyword, label in output[state]:
+                    hits[label].append((index - len(keyword) + 1, keyword))
+        return hits
+
+def build_ki_matcher():
+    """Kompiliert alle Keyword-Listen der KI-Extraktion in einen Automaten"""
+    automaton = KeywordAutomaton()
+    for keyword in PERSONAL_INFO_KEYWORDS:
+        automaton.add(keyword, ("fact", "personal"))
+    for keyword in GAMING_KEYWORDS:
+        automaton.add(keyword, ("fact", "gaming"))
+    for keyword in LOCATION_KEYWORDS:
+        automaton.add(keyword, ("fact", "location"))
+    for category, keywords in PERSONAL_DETAIL_KEYWORDS.items():
+        for keyword in keywords:
+            automaton.add(keyword, ("detail", category))
+    for category, keywords in COMPLEX_PATTERNS.items():
+        for keyword in keywords:
+            automaton.add(keyword, ("complex", category))
+    for topic, keywords in TOPIC_KEYWORDS.items():
+        for keyword in keywords:
+            automaton.add(keyword, ("topic", topic))
+    return automaton.build()
+
+# Einmalig beim Import kompilierter Automat
+KI_KEYWORD_MATCHER = build_ki_matcher()
+
+def scan_message(message):
+    """Durchsucht eine Nachricht (case-insensitive) nach allen KI-Keywords"""
+    return KI_KEYWORD_MATCHER.scan(message.lower())
+
+def _scan_with_any(message):
+    """Bisherige Variante: jede Keyword-Liste einzeln mit any(...) prüfen"""
+    message_lower = message.lower()
+    labels = set()
+    for name, keywords in (("personal", PERSONAL_INFO_KEYWORDS), ("gaming", GAMING_KEYWORDS), ("location", LOCATION_KEYWORDS)):
+        if any(keyword in message_lower for keyword in keywords):
+            labels.add(("fact", name))
+    for group, table in (("detail", PERSONAL_DETAIL_KEYWORDS), ("complex", COMPLEX_PATTERNS), ("topic", TOPIC_KEYWORDS)):
+        for category, keywords in table.items():
+            if any(keyword in message_lower for keyword in keywords):
+                labels.add((group, category))
+    return labels
+
+def benchmark(iterations=2000):
+    """Vergleicht den Automaten mit der bisherigen any(...)-Variante"""
+    messages = [
+        "meddl",
+        "wer bist du eigentlich?",
+        "Ich heiße Max, bin 24 jahre alt und wohne in Nürnberg, ich arbeite als Elektriker",
+        "Ich spiele gerne auf der Playstation und mein Main in League ist Rank Gold, mein Clan heißt Drachis",
+        "Mein Hobby ist Musik und ich liebe Pizza, aber ich hab grad viel Stress auf der Arbeit mit meinem Chef",
+        "Gestern war ich mit meiner Freundin im Urlaub am Strand, das Hotel war super und das Essen auch " * 3
+    ]
+
+    # Beide Varianten müssen dieselben Kategorien finden
+    for message in messages:
+        assert set(scan_message(message).keys()) == _scan_with_any(message), message
+
+    results = {}
+    for name, func in (("any()-Schleifen", _scan_with_any), ("Aho-Corasick", scan_message)):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for message in messages:
+                func(message)
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed / (iterations * len(messages)) * 1_000_000
+    return results
+
+if __name__ == "__main__":
+    print("📈 Keyword-Matching Benchmark (µs pro Nachricht):")
+    for name, micros in benchmark().items():
+        print(f"   {name}: {micros:.1f} µs")
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Lasttest für den KI-Pfad ohne Discord und ohne echtes OpenRouter-Kontingent.
+
+Startet den lokalen Fake-Server (ki_fake_openrouter.py), registriert die
+KI-Komponenten auf einem Fake-Client und schickt synthetische Erwähnungen
+und DMs durch handle_ki_message. Sessions, Memory und Statistiken landen
+in einem temporären Verzeichnis.
+
+Beispiel:
+    python ki_loadtest.py --messages 500 --concurrency 50 --latency lognormal:0.8,0.5 --rate-429 0.05
+"""
+
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import collections
+
+import discord
+
+import ki
+import memory
+import memory_storage
+from ki_fake_openrouter import add_server_arguments, server_from_args
+
+# Synthetische Prompts: kurze generische (cachebar) und längere persönliche Nachrichten
+GENERIC_PROMPTS = ["meddl", "Meddl Loide", "wer bist du?", "was geht", "erzähl mal was", "hallo drache", ""]
+PERSONAL_PROMPTS = [
+    "Ich heiße {name} und spiele gerne auf der Playstation, mein Main ist Rank Gold",
+    "Ich wohne in Nürnberg und arbeite als Elektriker, was hältst du davon?",
+    "Mein Hobby ist Musik und ich liebe Pizza, aber ich hab grad viel Stress mit meinem Chef",
+    "Gestern war ich mit meiner Freundin im Urlaub am Strand, das Hotel war super",
+    "Was sagst du eigentlich zu den ganzen Hatern, die immer zu deinem Haus fahren?",
+]
+
+class FakeAvatar:
+    url = "https://cdn.discordapp.com/embed/avatars/0.png"
+
+class FakeUser:
+    def __init__(self, user_id, name):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.display_avatar = FakeAvatar()
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+
+class FakeGuild:
+    def __init__(self, guild_id, name):
+        self.id = guild_id
+        self.name = name
+
+class FakeSentMessage:
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+        self.edits = 0
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+        self.edits += 1
+        self.channel.stats["edits"] += 1
+        return self
+
+class _FakeTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+class _FakeMessageableMixin:
+    """send()/typing() ohne Discord-API, zählt gesendete Nachrichten"""
+    def typing(self):
+        return _FakeTyping()
+
+    async def send(self, content=None, **kwargs):
+        self.stats["sends"] += 1
+        return FakeSentMessage(self, content)
+
+class FakeTextChannel(_FakeMessageableMixin):
+    def __init__(self, channel_id, name, guild, stats):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.stats = stats
+
+class FakeDMChannel(_FakeMessageableMixin, discord.DMChannel):
+    """Echte DMChannel-Unterklasse, damit isinstance-Prüfungen in handle_ki_message greifen"""
+    def __init__(self, channel_id, stats):
+        self.id = channel_id
+        self.stats = stats
+
+class FakeMessage:
+    def __init__(self, content, author, channel, guild=None, mentions=None):
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+        self.mentions = mentions or []
+
+    async def reply(self, content=None, **kwargs):
+        self.channel.stats["replies"] += 1
+        return FakeSentMessage(self.channel, content)
+
+class FakeClient:
+    """Minimaler Bot-Ersatz mit den Attributen, die der KI-Pfad nutzt"""
+    def __init__(self):
+        self.user = FakeUser(1, "Buttergolem")
+        self.logging_channel = 0
+
+    def get_channel(self, channel_id):
+        return None  # Kein Logging-Channel im Lasttest
+
+    def get_emoji(self, emoji_id):
+        return None
+
+def _isolate_storage(directory):
+    """Lenkt Sessions, Statistiken und Memory-Dateien bzw. -Datenbank in ein temporäres Verzeichnis um"""
+    ki.LOGS_DIR = directory
+    ki.STATS_PATH = os.path.join(directory, 'stats.json')
+    ki.SESSIONS_PATH = os.path.join(directory, 'sessions.json')
+    ki.SESSIONS_SNAPSHOT_PATH = os.path.join(directory, 'sessions.snapshot')
+    ki.SESSIONS_JOURNAL_PATH = os.path.join(directory, 'sessions.journal')
+    memory.MEMORY_DIR = os.path.join(directory, 'memories')
+    os.makedirs(memory.MEMORY_DIR, exist_ok=True)
+    memory_storage.MEMORY_DB_PATH = os.path.join(directory, 'memories.sqlite3')
+    memory_storage.MEMORY_ARCHIVE_DIR = os.path.join(directory, 'memories_archive')
+
+def build_messages(client, count, users, guilds, dm_ratio, generic_ratio, rng):
+    """Erzeugt synthetische Erwähnungen und DMs"""
+    stats = collections.Counter()
+    user_objects = [FakeUser(1000 + index, f"Testuser{index}") for index in range(users)]
+    guild_objects = [FakeGuild(5000 + index, f"Testserver {index}") for index in range(guilds)]
+    text_channels = [FakeTextChannel(7000 + index, "ki-chat", guild, stats) for index, guild in enumerate(guild_objects)]
+    dm_channels = {user.id: FakeDMChannel(9000 + index, stats) for index, user in enumerate(user_objects)}
+
+    messages = []
+    for _ in range(count):
+        author = rng.choice(user_objects)
+        if rng.random() < generic_ratio:
+            prompt = rng.choice(GENERIC_PROMPTS)
+        else:
+            prompt = rng.choice(PERSONAL_PROMPTS).format(name=author.display_name)
+
+        if rng.random() < dm_ratio:
+            messages.append(FakeMessage(prompt, author, dm_channels[author.id]))
+        else:
+            channel = rng.choice(text_channels)
+            mentions = [client.user]
+            # Gelegentlich einen weiteren User erwähnen (umgeht den Antwort-Cache)
+            if rng.random() < 0.1:
+                other = rng.choice(user_objects)
+                mentions.append(other)
+                prompt = f"{prompt} {other.mention}"
+            messages.append(FakeMessage(f"{client.user.mention} {prompt}", author, channel, channel.guild, mentions))
+    return messages, stats
+
+async def run_loadtest(args):
+    rng = random.Random(args.seed)
+    server = server_from_args(args)
+    url = await server.start()
+
+    with tempfile.TemporaryDirectory(prefix="ki-loadtest-") as directory:
+        _isolate_storage(directory)
+        ki.KI_STREAMING = args.stream
+
+        client = FakeClient()
+        ki.register_ki_commands(client)
+        client.eliza_client = ki.ElizaOSClient("loadtest", base_url=url)
+        client.eliza_client.usage_callback = client.ki_quota.record_current
+        if args.models:
+            client.eliza_client.router = ki.ModelRouter(args.models.split(","), hedge_after=args.hedge_after)
+        elif args.hedge_after:
+            client.eliza_client.router.hedge_after = args.hedge_after
+        if not args.respect_quota:
+            # Der Token-Bucket ist auf das echte Kontingent ausgelegt und würde den Test nur drosseln
+            client.eliza_client.rate_limiter = ki.TokenBucket(per_minute=10 ** 9, capacity=10 ** 6)
+            client.ki_quota.limits = {key: 0 for key in client.ki_quota.limits}
+
+        messages, channel_stats = build_messages(
+            client, args.messages, args.users, args.guilds, args.dm_ratio, args.generic_ratio, rng
+        )
+
+        latencies = []
+        failures = 0
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def send(message):
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await ki.handle_ki_message(client, message)
+                except Exception as e:
+                    failures += 1
+                    print(f"❌ handle_ki_message fehlgeschlagen: {e}")
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(message) for message in messages))
+        elapsed = time.perf_counter() - started
+
+        await client.ki_pipeline.drain()
+        await client.eliza_client.close()
+        client.session_manager.save_sessions()
+        client.memory_manager.close()
+        await server.stop()
+
+        return {
+            "elapsed": elapsed,
+            "latencies": latencies,
+            "failures": failures,
+            "channels": channel_stats,
+            "upstream": server.get_stats(),
+            "client": client
+        }
+
+def print_report(args, result):
+    latencies = result["latencies"]
+    upstream = result["upstream"]
+    client = result["client"]
+    count = len(latencies)
+
+    print(f"📈 KI-Lasttest: {count} Nachrichten, Parallelität {args.concurrency}, "
+          f"{'Streaming' if args.stream else 'JSON'}")
+    print(f"   Dauer: {result['elapsed']:.2f} s • Durchsatz: {count / result['elapsed']:.1f} Nachrichten/s")
+    print(f"   Latenz p50/p95/p99: "
+          f"{ki.percentile(latencies, 50) * 1000:.0f} / {ki.percentile(latencies, 95) * 1000:.0f} / "
+          f"{ki.percentile(latencies, 99) * 1000:.0f} ms")
+    print(f"   Fehler im Handler: {result['failures']}")
+    print(f"   Upstream-Aufrufe: {upstream['requests']} ({upstream['requests'] / max(1, count):.2f} pro Nachricht), "
+          f"davon Streams: {upstream['streams']}, abgebrochen: {upstream['cancelled']}")
+    print(f"   Upstream-Fehler: {upstream['errors'] or 'keine'} • Modelle: {upstream['models']}")
+    print(f"   Tokens: {upstream['prompt_tokens']:,} Prompt / {upstream['completion_tokens']:,} Completion")
+    print(f"   Discord: {result['channels']['replies']} Replies, {result['channels']['sends']} Sends, "
+          f"{result['channels']['edits']} Edits")
+
+    cache = client.response_cache.get_stats()
+    queue = client.ki_scheduler.get_stats()
+    breaker = client.eliza_client.breaker.get_stats()
+    pipeline = client.ki_pipeline.get_stats()
+    print(f"   Antwort-Cache: {cache['hits']} Treffer, {cache['coalesced']} zusammengefasst, "
+          f"Trefferquote {cache['hit_rate']}%")
+    print(f"   Warteschlange: max. {queue['max_depth_seen']} wartend, {queue['rejected']} abgelehnt, "
+          f"Wartezeit p95 {queue['wait_p95_ms']} ms")
+    print(f"   Circuit Breaker: {breaker['state']} ({breaker['times_opened']}x geöffnet, "
+          f"{breaker['fast_failures']} sofort abgelehnt)")
+    print(f"   Hintergrund-Jobs: {pipeline['completed']} erledigt, {pipeline['failed']} fehlgeschlagen")
+    prefilter = client.ki_prefilter.get_stats()
+    print(f"   Vorfilter: {prefilter['saved_calls']} Upstream-Aufrufe gespart {prefilter['by_category'] or ''}")
+    quota = client.ki_quota.get_stats()
+    print(f"   Kontingente: {quota['prompt_tokens'] + quota['completion_tokens']:,} Tokens verbucht, "
+          f"{quota['rejected_user']} User / {quota['rejected_guild']} Server abgelehnt")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lasttest für handle_ki_message gegen einen lokalen OpenRouter-Ersatz")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20, help="Gleichzeitig verarbeitete Nachrichten")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--guilds", type=int, default=5)
+    parser.add_argument("--dm-ratio", type=float, default=0.2)
+    parser.add_argument("--generic-ratio", type=float, default=0.4, help="Anteil kurzer, cachebarer Prompts")
+    parser.add_argument("--stream", action="store_true", help="Streaming-Antworten (KI_STREAMING) verwenden")
+    parser.add_argument("--models", default=None, help="Kommagetrennte Modell-Liste (Standard: KI_MODELS)")
+    parser.add_argument("--hedge-after", type=float, default=0.0, help="Hedge-Anfrage nach S Sekunden")
+    parser.add_argument("--respect-quota", action="store_true", help="Echten Token-Bucket (KI_RATE_LIMIT_*) und Token-Kontingente (KI_QUOTA_*) verwenden")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    print_report(args, asyncio.run(run_loadtest(args)))
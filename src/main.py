@@ -39,6 +39,8 @@ from ki import register_ki_commands, handle_ki_message
 # from butteriq import register_butteriq_commands  # Jetzt in !drache integriert
 # from animated_stats import register_animated_stats_commands  # Jetzt in !drache integriert
 from memory import register_memory_manager
+from retention import register_retention_task
+from emoji_registry import register_emoji_registry
 from memory_commands import register_memory_commands
 from mirror import setup_mirror
 from changelog import ChangelogCog
@@ -75,6 +77,10 @@ client.remove_command('help')
 from admins import StatsManager
 client.stats_manager = StatsManager()
 
+# Einwilligungen (widerrufene werden im Aufbewahrungslauf samt Memories und Sessions gelöscht)
+from consent_manager import ConsentManager
+client.consent_manager = ConsentManager()
+
 # Set start time for uptime calculation
 import datetime
 client.start_time = datetime.datetime.now()
@@ -99,6 +105,8 @@ register_ki_commands(client)
 # register_butteriq_commands(client)  # Jetzt in !drache integriert
 # register_animated_stats_commands(client)  # Jetzt in !drache integriert
 register_memory_manager(client)
+register_retention_task(client)  # Archiviert inaktive Erinnerungen, räumt alte Sessions auf
+register_emoji_registry(client)  # Emoji-IDs einmalig laden, geteilt von KI und /zitat
 # register_memory_commands(client)  # Deaktiviert wegen Command-Konflikten
 
 # Register Hangman commands
@@ -222,6 +230,27 @@ async def on_ready():
             if logging_channel:
                 await _log("🐉 Drachigotchi background task gestartet!")
 
+    # Emoji-Registry gegen den Emoji-Cache der Server prüfen
+    if hasattr(client, 'emoji_registry'):
+        usable = client.emoji_registry.validate(client)
+        if logging_channel:
+            await _log(f"😀 Emoji-Registry: {usable}/{len(client.emoji_registry.emojis)} Emojis nutzbar")
+
+    # Gebündeltes Schreiben der Erinnerungen starten (falls verfügbar)
+    if hasattr(client, 'memory_flush_task'):
+        if not client.memory_flush_task.is_running():
+            client.memory_flush_task.start()
+
+    # Täglichen Aufbewahrungslauf starten (falls verfügbar)
+    if hasattr(client, 'retention_task'):
+        if not client.retention_task.is_running():
+            client.retention_task.start()
+
+    # KI-Session-Kompaktierung starten (falls verfügbar)
+    if hasattr(client, 'ki_session_compaction_task'):
+        if not client.ki_session_compaction_task.is_running():
+            client.ki_session_compaction_task.start()
+
     # Hangman Cleanup Task starten (falls verfügbar)
     if hasattr(client, 'hangman_cleanup_task'):
         if not client.hangman_cleanup_task.is_running():
@@ -661,7 +690,31 @@ client.get_random_clipname_cringe = get_random_clipname_cringe
 # Start the bot
 async def main():
     async with client:
-        await client.start(token)
+        try:
+            await client.start(token)
+        finally:
+            # Ausstehende KI-Hintergrundjobs (Speichern, Fakten, Statistik) abarbeiten
+            if hasattr(client, 'ki_pipeline'):
+                await client.ki_pipeline.drain()
+            # KI-HTTP-Session sauber schließen (Connection-Pool freigeben)
+            if hasattr(client, 'eliza_client'):
+                await client.eliza_client.close()
+            # Noch nicht geschriebene Erinnerungen sichern
+            if hasattr(client, 'memory_flush_task'):
+                client.memory_flush_task.cancel()
+            if hasattr(client, 'retention_task'):
+                client.retention_task.cancel()
+            if hasattr(client, 'memory_manager'):
+                client.memory_manager.close()
+            # Session-Journal in einen Snapshot überführen (vorher laufende Kompaktierung beenden)
+            if hasattr(client, 'ki_session_compaction_task'):
+                compaction = client.ki_session_compaction_task.get_task()
+                client.ki_session_compaction_task.cancel()
+                if compaction is not None:
+                    await asyncio.gather(compaction, return_exceptions=True)
+            if hasattr(client, 'session_manager'):
+                await client.session_manager.wait_for_compaction()
+                client.session_manager.save_sessions()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -2,58 +2,493 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
 import logging
 import datetime
+import hashlib
+import heapq
+import math
+import re
+import time
+import zlib
+import asyncio
+import itertools
+import threading
 from os.path import join, dirname, abspath
 import collections
 
+from discord.ext import tasks
+
+from memory_storage import create_memory_backend, MemoryArchive
+
 # Pfad für Memory-Dateien
 MEMORY_DIR = join(dirname(dirname(abspath(__file__))), 'data', 'memories')
 
 # Stellen Sie sicher, dass das Verzeichnis existiert
 os.makedirs(MEMORY_DIR, exist_ok=True)
 
+# Konfiguration für den Fakten-Speicher
+MEMORY_MAX_FACTS = int(os.environ.get('MEMORY_MAX_FACTS', 25))  # Max. Fakten pro Benutzer
+FACT_NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('FACT_NEAR_DUPLICATE_THRESHOLD', 0.7))  # Geschätzte Jaccard-Ähnlichkeit
+FACT_HALF_LIFE_DAYS = float(os.environ.get('FACT_HALF_LIFE_DAYS', 30))  # Halbwertszeit für den Recency-Score
+FACT_SHINGLE_SIZE = 3  # Wörter pro Shingle
+MINHASH_PERMUTATIONS = 32
+MINHASH_BANDS = 8  # LSH-Bänder à MINHASH_PERMUTATIONS // MINHASH_BANDS Zeilen
+_MINHASH_PRIME = (1 << 61) - 1
+_MINHASH_SEEDS = [
+    (int.from_bytes(hashlib.sha256(f"a{i}".encode()).digest()[:8], 'big') % _MINHASH_PRIME or 1,
+     int.from_bytes(hashlib.sha256(f"b{i}".encode()).digest()[:8], 'big') % _MINHASH_PRIME)
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+def normalize_fact(fact):
+    """Normalisiert einen Fakt für den Duplikat-Vergleich (Kleinschreibung, nur Wörter)"""
+    return " ".join(re.findall(r"\w+", fact.lower()))
+
+def fact_hash(fact):
+    """Stabiler Hash des normalisierten Fakts (Schlüssel im Index und in fact_scores)"""
+    return hashlib.sha1(normalize_fact(fact).encode('utf-8')).hexdigest()[:16]
+
+def minhash_signature(normalized):
+    """Berechnet die MinHash-Signatur über Wort-Shingles eines normalisierten Fakts"""
+    words = normalized.split()
+    if len(words) <= FACT_SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {" ".join(words[i:i + FACT_SHINGLE_SIZE]) for i in range(len(words) - FACT_SHINGLE_SIZE + 1)}
+    values = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+    return tuple(min((a * value + b) % _MINHASH_PRIME for value in values) for a, b in _MINHASH_SEEDS)
+
+def _signature_similarity(sig_a, sig_b):
+    """Geschätzte Jaccard-Ähnlichkeit zweier MinHash-Signaturen"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / MINHASH_PERMUTATIONS
+
+def _parse_timestamp(value, default):
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return default
+
+class FactIndex:
+    """
+    In-Memory-Index über die Fakten eines Benutzers.
+    Exakte Duplikate werden über den normalisierten Hash in O(1) erkannt,
+    Beinahe-Duplikate über MinHash mit LSH-Bändern. Jeder Fakt trägt einen
+    Score aus Häufigkeit (hits) und Aktualität (last_seen).
+    """
+    def __init__(self, memory):
+        self.memory = memory
+        self.scores = memory.setdefault("fact_scores", {})  # Hash -> {added, last_seen, hits}
+        self.facts = {}  # Hash -> Fakt-Text
+        self.signatures = {}  # Hash -> MinHash-Signatur
+        self.buckets = collections.defaultdict(set)  # (Band, Werte) -> Hashes
+        default_ts = _parse_timestamp(memory.get("created_at"), datetime.datetime.now().timestamp())
+        for fact in memory["important_facts"]:
+            key = fact_hash(fact)
+            self.facts[key] = fact
+            self._index_signature(key, fact)
+            entry = self.scores.setdefault(key, {})
+            entry.setdefault("added", datetime.datetime.fromtimestamp(default_ts).isoformat())
+            entry.setdefault("last_seen", entry["added"])
+            entry.setdefault("hits", 1)
+        # Verwaiste Scores (z.B. nach manueller Bearbeitung der Datei) entfernen
+        for key in list(self.scores):
+            if key not in self.facts:
+                del self.scores[key]
+
+    def _band_keys(self, signature):
+        rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+        return [(band, signature[band * rows:(band + 1) * rows]) for band in range(MINHASH_BANDS)]
+
+    def _index_signature(self, key, fact):
+        signature = minhash_signature(normalize_fact(fact))
+        self.signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self.buckets[band_key].add(key)
+        return signature
+
+    def find_near_duplicate(self, fact):
+        """Sucht einen Beinahe-Duplikat-Fakt; gibt dessen Hash oder None zurück"""
+        signature = minhash_signature(normalize_fact(fact))
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self.buckets.get(band_key, ()))
+        best_key, best_similarity = None, FACT_NEAR_DUPLICATE_THRESHOLD
+        for key in candidates:
+            similarity = _signature_similarity(signature, self.signatures[key])
+            if similarity >= best_similarity:
+                best_key, best_similarity = key, similarity
+        return best_key
+
+    def touch(self, key):
+        """Verstärkt einen vorhandenen Fakt (erneut erwähnt)"""
+        entry = self.scores[key]
+        entry["hits"] = entry.get("hits", 1) + 1
+        entry["last_seen"] = datetime.datetime.now().isoformat()
+
+    def add(self, key, fact):
+        now = datetime.datetime.now().isoformat()
+        self.facts[key] = fact
+        self._index_signature(key, fact)
+        self.scores[key] = {"added": now, "last_seen": now, "hits": 1}
+        self.memory["important_facts"].append(fact)
+
+    def remove(self, key):
+        fact = self.facts.pop(key)
+        signature = self.signatures.pop(key)
+        for band_key in self._band_keys(signature):
+            bucket = self.buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band_key]
+        self.scores.pop(key, None)
+        self.memory["important_facts"].remove(fact)
+
+    def score(self, key, now=None):
+        """Score = (1 + log(1 + hits)) * 0.5^(Alter seit last_seen / Halbwertszeit)"""
+        now = now or datetime.datetime.now().timestamp()
+        entry = self.scores[key]
+        age_days = max(0.0, now - _parse_timestamp(entry.get("last_seen"), now)) / 86400
+        return (1 + math.log1p(entry.get("hits", 1))) * 0.5 ** (age_days / FACT_HALF_LIFE_DAYS)
+
+    def enforce_cap(self, max_facts=None):
+        """Entfernt die Fakten mit dem niedrigsten Score, bis das Limit eingehalten ist"""
+        overflow = len(self.facts) - (MEMORY_MAX_FACTS if max_facts is None else max_facts)
+        if overflow <= 0:
+            return 0
+        now = datetime.datetime.now().timestamp()
+        victims = sorted(self.facts, key=lambda key: self.score(key, now))[:overflow]
+        for key in victims:
+            self.remove(key)
+        return len(victims)
+
+# Konfiguration für die Relevanz-Suche im Memory-Kontext
+MEMORY_RETRIEVAL_TOP_K = int(os.environ.get('MEMORY_RETRIEVAL_TOP_K', 8))  # Max. Fakten + Gesprächsrunden
+MEMORY_CONTEXT_BUDGET_CHARS = int(os.environ.get('MEMORY_CONTEXT_BUDGET_CHARS', 1500))  # Budget für ausgewählte Einträge
+MEMORY_FALLBACK_FACTS = 3  # Fakten mit höchstem Score, wenn nichts zur Anfrage passt
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Häufige deutsche Füllwörter, die für die Relevanz nichts aussagen
+STOPWORDS = {
+    "der", "die", "das", "und", "oder", "aber", "ich", "du", "er", "sie", "es", "wir", "ihr",
+    "ein", "eine", "einen", "einem", "einer", "ist", "bin", "bist", "sind", "war", "hat", "hab",
+    "habe", "mit", "von", "zu", "zum", "zur", "im", "in", "an", "auf", "für", "den", "dem", "des",
+    "nicht", "auch", "noch", "so", "wie", "was", "wer", "wo", "mal", "ja", "nein", "mir", "mich",
+    "dir", "dich", "mein", "meine", "dein", "deine", "da", "dann", "wenn", "als", "doch", "schon"
+}
+
+def tokenize(text):
+    """Zerlegt Text in kleingeschriebene Wörter ohne Füllwörter"""
+    return [token for token in re.findall(r"\w+", text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+class BM25Index:
+    """
+    Inkrementeller BM25-Index über die Fakten und Gesprächsrunden eines Users.
+    Dokumente können einzeln hinzugefügt und entfernt werden; die Suche
+    läuft über invertierte Listen und braucht keine externen Pakete.
+    """
+    def __init__(self):
+        self.documents = {}  # Dokument-ID -> (Art, Payload)
+        self.term_freqs = {}  # Dokument-ID -> Counter der Terme
+        self.lengths = {}  # Dokument-ID -> Anzahl Terme
+        self.postings = collections.defaultdict(dict)  # Term -> {Dokument-ID: Häufigkeit}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, doc_id, kind, text, payload):
+        if doc_id in self.documents:
+            self.remove(doc_id)
+        terms = collections.Counter(tokenize(text))
+        self.documents[doc_id] = (kind, payload)
+        self.term_freqs[doc_id] = terms
+        length = sum(terms.values())
+        self.lengths[doc_id] = length
+        self.total_length += length
+        for term, count in terms.items():
+            self.postings[term][doc_id] = count
+
+    def remove(self, doc_id):
+        if doc_id not in self.documents:
+            return
+        for term in self.term_freqs.pop(doc_id):
+            posting = self.postings[term]
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id)
+        del self.documents[doc_id]
+
+    def search(self, query, top_k=MEMORY_RETRIEVAL_TOP_K):
+        """Gibt die top_k Dokumente als Liste von (Score, Dokument-ID) zurück"""
+        if not self.documents:
+            return []
+        doc_count = len(self.documents)
+        average_length = self.total_length / doc_count or 1
+        scores = collections.defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, freq in posting.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc_id] / average_length)
+                scores[doc_id] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+        return heapq.nlargest(top_k, ((score, doc_id) for doc_id, score in scores.items()))
+
+# Konfiguration für das verzögerte, gebündelte Schreiben der Memory-Dateien
+MEMORY_FLUSH_INTERVAL = float(os.environ.get('MEMORY_FLUSH_INTERVAL', 2))  # Sekunden zwischen zwei Flusher-Läufen
+MEMORY_FLUSH_DELAY = float(os.environ.get('MEMORY_FLUSH_DELAY', 5))  # Änderungen so lange sammeln, bevor geschrieben wird
+MEMORY_HISTORY_LIMIT = 50  # Gespeicherte Gesprächsrunden pro Benutzer
+
+# Konfiguration für den Cache geladener Erinnerungen
+MEMORY_CACHE_MAX_ENTRIES = int(os.environ.get('MEMORY_CACHE_MAX_ENTRIES', 500))  # Max. User im Arbeitsspeicher
+MEMORY_CACHE_MAX_BYTES = int(os.environ.get('MEMORY_CACHE_MAX_BYTES', 32 * 1024 * 1024))  # Geschätzte Gesamtgröße
+
+def estimate_memory_size(memory):
+    """Grobe Größe einer Erinnerung in Bytes (Länge der Texte plus pauschaler Overhead pro Eintrag)"""
+    size = 512
+    for turn in memory.get("conversation_history", []):
+        size += len(turn.get("user_message", "")) + len(turn.get("bot_response", "")) + 120
+    size += sum(len(fact) + 60 for fact in memory.get("important_facts", []))
+    size += sum(len(topic) + 50 for topic in memory.get("topics_discussed", []))
+    size += sum(len(str(key)) + len(str(value)) + 60 for key, value in memory.get("user_info", {}).items())
+    size += len(memory.get("conversation_summary") or "")
+    return size
+
+def _as_user_id(value):
+    """
+    Vereinheitlicht Benutzer-IDs: Befehle und Dateinamen liefern Strings, die KI
+    Discord-ints. Alle öffentlichen MemoryManager-Methoden normalisieren damit,
+    sodass Cache, Indizes und Löschungen immer denselben Schlüssel sehen.
+    """
+    return int(value) if isinstance(value, str) and value.isdigit() else value
+
+class MemoryCache:
+    """
+    LRU-Cache für geladene Erinnerungen, begrenzt nach Anzahl und
+    geschätzter Größe. Wird ein Eintrag verdrängt, bekommt on_evict ihn
+    samt Dirty-Flag, damit ungespeicherte Änderungen gesichert werden
+    können.
+    """
+    def __init__(self, max_entries=MEMORY_CACHE_MAX_ENTRIES, max_bytes=MEMORY_CACHE_MAX_BYTES, on_evict=None):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.entries = collections.OrderedDict()  # Benutzer-ID -> Erinnerung, älteste zuerst
+        self.sizes = {}  # Benutzer-ID -> geschätzte Größe
+        self.dirty = set()  # Benutzer-IDs mit ungespeicherten Änderungen
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.dirty_evictions = 0
+
+    def __contains__(self, user_id):
+        return user_id in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __delitem__(self, user_id):
+        self.pop(user_id)
+
+    def get(self, user_id):
+        """Gibt die Erinnerung zurück und markiert sie als zuletzt benutzt (None bei Cache-Miss)"""
+        memory = self.entries.get(user_id)
+        if memory is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(user_id)
+        return memory
+
+    def put(self, user_id, memory):
+        if user_id in self.entries:
+            self.total_bytes -= self.sizes[user_id]
+        self.entries[user_id] = memory
+        self.entries.move_to_end(user_id)
+        self.sizes[user_id] = estimate_memory_size(memory)
+        self.total_bytes += self.sizes[user_id]
+        self._evict(keep=user_id)
+
+    def resize(self, user_id):
+        """Schätzt die Größe nach einer Änderung neu"""
+        memory = self.entries.get(user_id)
+        if memory is None:
+            return
+        size = estimate_memory_size(memory)
+        self.total_bytes += size - self.sizes[user_id]
+        self.sizes[user_id] = size
+        self._evict(keep=user_id)
+
+    def mark_dirty(self, user_id):
+        if user_id in self.entries:
+            self.dirty.add(user_id)
+
+    def mark_clean(self, user_id):
+        self.dirty.discard(user_id)
+
+    def pop(self, user_id):
+        """Entfernt einen Eintrag ohne ihn zu speichern"""
+        memory = self.entries.pop(user_id, None)
+        if memory is not None:
+            self.total_bytes -= self.sizes.pop(user_id)
+            self.dirty.discard(user_id)
+        return memory
+
+    def _evict(self, keep=None):
+        """Verdrängt die am längsten unbenutzten Einträge, bis beide Grenzen eingehalten sind"""
+        while len(self.entries) > self.max_entries or (self.total_bytes > self.max_bytes and len(self.entries) > 1):
+            user_id = next(iter(self.entries))
+            if user_id == keep:
+                # Der gerade benutzte Eintrag bleibt, auch wenn er allein zu groß ist
+                self.entries.move_to_end(user_id)
+                if len(self.entries) == 1:
+                    break
+                continue
+            dirty = user_id in self.dirty
+            memory = self.pop(user_id)
+            self.evictions += 1
+            if dirty:
+                self.dirty_evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(user_id, memory, dirty)
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0,
+            "evictions": self.evictions,
+            "dirty_evictions": self.dirty_evictions,
+            "dirty": len(self.dirty)
+        }
+
 class MemoryManager:
     """
     Verwaltet langfristige Erinnerungen für Benutzerinteraktionen mit dem Bot.
-    Speichert Benutzerinformationen und Gesprächsverläufe in JSON-Dateien.
+    Speichert Benutzerinformationen und Gesprächsverläufe über ein austauschbares
+    Backend (JSON-Dateien oder SQLite, siehe memory_storage.py).
     """
-    def __init__(self):
-        self.memories = {}  # Cache für geladene Erinnerungen
+    def __init__(self, backend=None, archive=None, max_facts=MEMORY_MAX_FACTS):
+        self.memories = MemoryCache(on_evict=self._on_cache_evict)  # LRU-Cache für geladene Erinnerungen
+        self.fact_indexes = {}  # Benutzer-ID -> FactIndex
+        self.retrieval_indexes = {}  # Benutzer-ID -> BM25Index über Fakten und Gesprächsrunden
+        self.retrieval_stats = {"queries": 0, "selected": 0, "fallbacks": 0}
+        self.fact_stats = {"added": 0, "duplicates": 0, "near_duplicates": 0, "evicted": 0}
+        self.max_facts = max_facts  # Max. Fakten pro Benutzer
+        self.dirty_since = {}  # Benutzer-ID -> Zeitpunkt der ersten ungespeicherten Änderung
+        self.flush_stats = {"changes": 0, "writes": 0, "failed": 0}
+        self._write_lock = threading.Lock()
+        self._write_seq = 0  # Fortlaufende Nummer pro Schreibvorgang
+        self._written_seq = {}  # Benutzer-ID -> Nummer des zuletzt geschriebenen Stands
+        self.evicted = {}  # Benutzer-ID -> (Snapshot, Nummer) verdrängter, noch nicht geschriebener Erinnerungen
         self.ensure_memory_dir()
+        self.backend = backend or create_memory_backend(MEMORY_DIR)
+        self.archive = archive or MemoryArchive()
+        self.retention_stats = {"archived": 0, "rehydrated": 0, "deleted": 0, "bytes_reclaimed": 0}
+        self.context_render_times = collections.deque(maxlen=1000)
     
     def ensure_memory_dir(self):
         """Stellt sicher, dass das Memory-Verzeichnis existiert"""
         os.makedirs(MEMORY_DIR, exist_ok=True)
     
-    def get_memory_path(self, user_id):
-        """Gibt den Pfad zur Memory-Datei für einen Benutzer zurück"""
-        return join(MEMORY_DIR, f"{user_id}.json")
-    
     def load_memory(self, user_id):
         """Lädt die Erinnerungen für einen Benutzer"""
-        if user_id in self.memories:
-            return self.memories[user_id]
-        
-        memory_path = self.get_memory_path(user_id)
-        
-        if os.path.exists(memory_path):
-            try:
-                with open(memory_path, 'r', encoding='utf-8') as f:
-                    memory = json.load(f)
-                    self.memories[user_id] = memory
-                    return memory
-            except Exception as e:
-                logging.error(f"Fehler beim Laden der Erinnerungen für Benutzer {user_id}: {str(e)}")
-                # Erstelle neue Erinnerung bei Fehler
-                return self.create_new_memory(user_id)
-        else:
+        user_id = _as_user_id(user_id)
+        memory = self._lookup(user_id)
+        if memory is not None:
+            return memory
+        
+        try:
+            stored = self.read_memory(user_id)
+        except Exception as e:
+            logging.error(f"Fehler beim Laden der Erinnerungen für Benutzer {user_id}: {str(e)}")
+            # Erstelle neue Erinnerung bei Fehler
+            stored = None
+        return self._adopt_memory(user_id, stored)
+    
+    async def load_memory_async(self, user_id):
+        """
+        Wie load_memory, aber nur das Lesen aus Backend bzw. Archiv läuft im
+        Worker-Thread; Cache, Indizes und Zähler bleiben im Event-Loop.
+        """
+        user_id = _as_user_id(user_id)
+        memory = self._lookup(user_id)
+        if memory is not None:
+            return memory
+        
+        try:
+            stored = await asyncio.to_thread(self.read_memory, user_id)
+        except Exception as e:
+            logging.error(f"Fehler beim Laden der Erinnerungen für Benutzer {user_id}: {str(e)}")
+            stored = None
+        return self._adopt_memory(user_id, stored)
+    
+    def read_memory(self, user_id):
+        """Liest die gespeicherte Erinnerung aus Backend oder Archiv (ohne Cache, thread-sicher)"""
+        memory = self.backend.load(user_id)
+        if memory is None:
+            memory = self._rehydrate(user_id)
+        return memory
+    
+    def _lookup(self, user_id):
+        """
+        Gibt die Erinnerung aus dem Cache zurück. Wurde sie mit ungespeicherten
+        Änderungen verdrängt und noch nicht geschrieben, kommt dieser Stand
+        zurück in den Cache, statt einen älteren aus dem Backend zu lesen.
+        """
+        memory = self.memories.get(user_id)
+        if memory is not None or user_id not in self.evicted:
+            return memory
+        snapshot, _ = self.evicted.pop(user_id)
+        memory = self._prepare_memory(self._copy_memory(snapshot))
+        self.memories.put(user_id, memory)
+        self.memories.mark_dirty(user_id)
+        self.dirty_since.setdefault(user_id, time.monotonic())
+        return memory
+    
+    def _adopt_memory(self, user_id, memory):
+        """Übernimmt eine gelesene Erinnerung in den Cache (im Event-Loop)"""
+        # Ein paralleler Aufruf kann den Benutzer inzwischen geladen (oder wieder verdrängt) haben
+        cached = self._lookup(user_id)
+        if cached is not None:
+            return cached
+        if memory is None:
             # Erstelle neue Erinnerung, wenn keine existiert
             return self.create_new_memory(user_id)
+        
+        memory = self._prepare_memory(memory)
+        self.memories.put(user_id, memory)
+        return memory
+    
+    def _rehydrate(self, user_id):
+        """Holt eine archivierte Erinnerung zurück in den aktiven Speicher"""
+        try:
+            memory = self.archive.load(user_id)
+            if memory is None:
+                return None
+            with self._write_lock:
+                self.backend.write(user_id, memory)
+                self.archive.delete(user_id)
+            self.retention_stats["rehydrated"] += 1
+            logging.info(f"Archivierte Erinnerungen für Benutzer {user_id} wiederhergestellt")
+            return memory
+        except Exception as e:
+            logging.error(f"Fehler beim Wiederherstellen der Erinnerungen für Benutzer {user_id}: {str(e)}")
+            return None
     
     def create_new_memory(self, user_id):
         """Erstellt eine neue Erinnerung für einen Benutzer"""
+        user_id = _as_user_id(user_id)
         memory = {
             "user_id": user_id,
             "created_at": datetime.datetime.now().isoformat(),
@@ -62,28 +497,165 @@ class MemoryManager:
             "user_info": {},
             "topics_discussed": [],
             "important_facts": [],
-            "conversation_history": []
+            "conversation_summary": "",
+            "summarized_turns": 0,
+            "conversation_history": collections.deque(maxlen=MEMORY_HISTORY_LIMIT)
         }
         
-        self.memories[user_id] = memory
+        self.memories.put(user_id, memory)
         self.save_memory(user_id)
         return memory
     
+    @staticmethod
+    def _prepare_memory(memory):
+        """Wandelt den Gesprächsverlauf einer geladenen Erinnerung in eine begrenzte deque um"""
+        memory["conversation_history"] = collections.deque(
+            memory.get("conversation_history", []), maxlen=MEMORY_HISTORY_LIMIT
+        )
+        return memory
+    
     def save_memory(self, user_id):
-        """Speichert die Erinnerungen für einen Benutzer"""
+        """
+        Markiert die Erinnerungen eines Benutzers als geändert. Geschrieben
+        wird gebündelt vom Flusher (flush_due) bzw. beim Beenden (flush_all),
+        mehrere Änderungen kurz hintereinander ergeben so nur einen Schreibvorgang.
+        """
+        user_id = _as_user_id(user_id)
         if user_id not in self.memories:
             return
         
-        memory_path = self.get_memory_path(user_id)
-        
+        self.memories.mark_dirty(user_id)
+        self.dirty_since.setdefault(user_id, time.monotonic())
+        self.flush_stats["changes"] += 1
+        self.memories.resize(user_id)
+    
+    def _snapshot(self, user_id, memory):
+        """
+        Kopiert die veränderlichen Teile einer Erinnerung (im Event-Loop), damit
+        das Backend im Worker-Thread einen festen Stand schreibt.
+        """
+        self._write_seq += 1
+        return self._copy_memory(memory), self._write_seq
+    
+    @staticmethod
+    def _copy_memory(memory):
+        """Kopiert eine Erinnerung samt ihrer Listen und Dicts"""
+        copy = dict(memory)
+        for field in ("conversation_history", "important_facts", "topics_discussed"):
+            copy[field] = list(memory.get(field, []))
+        for field in ("user_info", "fact_scores"):
+            if field in memory:
+                copy[field] = dict(memory[field])
+        return copy
+    
+    def _write_file(self, user_id, snapshot, seq):
+        """Schreibt über das Backend. Ein älterer Stand überschreibt nie einen bereits geschriebenen neueren."""
         try:
-            with open(memory_path, 'w', encoding='utf-8') as f:
-                json.dump(self.memories[user_id], f, ensure_ascii=False, indent=2)
+            with self._write_lock:
+                if seq < self._written_seq.get(user_id, 0):
+                    return True
+                self.backend.write(user_id, snapshot)
+                self._written_seq[user_id] = seq
+            self.flush_stats["writes"] += 1
+            return True
         except Exception as e:
+            self.flush_stats["failed"] += 1
             logging.error(f"Fehler beim Speichern der Erinnerungen für Benutzer {user_id}: {str(e)}")
+            return False
+    
+    def _write_memory(self, user_id, memory):
+        """Schreibt eine Erinnerung sofort (synchron)"""
+        snapshot, seq = self._snapshot(user_id, memory)
+        return self._write_file(user_id, snapshot, seq)
+    
+    def flush_memory(self, user_id):
+        """Schreibt die Erinnerungen eines Benutzers sofort, falls sie geändert wurden"""
+        user_id = _as_user_id(user_id)
+        self.dirty_since.pop(user_id, None)
+        if user_id not in self.memories.dirty:
+            return False
+        self.memories.mark_clean(user_id)
+        if not self._write_memory(user_id, self.memories.entries[user_id]):
+            self.memories.mark_dirty(user_id)
+            self.dirty_since.setdefault(user_id, time.monotonic())
+            return False
+        return True
+    
+    async def flush_due(self, delay=MEMORY_FLUSH_DELAY):
+        """
+        Schreibt alle Erinnerungen, deren erste ungespeicherte Änderung
+        mindestens delay Sekunden alt ist, sowie alle verdrängten, noch nicht
+        geschriebenen. Serialisiert wird im Event-Loop, das Schreiben läuft
+        im Worker-Thread.
+        """
+        now = time.monotonic()
+        due = [user_id for user_id, since in self.dirty_since.items() if now - since >= delay]
+        written = 0
+        for user_id in due:
+            self.dirty_since.pop(user_id, None)
+            if user_id not in self.memories.dirty:
+                continue
+            snapshot, seq = self._snapshot(user_id, self.memories.entries[user_id])
+            self.memories.mark_clean(user_id)
+            if await asyncio.to_thread(self._write_file, user_id, snapshot, seq):
+                written += 1
+            elif user_id in self.memories:
+                # Beim nächsten Lauf erneut versuchen
+                self.memories.mark_dirty(user_id)
+                self.dirty_since.setdefault(user_id, time.monotonic())
+        for user_id, entry in list(self.evicted.items()):
+            if await asyncio.to_thread(self._write_file, user_id, *entry):
+                written += 1
+                # Inzwischen neu geladen, gelöscht oder erneut verdrängt: nichts entfernen
+                if self.evicted.get(user_id) is entry:
+                    del self.evicted[user_id]
+            # Fehlgeschlagen: bleibt im Puffer und wird beim nächsten Lauf erneut versucht
+        return written
+    
+    def flush_all(self):
+        """Schreibt alle geänderten Erinnerungen sofort (z.B. beim Beenden)"""
+        written = 0
+        for user_id in list(self.memories.dirty):
+            if self.flush_memory(user_id):
+                written += 1
+        for user_id, entry in list(self.evicted.items()):
+            if self._write_file(user_id, *entry):
+                del self.evicted[user_id]
+                written += 1
+        self.dirty_since.clear()
+        if written:
+            logging.info(f"Memory: {written} geänderte Erinnerungen gespeichert")
+        return written
+    
+    def get_flush_stats(self):
+        """Gibt Änderungen, Schreibvorgänge und ausstehende Erinnerungen zurück"""
+        changes = self.flush_stats["changes"]
+        pending = len(self.memories.dirty) + len(self.evicted)
+        return {
+            **self.flush_stats,
+            "pending": pending,
+            "coalesced": max(0, changes - self.flush_stats["writes"] - pending)
+        }
+    
+    def _on_cache_evict(self, user_id, memory, dirty):
+        """
+        Übergibt verdrängte, geänderte Erinnerungen dem Flusher und verwirft die
+        abgeleiteten Indizes. Geschrieben wird nicht hier im Event-Loop; bis der
+        Flusher den Stand gespeichert hat, lädt load_memory ihn aus self.evicted.
+        """
+        self.dirty_since.pop(user_id, None)
+        if dirty:
+            self.evicted[user_id] = self._snapshot(user_id, memory)
+        self.fact_indexes.pop(user_id, None)
+        self.retrieval_indexes.pop(user_id, None)
+    
+    def get_cache_stats(self):
+        """Gibt Treffer, Fehlzugriffe und Verdrängungen des Memory-Caches zurück"""
+        return self.memories.get_stats()
     
     def update_user_info(self, user_id, user_info):
         """Aktualisiert die Benutzerinformationen"""
+        user_id = _as_user_id(user_id)
         memory = self.load_memory(user_id)
         memory["user_info"].update(user_info)
         memory["last_interaction"] = datetime.datetime.now().isoformat()
@@ -91,6 +663,7 @@ class MemoryManager:
     
     def add_interaction(self, user_id, user_message, bot_response, user_info=None):
         """Fügt eine neue Interaktion zur Erinnerung hinzu"""
+        user_id = _as_user_id(user_id)
         memory = self.load_memory(user_id)
         
         # Aktualisiere Benutzerinformationen, falls vorhanden
@@ -104,19 +677,28 @@ class MemoryManager:
             "bot_response": bot_response
         }
         
-        # Begrenze die Anzahl der gespeicherten Interaktionen auf 50
-        memory["conversation_history"].append(interaction)
-        if len(memory["conversation_history"]) > 50:
-            memory["conversation_history"] = memory["conversation_history"][-50:]
+        # Die deque behält automatisch nur die letzten MEMORY_HISTORY_LIMIT Interaktionen
+        history = memory["conversation_history"]
+        dropped = 1 if len(history) == history.maxlen else 0
+        history.append(interaction)
         
         # Aktualisiere Metadaten
         memory["interactions_count"] += 1
         memory["last_interaction"] = datetime.datetime.now().isoformat()
         
+        # Relevanz-Index inkrementell nachziehen (nur wenn bereits aufgebaut)
+        index = self.retrieval_indexes.get(user_id)
+        if index is not None:
+            turn_id = memory["interactions_count"]
+            index.add(f"turn:{turn_id}", "turn", f"{user_message} {bot_response}", interaction)
+            if dropped:
+                index.remove(f"turn:{turn_id - MEMORY_HISTORY_LIMIT}")
+        
         self.save_memory(user_id)
     
     def get_memory_summary(self, user_id):
         """Gibt eine Zusammenfassung der Erinnerungen für einen Benutzer zurück"""
+        user_id = _as_user_id(user_id)
         memory = self.load_memory(user_id)
         
         user_info = memory["user_info"]
@@ -132,6 +714,10 @@ class MemoryManager:
             for fact in memory["important_facts"]:
                 summary += f"- {fact}\n"
         
+        if memory.get("conversation_summary"):
+            summary += f"\nZusammenfassung früherer Gespräche ({memory.get('summarized_turns', 0)} Runden):\n"
+            summary += f"{memory['conversation_summary']}\n"
+        
         if memory["topics_discussed"]:
             summary += "\nBesprochene Themen:\n"
             for topic in memory["topics_discussed"]:
@@ -139,79 +725,429 @@ class MemoryManager:
         
         return summary
     
-    def add_important_fact(self, user_id, fact):
-        """Fügt einen wichtigen Fakt zur Erinnerung hinzu"""
+    def get_fact_index(self, user_id):
+        """Gibt den Fakten-Index eines Benutzers zurück (wird bei Bedarf aufgebaut)"""
+        user_id = _as_user_id(user_id)
         memory = self.load_memory(user_id)
-        
-        if fact not in memory["important_facts"]:
-            memory["important_facts"].append(fact)
+        index = self.fact_indexes.get(user_id)
+        if index is None or index.memory is not memory:
+            index = FactIndex(memory)
+            self.fact_indexes[user_id] = index
+            # Alte, unbegrenzte Fakten-Listen beim ersten Zugriff auf das Limit kürzen
+            evicted = index.enforce_cap(self.max_facts)
+            if evicted:
+                self.fact_stats["evicted"] += evicted
+                self.save_memory(user_id)
+        return index
+
+    def add_important_fact(self, user_id, fact):
+        """
+        Fügt einen wichtigen Fakt zur Erinnerung hinzu.
+        Exakte und Beinahe-Duplikate verstärken den vorhandenen Fakt statt
+        eines neuen Eintrags; über dem Limit fliegt der Fakt mit dem
+        niedrigsten Score raus.
+
+        Returns:
+            bool: True, wenn der Fakt neu gespeichert wurde
+        """
+        user_id = _as_user_id(user_id)
+        index = self.get_fact_index(user_id)
+        key = fact_hash(fact)
+
+        if key in index.facts:
+            self.fact_stats["duplicates"] += 1
+            index.touch(key)
+            self.save_memory(user_id)
+            return False
+
+        near_key = index.find_near_duplicate(fact)
+        if near_key is not None:
+            self.fact_stats["near_duplicates"] += 1
+            index.touch(near_key)
             self.save_memory(user_id)
+            return False
+
+        index.add(key, fact)
+        self.fact_stats["added"] += 1
+        self.fact_stats["evicted"] += index.enforce_cap(self.max_facts)
+        self._sync_fact_documents(user_id)
+        self.save_memory(user_id)
+        # Der neue Fakt selbst kann bei vollem Speicher den niedrigsten Score haben
+        return key in index.facts
+
+    def _turn_ids(self, memory):
+        """Laufende Nummern der gespeicherten Gesprächsrunden (stabil über Kürzungen hinweg)"""
+        first = memory["interactions_count"] - len(memory["conversation_history"]) + 1
+        return range(first, first + len(memory["conversation_history"]))
+
+    def _sync_fact_documents(self, user_id):
+        """Gleicht die Fakten-Dokumente im Relevanz-Index mit dem Fakten-Index ab"""
+        index = self.retrieval_indexes.get(user_id)
+        if index is None:
+            return
+        facts = self.get_fact_index(user_id).facts
+        indexed = {doc_id[5:] for doc_id in index.documents if doc_id.startswith("fact:")}
+        for key in indexed - facts.keys():
+            index.remove(f"fact:{key}")
+        for key in facts.keys() - indexed:
+            index.add(f"fact:{key}", "fact", facts[key], facts[key])
+
+    def get_retrieval_index(self, user_id):
+        """Gibt den BM25-Index eines Users zurück (wird beim ersten Zugriff aufgebaut)"""
+        user_id = _as_user_id(user_id)
+        index = self.retrieval_indexes.get(user_id)
+        if index is None:
+            memory = self.load_memory(user_id)
+            index = BM25Index()
+            for turn_id, turn in zip(self._turn_ids(memory), memory["conversation_history"]):
+                index.add(f"turn:{turn_id}", "turn", f"{turn['user_message']} {turn['bot_response']}", turn)
+            self.retrieval_indexes[user_id] = index
+            self._sync_fact_documents(user_id)
+        return index
+
+    def select_relevant(self, user_id, query, budget_chars=MEMORY_CONTEXT_BUDGET_CHARS):
+        """
+        Wählt die zur Anfrage passendsten Fakten und Gesprächsrunden innerhalb
+        des Zeichenbudgets. Passt nichts, werden die Fakten mit dem höchsten
+        Score genommen.
+
+        Returns:
+            tuple: (Liste von Fakten, Liste von Gesprächsrunden)
+        """
+        user_id = _as_user_id(user_id)
+        index = self.get_retrieval_index(user_id)
+        self.retrieval_stats["queries"] += 1
+        facts, turns = [], []
+        used = 0
+        for _, doc_id in index.search(query):
+            kind, payload = index.documents[doc_id]
+            if kind == "fact":
+                size = len(payload) + 3
+            else:
+                size = len(payload["user_message"]) + len(payload["bot_response"]) + 20
+            if used + size > budget_chars:
+                continue
+            used += size
+            (facts if kind == "fact" else turns).append(payload)
+
+        if not facts and not turns:
+            self.retrieval_stats["fallbacks"] += 1
+            fact_index = self.get_fact_index(user_id)
+            best = sorted(fact_index.facts, key=fact_index.score, reverse=True)[:MEMORY_FALLBACK_FACTS]
+            for key in best:
+                fact = fact_index.facts[key]
+                if used + len(fact) + 3 > budget_chars:
+                    break
+                used += len(fact) + 3
+                facts.append(fact)
+
+        self.retrieval_stats["selected"] += len(facts) + len(turns)
+        # Gesprächsrunden chronologisch ausgeben
+        turns.sort(key=lambda turn: turn.get("timestamp", ""))
+        return facts, turns
+
+    def get_fact_stats(self):
+        """Gibt Statistiken über den Fakten-Speicher zurück"""
+        return {
+            "max_facts": self.max_facts,
+            "indexed_users": len(self.fact_indexes),
+            **self.fact_stats
+        }
+    
+    def get_retrieval_stats(self):
+        """Gibt Statistiken über die Relevanz-Suche zurück"""
+        queries = self.retrieval_stats["queries"]
+        return {
+            "indexed_users": len(self.retrieval_indexes),
+            "documents": sum(len(index) for index in self.retrieval_indexes.values()),
+            "avg_selected": round(self.retrieval_stats["selected"] / queries, 1) if queries else 0,
+            **self.retrieval_stats
+        }
     
     def add_topic(self, user_id, topic):
         """Fügt ein besprochenes Thema zur Erinnerung hinzu"""
+        user_id = _as_user_id(user_id)
         memory = self.load_memory(user_id)
         
         if topic not in memory["topics_discussed"]:
             memory["topics_discussed"].append(topic)
             self.save_memory(user_id)
     
+    def peek_memory(self, user_id):
+        """Gibt die Erinnerung aus dem Cache zurück, ohne zu laden oder anzulegen (sonst None)"""
+        return self.memories.entries.get(_as_user_id(user_id))
+    
+    def apply_summary(self, user_id, summary, folded_turns, memory):
+        """
+        Ersetzt die ältesten folded_turns Gesprächsrunden durch die neue
+        rollierende Zusammenfassung und speichert die Erinnerung.
+        
+        memory ist das Objekt, aus dem die Runden stammen. Wurde der Benutzer
+        inzwischen gelöscht oder neu geladen, wird nichts übernommen (und nie
+        ein neuer Datensatz angelegt).
+        
+        Returns:
+            bool: True, wenn die Zusammenfassung übernommen wurde
+        """
+        user_id = _as_user_id(user_id)
+        if memory is None or self.peek_memory(user_id) is not memory:
+            return False
+        memory["conversation_summary"] = summary
+        memory["summarized_turns"] = memory.get("summarized_turns", 0) + folded_turns
+        memory["summary_updated"] = datetime.datetime.now().isoformat()
+        index = self.retrieval_indexes.get(user_id)
+        if index is not None:
+            for turn_id in list(self._turn_ids(memory))[:folded_turns]:
+                index.remove(f"turn:{turn_id}")
+        history = memory["conversation_history"]
+        for _ in range(min(folded_turns, len(history))):
+            history.popleft()
+        self.save_memory(user_id)
+        return True
+
     def get_recent_conversations(self, user_id, limit=5):
         """Gibt die letzten Konversationen mit einem Benutzer zurück"""
+        user_id = _as_user_id(user_id)
         memory = self.load_memory(user_id)
         
         # Gib die letzten X Konversationen zurück
-        return memory["conversation_history"][-limit:] if memory["conversation_history"] else []
+        history = memory["conversation_history"]
+        return list(itertools.islice(history, max(0, len(history) - limit), None))
     
     def get_all_memories(self):
         """Gibt eine Liste aller Benutzer-IDs zurück, für die Erinnerungen existieren"""
-        memory_files = os.listdir(MEMORY_DIR)
-        user_ids = [f.replace('.json', '') for f in memory_files if f.endswith('.json')]
+        user_ids = self.backend.list_user_ids()
+        # Neue Benutzer, die der Flusher noch nicht geschrieben hat
+        known = set(user_ids)
+        pending = itertools.chain(self.memories.dirty, self.evicted)
+        user_ids.extend(str(user_id) for user_id in dict.fromkeys(pending) if str(user_id) not in known)
         return user_ids
     
-    def get_memory_context(self, user_id):
+    def count_memories(self):
+        """Anzahl der gespeicherten Benutzer (ohne noch nicht geschriebene neue)"""
+        return self.backend.count()
+    
+    def list_memories(self, limit=20, offset=0):
+        """Zuletzt aktive Benutzer mit Name und Anzahl Interaktionen (bei SQLite eine indizierte Abfrage)"""
+        self.flush_all()
+        return self.backend.list_users(limit, offset)
+    
+    def search_memories(self, term, limit=20):
+        """Sucht Benutzer nach Name oder Fakt"""
+        self.flush_all()
+        return self.backend.search(term, limit)
+    
+    def delete_memory(self, user_id):
+        """Löscht die Erinnerungen eines Benutzers aus Cache und Backend"""
+        user_id = _as_user_id(user_id)
+        self.memories.pop(user_id)
+        self.evicted.pop(user_id, None)
+        self.dirty_since.pop(user_id, None)
+        self.fact_indexes.pop(user_id, None)
+        self.retrieval_indexes.pop(user_id, None)
+        with self._write_lock:
+            # Noch laufende ältere Schreibvorgänge dürfen den Benutzer nicht wiederherstellen
+            self._written_seq[user_id] = self._write_seq + 1
+            deleted = self.backend.delete(user_id)
+        return bool(self.archive.delete(user_id)) or deleted
+    
+    def _archive_user(self, user_id):
+        """Verschiebt einen Benutzer ins komprimierte Archiv (im Worker-Thread)"""
+        with self._write_lock:
+            memory = self.backend.load(user_id)
+            if memory is None:
+                return 0
+            hot_size = self.backend.stored_size(user_id)
+            archived_size = self.archive.write(user_id, memory)
+            self.backend.delete(user_id)
+        return max(0, hot_size - archived_size)
+    
+    async def apply_retention(self, archive_after_days, delete_after_days=0, forget_user_ids=()):
+        """
+        Archiviert Benutzer ohne Interaktion seit archive_after_days Tagen,
+        löscht Archive nach delete_after_days Tagen (0 = nie) und entfernt
+        die Benutzer in forget_user_ids (z.B. widerrufene Einwilligung)
+        vollständig. Die Dateiarbeit läuft im Worker-Thread.
+
+        Returns:
+            dict: archived, deleted, bytes_reclaimed
+        """
+        report = {"archived": 0, "deleted": 0, "bytes_reclaimed": 0}
+
+        for user_id in forget_user_ids:
+            if self.delete_memory(user_id):
+                report["deleted"] += 1
+
+        if archive_after_days > 0:
+            before = (datetime.datetime.now() - datetime.timedelta(days=archive_after_days)).isoformat()
+            for user_id in await asyncio.to_thread(self.backend.list_inactive, before):
+                user_id = _as_user_id(user_id)
+                # Benutzer im Cache sind gerade aktiv oder haben ungespeicherte Änderungen
+                if user_id in self.memories or user_id in self.evicted:
+                    continue
+                try:
+                    reclaimed = await asyncio.to_thread(self._archive_user, user_id)
+                except Exception as e:
+                    logging.error(f"Fehler beim Archivieren der Erinnerungen für Benutzer {user_id}: {str(e)}")
+                    continue
+                # Während des Archivierens zurückgekehrt: aktiven Stand wieder schreiben lassen
+                if user_id in self.memories:
+                    self.save_memory(user_id)
+                report["archived"] += 1
+                report["bytes_reclaimed"] += reclaimed
+
+        if delete_after_days > 0:
+            before_epoch = time.time() - delete_after_days * 86400
+            for user_id in await asyncio.to_thread(self.archive.list_expired, before_epoch):
+                report["bytes_reclaimed"] += await asyncio.to_thread(self.archive.delete, user_id)
+                report["deleted"] += 1
+
+        if (report["archived"] or report["deleted"]) and hasattr(self.backend, "vacuum"):
+            await asyncio.to_thread(self.backend.vacuum)
+
+        for key, value in report.items():
+            self.retention_stats[key] += value
+        return report
+    
+    def get_retention_stats(self):
+        """Gibt die Zähler der Aufbewahrung samt Archivgröße zurück"""
+        return {**self.retention_stats, **self.archive.get_stats()}
+    
+    def get_storage_stats(self):
+        """Gibt Backend und Anzahl gespeicherter Benutzer zurück"""
+        return {**self.backend.get_stats(), "users": self.count_memories()}
+    
+    def close(self):
+        """Schreibt alle Änderungen und schließt das Backend"""
+        self.flush_all()
+        self.backend.close()
+    
+    def get_memory_context(self, user_id, query=None):
         """
         Erstellt einen Kontext für die KI basierend auf den Erinnerungen.
         Dieser Kontext kann in den Prompt eingefügt werden.
+        
+        Mit query werden statt aller Fakten und der letzten 3 Konversationen
+        die zur Anfrage relevantesten Einträge (BM25) ausgewählt.
         """
+        user_id = _as_user_id(user_id)
+        start = time.perf_counter()
         memory = self.load_memory(user_id)
         
-        # Benutzerinformationen
+        if query:
+            important_facts, recent_conversations = self.select_relevant(user_id, query)
+            facts_title = "Relevante Fakten über diesen Benutzer:"
+            conversations_title = "Relevante frühere Gespräche mit diesem Benutzer:"
+        else:
+            # Wichtige Fakten und letzte Konversationen (begrenzt auf 3)
+            important_facts = memory["important_facts"]
+            recent_conversations = self.get_recent_conversations(user_id, 3)
+            facts_title = "Wichtige Fakten über diesen Benutzer:"
+            conversations_title = "Letzte Konversationen mit diesem Benutzer:"
+        
         user_info = memory["user_info"]
         user_name = user_info.get("name", "Unbekannt")
-        
-        # Wichtige Fakten
-        important_facts = memory["important_facts"]
-        
-        # Letzte Konversationen (begrenzt auf 3)
-        recent_conversations = self.get_recent_conversations(user_id, 3)
-        
-        # Erstelle Kontext
-        context = f"Informationen über {user_name} (Benutzer-ID: {user_id}):\n"
+        lines = [f"Informationen über {user_name} (Benutzer-ID: {user_id}):\n"]
         
         # Füge Benutzerinformationen hinzu
         if user_info:
-            context += "Benutzerinformationen:\n"
-            for key, value in user_info.items():
-                if key != "name":  # Name wurde bereits verwendet
-                    context += f"- {key}: {value}\n"
+            lines.append("Benutzerinformationen:\n")
+            lines.extend(f"- {key}: {value}\n" for key, value in user_info.items() if key != "name")
         
         # Füge wichtige Fakten hinzu
         if important_facts:
-            context += "\nWichtige Fakten über diesen Benutzer:\n"
-            for fact in important_facts:
-                context += f"- {fact}\n"
+            lines.append(f"\n{facts_title}\n")
+            lines.extend(f"- {fact}\n" for fact in important_facts)
+        
+        # Zusammenfassung älterer Gespräche statt der alten Rohdaten
+        if memory.get("conversation_summary"):
+            lines.append(f"\nZusammenfassung früherer Gespräche:\n{memory['conversation_summary']}\n")
         
         # Füge letzte Konversationen hinzu
         if recent_conversations:
-            context += "\nLetzte Konversationen mit diesem Benutzer:\n"
-            for conv in recent_conversations:
-                context += f"Benutzer: {conv['user_message']}\n"
-                context += f"Du: {conv['bot_response']}\n\n"
+            lines.append(f"\n{conversations_title}\n")
+            lines.extend(
+                f"Benutzer: {conv['user_message']}\nDu: {conv['bot_response']}\n\n"
+                for conv in recent_conversations
+            )
         
+        context = "".join(lines)
+        self.context_render_times.append(time.perf_counter() - start)
         return context
+    
+    def get_context_stats(self):
+        """Gibt Anzahl und Dauer der letzten Aufrufe von get_memory_context zurück"""
+        samples = list(self.context_render_times)
+        return {
+            "renders": len(samples),
+            "avg_render_us": round(sum(samples) / len(samples) * 1_000_000, 1) if samples else 0
+        }
 
 # Funktion zum Registrieren des MemoryManagers
 def register_memory_manager(client):
     """Registriert den MemoryManager für den Bot"""
     client.memory_manager = MemoryManager()
     logging.info("MemoryManager wurde initialisiert")
+
+    # Hintergrund-Task, der geänderte Erinnerungen gebündelt schreibt (wird in on_ready gestartet)
+    @tasks.loop(seconds=MEMORY_FLUSH_INTERVAL)
+    async def memory_flush_task():
+        try:
+            await client.memory_manager.flush_due()
+        except Exception as e:
+            logging.error(f"Fehler beim Schreiben der Erinnerungen: {str(e)}")
+
+    client.memory_flush_task = memory_flush_task
+
+if __name__ == "__main__":
+    # Benchmark: Kosten pro Aufruf von get_memory_context so, wie der KI-Pfad ihn
+    # nutzt (aktueller Prompt als Anfrage, nach jeder Antwort add_interaction),
+    # aufgeteilt in die BM25-Auswahl und den Rest (Laden, Rendern).
+    # Aufruf: python memory.py [Fakten-Anzahlen ...]  (Standard: 25 250 2500)
+    import sys
+    import tempfile
+
+    fact_counts = [int(arg) for arg in sys.argv[1:]] or [25, 250, 2500]
+    prompts = [
+        "Wie war das mit dem Mett am Weiher?",
+        "meddl, was geht bei dir heute?",
+        "Kennst du noch die Sorte 17 mit Zwiebeln?",
+        "Warst du schon mal in Altschauerberg an der Schanze?"
+    ]
+    iterations = 2000
+    user_info = {"name": "Testuser", "username": "testuser", "guild": "Testserver"}
+    with tempfile.TemporaryDirectory() as directory:
+        MEMORY_DIR = directory
+        manager = MemoryManager(
+            backend=create_memory_backend(directory, backend="json"),
+            archive=MemoryArchive(join(directory, "archive")),
+            max_facts=max(fact_counts)  # Große Fakten-Mengen nicht auf das Limit kürzen
+        )
+
+        for user_id, count in enumerate(fact_counts, start=1):
+            memory = manager.load_memory(user_id)
+            memory["important_facts"] = [
+                f"Mag Mett mit Zwiebeln, Sorte {index}, und war {index % 7} mal am Weiher" for index in range(count)
+            ]
+            memory["conversation_summary"] = "Redet gern über Mett, den Weiher und die Schanze. " * 10
+            manager.update_user_info(user_id, {**user_info, "wohnort": "Altschauerberg"})
+            manager.get_memory_context(user_id, prompts[0])  # Indizes aufbauen
+
+            total = selection = 0.0
+            for turn in range(iterations):
+                prompt = prompts[turn % len(prompts)]
+                start = time.perf_counter()
+                manager.select_relevant(user_id, prompt)
+                selection += time.perf_counter() - start
+                start = time.perf_counter()
+                manager.get_memory_context(user_id, prompt)
+                total += time.perf_counter() - start
+                # Wie im KI-Pfad: nach jeder Antwort wird die Interaktion gespeichert
+                manager.add_interaction(user_id, prompt, f"Antwort {turn}, meddl", user_info)
+            total = total / iterations * 1_000_000
+            selection = selection / iterations * 1_000_000
+            print(
+                f"📈 {count:>5} Fakten: {total:7.1f} µs pro KI-Aufruf, davon BM25-Auswahl {selection:7.1f} µs "
+                f"({selection / total * 100:.0f}%), Laden und Rendern {max(0.0, total - selection):6.1f} µs"
+            )
+        print(f"Kontext-Aufbau: {manager.get_context_stats()}")
@@ -229,16 +229,8 @@ def register_memory_commands(client):
                 return
             
             try:
-                # Lösche die Erinnerungsdatei
-                memory_path = join(MEMORY_DIR, f"{user_id}.json")
-                
-                if os.path.exists(memory_path):
-                    os.remove(memory_path)
-                    
-                    # Entferne auch aus dem Cache, falls vorhanden
-                    if hasattr(client.memory_manager, 'memories') and user_id in client.memory_manager.memories:
-                        del client.memory_manager.memories[user_id]
-                    
+                # Lösche die Erinnerungen aus Cache und Speicher-Backend
+                if client.memory_manager.delete_memory(user_id):
                     await ctx.send(f"✅ Erinnerungen für Benutzer {user_id} wurden gelöscht.")
                 else:
                     await ctx.send(f"❌ Keine Erinnerungen für Benutzer {user_id} gefunden.")
@@ -0,0 +1,460 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Speicher-Backends für die langfristigen Erinnerungen (MemoryManager).
+
+- JSONMemoryBackend: eine JSON-Datei pro Benutzer in data/memories/ (bisheriges Format)
+- SQLiteMemoryBackend: eine SQLite-Datenbank (WAL) mit Tabellen für Benutzer,
+  Fakten, Themen und Gesprächsrunden; Auflisten und Suchen laufen über Indizes
+
+Ausgewählt wird über MEMORY_BACKEND ("json" oder "sqlite"). Bestehende
+JSON-Dateien lassen sich einmalig übernehmen:
+    python memory_storage.py migrate --source ../data/memories --db ../data/memories.sqlite3
+"""
+
+import os
+import gzip
+import json
+import logging
+import sqlite3
+import datetime
+import argparse
+import threading
+from os.path import join, dirname, abspath
+
+MEMORY_BACKEND = os.environ.get('MEMORY_BACKEND', 'json').lower()  # "json" oder "sqlite"
+MEMORY_DB_PATH = os.environ.get('MEMORY_DB_PATH', join(dirname(dirname(abspath(__file__))), 'data', 'memories.sqlite3'))
+MEMORY_ARCHIVE_DIR = os.environ.get('MEMORY_ARCHIVE_DIR', join(dirname(dirname(abspath(__file__))), 'data', 'memories_archive'))
+
+# Felder, die in eigenen Spalten bzw. Tabellen liegen; alles andere landet als JSON in users.extra
+_STRUCTURED_FIELDS = {
+    "user_id", "created_at", "last_interaction", "interactions_count", "conversation_summary",
+    "summarized_turns", "important_facts", "topics_discussed", "conversation_history"
+}
+
+def memory_listing_entry(user_id, memory):
+    """Kurzinfo eines Benutzers für Admin-Listen"""
+    return {
+        "user_id": str(user_id),
+        "name": memory.get("user_info", {}).get("name", "Unbekannt"),
+        "interactions_count": memory.get("interactions_count", 0),
+        "last_interaction": memory.get("last_interaction")
+    }
+
+class JSONMemoryBackend:
+    """Eine JSON-Datei pro Benutzer (bisheriges Format)"""
+    name = "json"
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, user_id):
+        return join(self.directory, f"{user_id}.json")
+
+    def load(self, user_id):
+        """Gibt die Erinnerung zurück oder None, wenn keine existiert"""
+        try:
+            with open(self.path(user_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write(self, user_id, memory):
+        """Schreibt atomar über eine temporäre Datei und os.replace"""
+        path = self.path(user_id)
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(memory, f, ensure_ascii=False, separators=(',', ':'), default=list)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def delete(self, user_id):
+        try:
+            os.remove(self.path(user_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list_user_ids(self):
+        return [f[:-5] for f in os.listdir(self.directory) if f.endswith('.json')]
+
+    def list_inactive(self, before):
+        """
+        Benutzer mit last_interaction vor before (ISO-Zeitstempel). Die
+        Änderungszeit der Datei dient als Vorfilter, damit nur Kandidaten
+        gelesen werden.
+        """
+        cutoff = _iso_to_epoch(before)
+        inactive = []
+        for user_id in self.list_user_ids():
+            try:
+                if os.path.getmtime(self.path(user_id)) >= cutoff:
+                    continue
+                memory = self.load(user_id) or {}
+            except (OSError, ValueError) as e:
+                logging.error(f"Fehler beim Lesen der Erinnerungen für Benutzer {user_id}: {str(e)}")
+                continue
+            if (memory.get("last_interaction") or "") < before:
+                inactive.append(user_id)
+        return inactive
+
+    def stored_size(self, user_id):
+        try:
+            return os.path.getsize(self.path(user_id))
+        except OSError:
+            return 0
+
+    def count(self):
+        return len(self.list_user_ids())
+
+    def list_users(self, limit=20, offset=0):
+        """Zuletzt aktive Benutzer zuerst (lädt dafür jede Datei)"""
+        entries = []
+        for user_id in self.list_user_ids():
+            try:
+                entries.append(memory_listing_entry(user_id, self.load(user_id) or {}))
+            except Exception as e:
+                logging.error(f"Fehler beim Lesen der Erinnerungen für Benutzer {user_id}: {str(e)}")
+        entries.sort(key=lambda entry: entry["last_interaction"] or "", reverse=True)
+        return entries[offset:offset + limit]
+
+    def search(self, term, limit=20):
+        """Sucht in Namen und Fakten (lädt dafür jede Datei)"""
+        term = term.lower()
+        results = []
+        for user_id in self.list_user_ids():
+            memory = self.load(user_id) or {}
+            texts = [str(memory.get("user_info", {}).get("name", ""))] + list(memory.get("important_facts", []))
+            if any(term in text.lower() for text in texts):
+                results.append(memory_listing_entry(user_id, memory))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def close(self):
+        pass
+
+    def get_stats(self):
+        return {"backend": self.name, "location": self.directory}
+
+class SQLiteMemoryBackend:
+    """
+    SQLite-Datenbank im WAL-Modus. Schreibzugriffe kommen aus dem
+    Flusher-Thread, Lesezugriffe aus dem Event-Loop; eine Verbindung mit
+    Lock reicht für die Last eines Discord-Bots.
+    """
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            name TEXT,
+            created_at TEXT,
+            last_interaction TEXT,
+            interactions_count INTEGER NOT NULL DEFAULT 0,
+            conversation_summary TEXT NOT NULL DEFAULT '',
+            summarized_turns INTEGER NOT NULL DEFAULT 0,
+            extra TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE TABLE IF NOT EXISTS facts (
+            user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            fact TEXT NOT NULL,
+            PRIMARY KEY (user_id, position)
+        );
+        CREATE TABLE IF NOT EXISTS topics (
+            user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            topic TEXT NOT NULL,
+            PRIMARY KEY (user_id, position)
+        );
+        CREATE TABLE IF NOT EXISTS turns (
+            user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            timestamp TEXT,
+            user_message TEXT NOT NULL,
+            bot_response TEXT NOT NULL,
+            PRIMARY KEY (user_id, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_users_last_interaction ON users(last_interaction);
+        CREATE INDEX IF NOT EXISTS idx_users_name ON users(name COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_turns_user_timestamp ON turns(user_id, timestamp);
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(dirname(abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(self.SCHEMA)
+
+    def load(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM users WHERE user_id = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            facts = self._conn.execute(
+                "SELECT fact FROM facts WHERE user_id = ? ORDER BY position", (key,)).fetchall()
+            topics = self._conn.execute(
+                "SELECT topic FROM topics WHERE user_id = ? ORDER BY position", (key,)).fetchall()
+            turns = self._conn.execute(
+                "SELECT timestamp, user_message, bot_response FROM turns WHERE user_id = ? ORDER BY position",
+                (key,)).fetchall()
+
+        memory = json.loads(row["extra"])
+        memory.setdefault("user_id", user_id)
+        memory.update({
+            "created_at": row["created_at"],
+            "last_interaction": row["last_interaction"],
+            "interactions_count": row["interactions_count"],
+            "conversation_summary": row["conversation_summary"],
+            "summarized_turns": row["summarized_turns"],
+            "important_facts": [fact_row["fact"] for fact_row in facts],
+            "topics_discussed": [topic_row["topic"] for topic_row in topics],
+            "conversation_history": [dict(turn) for turn in turns]
+        })
+        memory.setdefault("user_info", {})
+        return memory
+
+    def _write_rows(self, user_id, memory):
+        key = str(user_id)
+        extra = {field: value for field, value in memory.items() if field not in _STRUCTURED_FIELDS}
+        extra["user_id"] = memory.get("user_id", user_id)
+        self._conn.execute(
+            """INSERT INTO users (user_id, name, created_at, last_interaction, interactions_count,
+                                  conversation_summary, summarized_turns, extra)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(user_id) DO UPDATE SET
+                   name = excluded.name, created_at = excluded.created_at,
+                   last_interaction = excluded.last_interaction,
+                   interactions_count = excluded.interactions_count,
+                   conversation_summary = excluded.conversation_summary,
+                   summarized_turns = excluded.summarized_turns, extra = excluded.extra""",
+            (key, memory.get("user_info", {}).get("name"), memory.get("created_at"), memory.get("last_interaction"),
+             memory.get("interactions_count", 0), memory.get("conversation_summary") or "",
+             memory.get("summarized_turns", 0), json.dumps(extra, ensure_ascii=False, default=list))
+        )
+        for table in ("facts", "topics", "turns"):
+            self._conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (key,))
+        self._conn.executemany(
+            "INSERT INTO facts (user_id, position, fact) VALUES (?, ?, ?)",
+            [(key, position, fact) for position, fact in enumerate(memory.get("important_facts", []))]
+        )
+        self._conn.executemany(
+            "INSERT INTO topics (user_id, position, topic) VALUES (?, ?, ?)",
+            [(key, position, topic) for position, topic in enumerate(memory.get("topics_discussed", []))]
+        )
+        self._conn.executemany(
+            "INSERT INTO turns (user_id, position, timestamp, user_message, bot_response) VALUES (?, ?, ?, ?, ?)",
+            [(key, position, turn.get("timestamp"), turn.get("user_message", ""), turn.get("bot_response", ""))
+             for position, turn in enumerate(memory.get("conversation_history", []))]
+        )
+
+    def write(self, user_id, memory):
+        """Schreibt alle Zeilen eines Benutzers in einer Transaktion"""
+        with self._lock, self._conn:
+            self._write_rows(user_id, memory)
+
+    def delete(self, user_id):
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM users WHERE user_id = ?", (str(user_id),))
+        return cursor.rowcount > 0
+
+    def list_user_ids(self):
+        with self._lock:
+            return [row["user_id"] for row in self._conn.execute("SELECT user_id FROM users")]
+
+    def list_inactive(self, before):
+        """Benutzer mit last_interaction vor before (indizierte Abfrage)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id FROM users WHERE last_interaction < ? OR last_interaction IS NULL", (before,)
+            ).fetchall()
+        return [row["user_id"] for row in rows]
+
+    def stored_size(self, user_id):
+        """Ungefähre Größe der Zeilen eines Benutzers in Bytes"""
+        key = str(user_id)
+        with self._lock:
+            size = self._conn.execute(
+                """SELECT COALESCE(LENGTH(extra), 0) + COALESCE(LENGTH(conversation_summary), 0)
+                          + (SELECT COALESCE(SUM(LENGTH(fact)), 0) FROM facts WHERE user_id = :key)
+                          + (SELECT COALESCE(SUM(LENGTH(topic)), 0) FROM topics WHERE user_id = :key)
+                          + (SELECT COALESCE(SUM(LENGTH(user_message) + LENGTH(bot_response)), 0)
+                             FROM turns WHERE user_id = :key)
+                   FROM users WHERE user_id = :key""",
+                {"key": key}
+            ).fetchone()
+        return size[0] if size else 0
+
+    def vacuum(self):
+        """Gibt freie Seiten nach dem Löschen an das Dateisystem zurück"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def list_users(self, limit=20, offset=0):
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT user_id, COALESCE(name, 'Unbekannt') AS name, interactions_count, last_interaction
+                   FROM users ORDER BY last_interaction DESC LIMIT ? OFFSET ?""",
+                (limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(self, term, limit=20):
+        pattern = f"%{term}%"
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT user_id, COALESCE(name, 'Unbekannt') AS name, interactions_count, last_interaction
+                   FROM users
+                   WHERE name LIKE ? OR user_id IN (SELECT user_id FROM facts WHERE fact LIKE ?)
+                   ORDER BY last_interaction DESC LIMIT ?""",
+                (pattern, pattern, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self):
+        return {"backend": self.name, "location": self.db_path}
+
+def _iso_to_epoch(timestamp):
+    """Wandelt einen ISO-Zeitstempel in Unix-Zeit um (0 bei ungültigen Werten)"""
+    try:
+        return datetime.datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return 0
+
+class MemoryArchive:
+    """
+    Kaltspeicher für inaktive Erinnerungen: eine gzip-komprimierte JSON-Datei
+    pro Benutzer, unabhängig vom gewählten Backend. Die Änderungszeit der
+    Datei wird auf die letzte Interaktion gesetzt, damit die Aufbewahrungsfrist
+    ohne Dekomprimieren geprüft werden kann.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or MEMORY_ARCHIVE_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, user_id):
+        return join(self.directory, f"{user_id}.json.gz")
+
+    def exists(self, user_id):
+        return os.path.exists(self.path(user_id))
+
+    def write(self, user_id, memory):
+        """Schreibt atomar und gibt die komprimierte Größe in Bytes zurück"""
+        path = self.path(user_id)
+        temp_path = f"{path}.tmp"
+        payload = json.dumps(memory, ensure_ascii=False, separators=(',', ':'), default=list).encode('utf-8')
+        with open(temp_path, 'wb') as f:
+            f.write(gzip.compress(payload, compresslevel=9))
+        os.replace(temp_path, path)
+        last_interaction = _iso_to_epoch(memory.get("last_interaction"))
+        if last_interaction:
+            os.utime(path, (last_interaction, last_interaction))
+        return os.path.getsize(path)
+
+    def load(self, user_id):
+        try:
+            with gzip.open(self.path(user_id), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def delete(self, user_id):
+        """Löscht ein Archiv und gibt die freigegebenen Bytes zurück"""
+        path = self.path(user_id)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except FileNotFoundError:
+            return 0
+
+    def list_expired(self, before_epoch):
+        """Archive, deren letzte Interaktion vor before_epoch liegt"""
+        return [
+            name[:-8] for name in self._user_files()
+            if os.path.getmtime(join(self.directory, name)) < before_epoch
+        ]
+
+    def _user_files(self):
+        # Andere Archive im Verzeichnis (z.B. die alte sessions.json) zählen nicht als Benutzer
+        return [name for name in os.listdir(self.directory) if name.endswith('.json.gz') and name[:-8].isdigit()]
+
+    def get_stats(self):
+        names = [name for name in os.listdir(self.directory) if name.endswith('.json.gz')]
+        return {
+            "archived_users": len(self._user_files()),
+            "archive_bytes": sum(os.path.getsize(join(self.directory, name)) for name in names)
+        }
+
+def create_memory_backend(json_directory, backend=None, db_path=None):
+    """Erstellt das über MEMORY_BACKEND gewählte Backend"""
+    backend = (backend or MEMORY_BACKEND).lower()
+    if backend == "sqlite":
+        return SQLiteMemoryBackend(db_path or MEMORY_DB_PATH)
+    if backend != "json":
+        logging.error(f"Unbekanntes MEMORY_BACKEND '{backend}', verwende JSON")
+    return JSONMemoryBackend(json_directory)
+
+def migrate_json_to_sqlite(json_directory, db_path, overwrite=False):
+    """
+    Übernimmt alle JSON-Dateien in die SQLite-Datenbank. Benutzer, die es dort
+    schon gibt, werden nur mit overwrite=True ersetzt. Die JSON-Dateien bleiben liegen.
+
+    Returns:
+        dict: Anzahl übernommener, übersprungener und fehlerhafter Dateien
+    """
+    source = JSONMemoryBackend(json_directory)
+    target = SQLiteMemoryBackend(db_path)
+    existing = set(target.list_user_ids())
+    result = {"migrated": 0, "skipped": 0, "failed": 0}
+    try:
+        for user_id in source.list_user_ids():
+            if user_id in existing and not overwrite:
+                result["skipped"] += 1
+                continue
+            try:
+                memory = source.load(user_id)
+                target.write(user_id, memory)
+                result["migrated"] += 1
+            except Exception as e:
+                result["failed"] += 1
+                logging.error(f"Migration der Erinnerungen für Benutzer {user_id} fehlgeschlagen: {str(e)}")
+    finally:
+        target.close()
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Werkzeuge für die Memory-Backends")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="JSON-Verzeichnis einmalig nach SQLite übernehmen")
+    migrate_parser.add_argument("--source", default=join(dirname(dirname(abspath(__file__))), 'data', 'memories'))
+    migrate_parser.add_argument("--db", default=MEMORY_DB_PATH)
+    migrate_parser.add_argument("--overwrite", action="store_true", help="Vorhandene Benutzer in der Datenbank ersetzen")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        result = migrate_json_to_sqlite(args.source, args.db, overwrite=args.overwrite)
+        print(f"✅ Migration abgeschlossen: {result['migrated']} übernommen, "
+              f"{result['skipped']} übersprungen, {result['failed']} fehlgeschlagen → {args.db}")
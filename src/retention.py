@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import logging
+
+from discord.ext import tasks
+
+import memory_storage
+
+# Aufbewahrung: inaktive Erinnerungen archivieren, alte Archive und Sessions löschen (0 = aus)
+RETENTION_INTERVAL_HOURS = float(os.environ.get('RETENTION_INTERVAL_HOURS', 24))
+MEMORY_ARCHIVE_AFTER_DAYS = int(os.environ.get('MEMORY_ARCHIVE_AFTER_DAYS', 90))  # Inaktiv -> komprimiertes Archiv
+MEMORY_RETENTION_DAYS = int(os.environ.get('MEMORY_RETENTION_DAYS', 730))  # Archiv -> endgültig gelöscht
+SESSION_RETENTION_DAYS = int(os.environ.get('SESSION_RETENTION_DAYS', 30))  # Kurzzeit-Sessions der KI
+
+def format_bytes(size):
+    """Bytes lesbar formatieren"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+async def _revoked_user_ids(client):
+    """Benutzer mit widerrufener Einwilligung laut client.consent_manager (in main.py registriert)"""
+    consent_manager = getattr(client, 'consent_manager', None)
+    if consent_manager is None:
+        return []
+    try:
+        records = await consent_manager.getAllConsentRecords()
+    except Exception as e:
+        logging.error(f"Fehler beim Lesen der Einwilligungen: {str(e)}")
+        return []
+    return [user_id for user_id, record in records.items() if record.get("revoked") is True]
+
+async def run_retention(client):
+    """
+    Ein Aufbewahrungslauf über Erinnerungen und KI-Sessions.
+
+    Returns:
+        dict: Bericht mit archivierten/gelöschten Benutzern und freigegebenen Bytes
+    """
+    start = time.perf_counter()
+    revoked = await _revoked_user_ids(client)
+    report = {"archived": 0, "deleted": 0, "forgotten": len(revoked), "sessions_pruned": 0, "bytes_reclaimed": 0}
+
+    if hasattr(client, 'memory_manager'):
+        memory_report = await client.memory_manager.apply_retention(
+            MEMORY_ARCHIVE_AFTER_DAYS, MEMORY_RETENTION_DAYS, forget_user_ids=revoked
+        )
+        report["archived"] = memory_report["archived"]
+        report["deleted"] = memory_report["deleted"]
+        report["bytes_reclaimed"] += memory_report["bytes_reclaimed"]
+
+    if hasattr(client, 'session_manager'):
+        pruned, freed = client.session_manager.prune_inactive(SESSION_RETENTION_DAYS, forget_user_ids=revoked)
+        if pruned:
+            await client.session_manager.compact()
+        report["sessions_pruned"] = pruned
+        report["bytes_reclaimed"] += freed
+        try:
+            report["bytes_reclaimed"] += client.session_manager.archive_legacy_file(memory_storage.MEMORY_ARCHIVE_DIR)
+        except Exception as e:
+            logging.error(f"Fehler beim Archivieren der alten sessions.json: {str(e)}")
+
+    report["duration_s"] = round(time.perf_counter() - start, 2)
+    client.last_retention_report = report
+    logging.info(
+        f"Aufbewahrung: {report['archived']} archiviert, {report['deleted']} gelöscht, "
+        f"{report['sessions_pruned']} Sessions entfernt, {format_bytes(report['bytes_reclaimed'])} freigegeben"
+    )
+    return report
+
+# Funktion zum Registrieren des Aufbewahrungs-Tasks
+def register_retention_task(client):
+    """Registriert den täglichen Aufbewahrungslauf (wird in on_ready gestartet)"""
+    @tasks.loop(hours=RETENTION_INTERVAL_HOURS)
+    async def retention_task():
+        try:
+            report = await run_retention(client)
+        except Exception as e:
+            logging.error(f"Fehler beim Aufbewahrungslauf: {str(e)}")
+            return
+
+        if not (report["archived"] or report["deleted"] or report["sessions_pruned"]):
+            return
+        logging_channel = client.get_channel(client.logging_channel) if hasattr(client, 'logging_channel') else None
+        if logging_channel:
+            await logging_channel.send(
+                f"🗄️ Aufbewahrung: {report['archived']} Erinnerungen archiviert, {report['deleted']} gelöscht, "
+                f"{report['sessions_pruned']} Sessions entfernt • {format_bytes(report['bytes_reclaimed'])} freigegeben"
+            )
+
+    client.retention_task = retention_task
+    return retention_task
@@ -85,19 +85,8 @@ def register_slash_commands(bot):
     async def zitat_slash(interaction: discord.Interaction):
         """Zeigt ein zufälliges Zitat"""
         quote = get_random_quote()
-        response_msg = await interaction.response.send_message(quote, ephemeral=True)
-
-            # 15% Emoji reaction logic
-        if random.random() < 0.15:
-                emoji_data = {
-                    'drache_mozerella_headset': 1395736548917645434,
-                    'drache_zahnlücke': 1395736315521400923,
-                    'drache_meddl_loide': 1395736247258972280,
-                    'drache_suspekt': 1395736270076117032
-                }
-                selected = random.sample(list(emoji_data.items()), k=random.randint(1,3))
-                for emoji_name, emoji_id in selected:
-                    await response_msg.add_reaction(f'<:{emoji_name}:{emoji_id}>')
+        # Ephemere Nachrichten können keine Reaktionen bekommen, daher ohne Emoji-Reaktion
+        await interaction.response.send_message(quote, ephemeral=True)
     
     @bot.tree.command(name="lordmeme", description="Erstellt ein Meme mit dem angegebenen Text")
     @app_commands.describe(
@@ -851,9 +840,9 @@ def register_slash_commands(bot):
     @admin_group.command(name="memory", description="Verwaltet die Memory-Funktionalität (Admin)")
     @admin_only()
     @app_commands.describe(
-        action="Die Aktion (list/show/add/delete)",
+        action="Die Aktion (list/show/add/delete/search/stats)",
         user_id="Die Benutzer-ID",
-        data="Zusätzliche Daten"
+        data="Zusätzliche Daten (Fakt bei add, Suchbegriff bei search)"
     )
     async def memory_slash(interaction: discord.Interaction, action: str = "list", user_id: str = None, data: str = None):
         """Memory Slash Command (Admin only)"""
@@ -872,10 +861,11 @@ def register_slash_commands(bot):
             return
         
         if action == "list":
-            # Liste alle Benutzer mit Erinnerungen auf
-            user_ids = bot.memory_manager.get_all_memories()
+            # Zuletzt aktive Benutzer mit Erinnerungen auflisten (Limit 20 für bessere Darstellung)
+            entries = bot.memory_manager.list_memories(20)
+            total = bot.memory_manager.count_memories()
             
-            if not user_ids:
+            if not entries:
                 await interaction.response.send_message(
                     "📋 Keine Erinnerungen gefunden.", 
                     ephemeral=True
@@ -884,27 +874,80 @@ def register_slash_commands(bot):
             
             embed = discord.Embed(
                 title="🧠 Benutzer mit Erinnerungen",
-                description=f"Insgesamt {len(user_ids)} Benutzer",
+                description=f"Insgesamt {max(total, len(entries))} Benutzer",
                 color=0x3498db
             )
             
-            # Versuche, die Benutzernamen zu den IDs zu finden
-            user_list = []
-            for uid in user_ids[:20]:  # Limitiere auf 20 für bessere Darstellung
-                try:
-                    memory = bot.memory_manager.load_memory(uid)
-                    user_name = memory["user_info"].get("name", "Unbekannt")
-                    interactions = memory["interactions_count"]
-                    user_list.append(f"• {user_name} (ID: {uid}) - {interactions} Interaktionen")
-                except:
-                    user_list.append(f"• Unbekannt (ID: {uid})")
+            user_list = [
+                f"• {entry['name']} (ID: {entry['user_id']}) - {entry['interactions_count']} Interaktionen"
+                for entry in entries
+            ]
             
             embed.add_field(
-                name="Benutzer",
-                value="\n".join(user_list) if user_list else "Keine Benutzer gefunden",
+                name="Benutzer (zuletzt aktiv zuerst)",
+                value="\n".join(user_list),
                 inline=False
             )
             
+            cache_stats = bot.memory_manager.get_cache_stats()
+            embed.set_footer(
+                text=f"Cache: {cache_stats['entries']}/{cache_stats['max_entries']} User • "
+                     f"Trefferquote {cache_stats['hit_rate']}% • {cache_stats['evictions']} verdrängt"
+            )
+            
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+        elif action == "search" and data:
+            entries = bot.memory_manager.search_memories(data, 20)
+            embed = discord.Embed(
+                title=f"🔎 Erinnerungen mit „{data[:50]}“",
+                description=f"{len(entries)} Treffer in Namen und Fakten",
+                color=0x3498db
+            )
+            if entries:
+                embed.add_field(
+                    name="Benutzer",
+                    value="\n".join(
+                        f"• {entry['name']} (ID: {entry['user_id']}) - {entry['interactions_count']} Interaktionen"
+                        for entry in entries
+                    ),
+                    inline=False
+                )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+        elif action == "stats":
+            cache_stats = bot.memory_manager.get_cache_stats()
+            embed = discord.Embed(
+                title="🧠 Memory-Cache",
+                color=0x3498db
+            )
+            embed.add_field(
+                name="Belegung",
+                value=f"{cache_stats['entries']} / {cache_stats['max_entries']} User\n"
+                      f"{cache_stats['bytes'] / 1024 / 1024:.1f} / {cache_stats['max_bytes'] / 1024 / 1024:.1f} MB (geschätzt)",
+                inline=True
+            )
+            embed.add_field(
+                name="Zugriffe",
+                value=f"Treffer: {cache_stats['hits']}\n"
+                      f"Fehlzugriffe: {cache_stats['misses']}\n"
+                      f"Trefferquote: {cache_stats['hit_rate']}%",
+                inline=True
+            )
+            storage_stats = bot.memory_manager.get_storage_stats()
+            embed.add_field(
+                name="Speicher",
+                value=f"Backend: {storage_stats['backend']}\n"
+                      f"Gespeicherte User: {storage_stats['users']}",
+                inline=True
+            )
+            embed.add_field(
+                name="Verdrängungen",
+                value=f"Gesamt: {cache_stats['evictions']}\n"
+                      f"Davon vorher gespeichert: {cache_stats['dirty_evictions']}\n"
+                      f"Ungespeichert im Cache: {cache_stats['dirty']}",
+                inline=True
+            )
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
         elif action == "show" and user_id:
@@ -987,7 +1030,9 @@ def register_slash_commands(bot):
                 value="• `/memory list` - Listet alle Benutzer mit Erinnerungen auf\n"
                       "• `/memory show <user_id>` - Zeigt die Erinnerungen für einen Benutzer\n"
                       "• `/memory add <user_id> <fact>` - Fügt einen wichtigen Fakt hinzu\n"
-                      "• `/memory delete <user_id>` - Löscht die Erinnerungen für einen Benutzer",
+                      "• `/memory delete <user_id>` - Löscht die Erinnerungen für einen Benutzer\n"
+                      "• `/memory search <begriff>` - Sucht Benutzer nach Name oder Fakt\n"
+                      "• `/memory stats` - Zeigt Treffer und Verdrängungen des Memory-Caches",
                 inline=False
             )
             
@@ -1217,6 +1262,317 @@ def register_slash_commands(bot):
                 ephemeral=True
             )
     
+    @admin_group.command(name="ki_status", description="Zeigt Status und Metriken des KI-Systems (Admin)")
+    @admin_only()
+    async def ki_status_slash(interaction: discord.Interaction):
+        """KI-Status Slash Command (Admin only)"""
+        if not hasattr(bot, 'eliza_client'):
+            await interaction.response.send_message(
+                "❌ KI-Client ist nicht initialisiert!",
+                ephemeral=True
+            )
+            return
+
+        embed = discord.Embed(
+            title="🤖 KI-System Status",
+            color=0x3498db,
+            timestamp=discord.utils.utcnow()
+        )
+
+        if hasattr(bot, 'session_manager'):
+            activity = bot.session_manager.get_activity_distribution()
+            embed.add_field(
+                name="👥 Aktive Benutzer",
+                value=f"1h: {activity['1h']} • 24h: {activity['24h']} • 7d: {activity['7d']}\n"
+                      f"Gesamt: {bot.session_manager.get_total_users()}",
+                inline=False
+            )
+
+        http_stats = bot.eliza_client.get_http_stats()
+        embed.add_field(
+            name="🌐 HTTP-Pool",
+            value=f"Requests: {http_stats['requests']}\n"
+                  f"Pool-Treffer: {http_stats['pool_hits']}\n"
+                  f"Neue Verbindungen: {http_stats['new_connections']}\n"
+                  f"Handshake p50/p95: {http_stats['handshake_p50_ms']} / {http_stats['handshake_p95_ms']} ms\n"
+                  f"Latenz p50/p95: {http_stats['latency_p50_ms']} / {http_stats['latency_p95_ms']} ms",
+            inline=False
+        )
+
+        router_stats = bot.eliza_client.router.get_stats()
+        model_lines = [
+            f"{'🟢' if stats['healthy'] else '🔴'} {model}: p50/p95 {stats['latency_p50_ms']} / {stats['latency_p95_ms']} ms, "
+            f"Fehler {stats['error_rate']}%"
+            for model, stats in router_stats['models'].items()
+        ]
+        model_lines.append(
+            f"Failover: {router_stats['failovers']} • Hedges: {router_stats['hedges']} (gewonnen: {router_stats['hedge_wins']})"
+        )
+        embed.add_field(name="🔀 Modelle", value="\n".join(model_lines)[:1024], inline=False)
+
+        breaker_stats = bot.eliza_client.breaker.get_stats()
+        limiter_stats = bot.eliza_client.rate_limiter.get_stats()
+        breaker_icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+        breaker_value = f"Circuit Breaker: {breaker_icons.get(breaker_stats['state'], '')} {breaker_stats['state']}"
+        if breaker_stats['state'] == "open":
+            breaker_value += f" (noch {breaker_stats['open_remaining_s']}s)"
+        embed.add_field(
+            name="🛡️ Upstream-Schutz",
+            value=f"{breaker_value}\n"
+                  f"Fehler in Folge: {breaker_stats['consecutive_failures']} • Geöffnet: {breaker_stats['times_opened']}x\n"
+                  f"Sofort abgelehnt: {breaker_stats['fast_failures']}\n"
+                  f"Token-Bucket: {limiter_stats['tokens']} / {limiter_stats['capacity']} ({limiter_stats['per_minute']}/min)\n"
+                  f"Gewartet/Abgelehnt: {limiter_stats['waited']} / {limiter_stats['rejected']}",
+            inline=False
+        )
+
+        if hasattr(bot, 'ki_scheduler'):
+            queue_stats = bot.ki_scheduler.get_stats()
+            embed.add_field(
+                name="🚦 Warteschlange",
+                value=f"Aktiv: {queue_stats['in_flight']} / {bot.ki_scheduler.max_concurrent}\n"
+                      f"Wartend: {queue_stats['queue_depth']} (Max: {queue_stats['max_depth_seen']})\n"
+                      f"Angenommen/Abgelehnt: {queue_stats['accepted']} / {queue_stats['rejected']}\n"
+                      f"Wartezeit p50/p95: {queue_stats['wait_p50_ms']} / {queue_stats['wait_p95_ms']} ms",
+                inline=False
+            )
+
+        if hasattr(bot, 'response_cache'):
+            cache_stats = bot.response_cache.get_stats()
+            embed.add_field(
+                name="🗄️ Antwort-Cache",
+                value=f"Einträge: {cache_stats['entries']}\n"
+                      f"Treffer/Zusammengefasst/Fehlschläge: {cache_stats['hits']} / {cache_stats['coalesced']} / {cache_stats['misses']}\n"
+                      f"Trefferquote: {cache_stats['hit_rate']}%\n"
+                      f"Verdrängt: {cache_stats['evictions']}",
+                inline=False
+            )
+
+        if hasattr(bot, 'ki_prefilter'):
+            prefilter_stats = bot.ki_prefilter.get_stats()
+            categories = ", ".join(f"{name}: {count}" for name, count in sorted(prefilter_stats['by_category'].items()))
+            embed.add_field(
+                name="🧹 Vorfilter",
+                value=f"Gesparte Aufrufe: {prefilter_stats['saved_calls']} von {prefilter_stats['checked']} "
+                      f"({prefilter_stats['saved_rate']}%)\n"
+                      f"Kategorien: {categories or 'keine'}\n"
+                      f"Ø Prüfzeit: {prefilter_stats['avg_check_us']} µs",
+                inline=False
+            )
+
+        if hasattr(bot, 'ki_context_assembler'):
+            context_stats = bot.ki_context_assembler.get_stats()
+            embed.add_field(
+                name="🧩 Kontext-Aufbau (p50/p95)",
+                value=f"Memory: {context_stats['memory_p50_ms']} / {context_stats['memory_p95_ms']} ms\n"
+                      f"Erwähnte User: {context_stats['mentions_p50_ms']} / {context_stats['mentions_p95_ms']} ms\n"
+                      f"Chat-History: {context_stats['history_p50_ms']} / {context_stats['history_p95_ms']} ms\n"
+                      f"Gesamt: {context_stats['total_p50_ms']} / {context_stats['total_p95_ms']} ms",
+                inline=False
+            )
+
+        if hasattr(bot, 'memory_manager'):
+            retrieval_stats = bot.memory_manager.get_retrieval_stats()
+            context_stats = bot.memory_manager.get_context_stats()
+            embed.add_field(
+                name="🔎 Memory-Suche (BM25)",
+                value=f"Anfragen: {retrieval_stats['queries']} • Ohne Treffer: {retrieval_stats['fallbacks']}\n"
+                      f"Ø Einträge pro Anfrage: {retrieval_stats['avg_selected']}\n"
+                      f"Indizierte User/Dokumente: {retrieval_stats['indexed_users']} / {retrieval_stats['documents']}\n"
+                      f"Ø Kontext-Aufbau: {context_stats['avg_render_us']} µs",
+                inline=False
+            )
+
+        if hasattr(bot, 'conversation_summarizer'):
+            summary_stats = bot.conversation_summarizer.get_stats()
+            embed.add_field(
+                name="🧠 Gesprächs-Zusammenfassungen",
+                value=f"LLM/Lokal: {summary_stats['llm_summaries']} / {summary_stats['local_summaries']}\n"
+                      f"Gefaltete Runden: {summary_stats['folded_turns']}\n"
+                      f"Größe danach: {summary_stats['compression']}% der Rohdaten",
+                inline=False
+            )
+
+        if hasattr(bot, 'ki_pipeline'):
+            pipeline_stats = bot.ki_pipeline.get_stats()
+            embed.add_field(
+                name="📬 Hintergrund-Jobs",
+                value=f"Wartend: {pipeline_stats['queue_depth']} (Max: {pipeline_stats['max_depth_seen']})\n"
+                      f"Erledigt/Wiederholt/Fehlgeschlagen: {pipeline_stats['completed']} / {pipeline_stats['retried']} / {pipeline_stats['failed']}\n"
+                      f"Job-Dauer p95: {pipeline_stats['job_p95_ms']} ms\n"
+                      f"API → Antwort p50/p95: {pipeline_stats['reply_latency_p50_ms']} / {pipeline_stats['reply_latency_p95_ms']} ms",
+                inline=False
+            )
+
+        stream_stats = bot.eliza_client.get_stream_stats()
+        embed.add_field(
+            name="⚡ Streaming",
+            value=f"Streams: {stream_stats['streams']}\n"
+                  f"Time-to-First-Token p50/p95: {stream_stats['ttft_p50_ms']} / {stream_stats['ttft_p95_ms']} ms\n"
+                  f"Gesamtdauer p50/p95: {stream_stats['total_p50_ms']} / {stream_stats['total_p95_ms']} ms",
+            inline=False
+        )
+
+        assembler_stats = bot.eliza_client.prompt_assembler.get_stats()
+        embed.add_field(
+            name="🧮 Prompt-Budget",
+            value=f"Budget: {assembler_stats['token_budget']:,} Tokens\n"
+                  f"Prompt p50/p95: {assembler_stats['prompt_tokens_p50']:,} / {assembler_stats['prompt_tokens_p95']:,} Tokens\n"
+                  f"Verworfene Runden: {assembler_stats['dropped_turns']}\n"
+                  f"Gekürzte Erinnerungen: {assembler_stats['trimmed_memory']}",
+            inline=False
+        )
+
+        prompt_stats = bot.eliza_client.prompt_cache.get_prompt_stats()
+        embed.add_field(
+            name="📜 System-Prompt",
+            value=f"Größe: {prompt_stats['bytes']:,} Bytes (~{prompt_stats['estimated_tokens']:,} Tokens)\n"
+                  f"Neu geladen: {prompt_stats['reload_count']}x\n"
+                  f"Hash: `{prompt_stats['content_hash']}`",
+            inline=False
+        )
+
+        embed.set_footer(text="KI-Metriken seit dem letzten Neustart")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @admin_group.command(name="emoji_reload", description="Lädt die Emoji-Registry neu (Admin)")
+    @admin_only()
+    async def emoji_reload_slash(interaction: discord.Interaction):
+        """Emoji-Registry neu laden und gegen den Emoji-Cache prüfen (Admin only)"""
+        if not hasattr(bot, 'emoji_registry'):
+            await interaction.response.send_message(
+                "❌ Emoji-Registry ist nicht initialisiert!",
+                ephemeral=True
+            )
+            return
+
+        stats = await bot.emoji_registry.reload(bot)
+        embed = discord.Embed(
+            title="😀 Emoji-Registry neu geladen",
+            color=0x2ecc71 if not stats['invalid'] else 0xf39c12,
+            timestamp=discord.utils.utcnow()
+        )
+        embed.add_field(name="Geladen", value=str(stats['loaded']), inline=True)
+        embed.add_field(name="Nutzbar", value=str(stats['usable']), inline=True)
+        embed.add_field(name="Quelle", value=stats['source'], inline=False)
+        if stats['invalid']:
+            embed.add_field(
+                name="Nicht verfügbar",
+                value="\n".join(f"• {name}" for name in stats['invalid'][:15]),
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @admin_group.command(name="ki_quota", description="Zeigt die größten KI-Token-Verbraucher (Admin)")
+    @admin_only()
+    async def ki_quota_slash(interaction: discord.Interaction):
+        """Top-Verbraucher der Token-Kontingente pro User und Server (Admin only)"""
+        if not hasattr(bot, 'ki_quota'):
+            await interaction.response.send_message(
+                "❌ KI-Kontingente sind nicht initialisiert!",
+                ephemeral=True
+            )
+            return
+
+        stats = bot.ki_quota.get_stats()
+        limits = stats['limits']
+        embed = discord.Embed(
+            title="🪙 KI-Token-Kontingente",
+            color=0x3498db,
+            timestamp=discord.utils.utcnow()
+        )
+
+        def format_limit(value):
+            return f"{value:,}" if value > 0 else "∞"
+
+        embed.add_field(
+            name="Limits (Stunde / Tag)",
+            value=f"User: {format_limit(limits['user_hour'])} / {format_limit(limits['user_day'])}\n"
+                  f"Server: {format_limit(limits['guild_hour'])} / {format_limit(limits['guild_day'])}",
+            inline=False
+        )
+        embed.add_field(
+            name="Verbrauch seit Neustart",
+            value=f"Prompt/Completion: {stats['prompt_tokens']:,} / {stats['completion_tokens']:,}\n"
+                  f"Ohne Zuordnung (Hintergrund): {stats['unattributed_tokens']:,}\n"
+                  f"Abgelehnt (User/Server): {stats['rejected_user']} / {stats['rejected_guild']}",
+            inline=False
+        )
+
+        top_users = []
+        for user_id, hour_tokens, day_tokens in bot.ki_quota.top_consumers("user"):
+            user = bot.get_user(user_id)
+            name = user.name if user else str(user_id)
+            top_users.append(f"• {name}: {hour_tokens:,} / {day_tokens:,}")
+        embed.add_field(name="👤 Top User (Stunde / Tag)", value="\n".join(top_users) or "Keine Daten", inline=False)
+
+        top_guilds = []
+        for guild_id, hour_tokens, day_tokens in bot.ki_quota.top_consumers("guild"):
+            guild = bot.get_guild(guild_id)
+            name = guild.name if guild else str(guild_id)
+            top_guilds.append(f"• {name}: {hour_tokens:,} / {day_tokens:,}")
+        embed.add_field(name="🏰 Top Server (Stunde / Tag)", value="\n".join(top_guilds) or "Keine Daten", inline=False)
+
+        embed.set_footer(text=f"Erfasst: {stats['tracked_users']} User, {stats['tracked_guilds']} Server")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @admin_group.command(name="retention", description="Startet den Aufbewahrungslauf für Memories und Sessions (Admin)")
+    @admin_only()
+    async def retention_slash(interaction: discord.Interaction):
+        """Archiviert inaktive Erinnerungen und räumt alte Sessions sofort auf (Admin only)"""
+        if not hasattr(bot, 'memory_manager'):
+            await interaction.response.send_message(
+                "❌ Memory-Manager ist nicht initialisiert!",
+                ephemeral=True
+            )
+            return
+
+        from retention import run_retention, format_bytes, MEMORY_ARCHIVE_AFTER_DAYS, MEMORY_RETENTION_DAYS, SESSION_RETENTION_DAYS
+
+        await interaction.response.defer(ephemeral=True)
+        try:
+            report = await run_retention(bot)
+        except Exception as e:
+            await interaction.followup.send(f"❌ Fehler beim Aufbewahrungslauf: {str(e)}", ephemeral=True)
+            return
+
+        stats = bot.memory_manager.get_retention_stats()
+        embed = discord.Embed(
+            title="🗄️ Aufbewahrungslauf",
+            color=0x2ecc71,
+            timestamp=discord.utils.utcnow()
+        )
+        embed.add_field(
+            name="Dieser Lauf",
+            value=f"Archiviert: {report['archived']}\n"
+                  f"Gelöscht: {report['deleted']}\n"
+                  f"Sessions entfernt: {report['sessions_pruned']}\n"
+                  f"Freigegeben: {format_bytes(report['bytes_reclaimed'])}",
+            inline=True
+        )
+        embed.add_field(
+            name="Seit Neustart",
+            value=f"Archiviert: {stats['archived']}\n"
+                  f"Wiederhergestellt: {stats['rehydrated']}\n"
+                  f"Gelöscht: {stats['deleted']}\n"
+                  f"Freigegeben: {format_bytes(stats['bytes_reclaimed'])}",
+            inline=True
+        )
+        embed.add_field(
+            name="Archiv",
+            value=f"{stats['archived_users']} Benutzer • {format_bytes(stats['archive_bytes'])}",
+            inline=False
+        )
+
+        def format_days(days):
+            return f"{days} Tage" if days > 0 else "aus"
+
+        embed.set_footer(
+            text=f"Archiv nach {format_days(MEMORY_ARCHIVE_AFTER_DAYS)} • Löschen nach {format_days(MEMORY_RETENTION_DAYS)} • "
+                 f"Sessions {format_days(SESSION_RETENTION_DAYS)} • {report['duration_s']}s"
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
     @admin_group.command(name="butteriq", description="ButterIQ Management (Admin)")
     @admin_only()
     @app_commands.describe(